@@ -0,0 +1,88 @@
+"""
+DB 연결 재사용(CONN_MAX_AGE) 효과 측정
+
+    PYTHONPATH=<my_settings 경로> python benchmarks/connection_reuse.py [--number 200] [--path /books/1]
+
+1. 연결 : 매번 새로 연결해서 SELECT 1 vs 열어 둔 연결로 SELECT 1 (handshake 비용)
+2. 요청 : WSGIHandler 로 --path 를 CONN_MAX_AGE=0 (요청마다 연결) / DATABASE_CONN_MAX_AGE 로 처리
+
+요청 끝의 close_old_connections 까지 포함해야 하므로 test Client 가 아닌 WSGIHandler 를 직접 호출한다.
+my_settings 의 DB(MySQL)에 연결하므로 운영 DB 가 아닌 곳에서 실행한다.
+"""
+import os
+import sys
+import time
+import argparse
+from wsgiref.util import setup_testing_defaults
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'suwee.settings')
+
+import django
+
+django.setup()
+
+from django.conf                  import settings
+from django.core.handlers.wsgi    import WSGIHandler
+from django.db                    import connections
+
+from share.benchmark import percentile
+
+
+def measure(func, number):
+    latencies = []
+    for _ in range(number):
+        started = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentile(latencies, 50), percentile(latencies, 95)
+
+
+def select_one(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200)
+    parser.add_argument('--alias', default='default')
+    parser.add_argument('--path', default='/books/today')
+    options = parser.parse_args()
+
+    connection = connections[options.alias]
+
+    def new_connection():
+        connection.close()
+        select_one(connection)
+
+    print(f'{"":<24}{"p50 ms":>10}{"p95 ms":>10}')
+    new_p50, new_p95       = measure(new_connection, options.number)
+    reused_p50, reused_p95 = measure(lambda: select_one(connection), options.number)
+    print(f'{"new connection":<24}{new_p50:>10.3f}{new_p95:>10.3f}')
+    print(f'{"reused connection":<24}{reused_p50:>10.3f}{reused_p95:>10.3f}')
+
+    handler = WSGIHandler()
+
+    def request():
+        environ = {'PATH_INFO': options.path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': 'localhost'}
+        setup_testing_defaults(environ)
+        response = handler(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()  # request_finished -> close_old_connections
+
+    results = {}
+    for max_age in (0, settings.DATABASE_CONN_MAX_AGE):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        measure(request, 5)
+        results[max_age] = measure(request, options.number)
+        print(f'{f"GET {options.path} age={max_age}":<24}{results[max_age][0]:>10.3f}{results[max_age][1]:>10.3f}')
+
+    saved = results[0][0] - results[settings.DATABASE_CONN_MAX_AGE][0]
+    print(f'saved per request (p50) : {saved:.3f} ms (handshake p50 {new_p50 - reused_p50:.3f} ms)')
+
+
+if __name__ == '__main__':
+    main()
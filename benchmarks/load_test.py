@@ -0,0 +1,207 @@
+"""
+WSGI(thread) 와 ASGI(async view) 배포의 동시 요청 처리 비교
+
+    PYTHONPATH=<my_settings 경로> python benchmarks/load_test.py [--mode wsgi asgi] [--threads 8] [--concurrency 1 8 32 64]
+
+wsgi : suwee.wsgi 를 --threads 개 thread 로 처리하는 서버 (gunicorn --threads 와 같은 방식, 요청 하나가 thread 하나를 차지)
+asgi : uvicorn 으로 suwee.asgi 를 띄운다. 읽기 전용 책 조회는 async view 로 처리되고 DB 조회는
+       ASYNC_DB_WORKERS 개 thread 에서 실행된다. (book/async_views.py)
+
+동시 요청 수(--concurrency)마다 --duration 초 동안 요청을 보내 처리량(req/s), p50/p99 응답 시간, 에러 수를 출력한다.
+서버는 프로세스 하나씩만 띄우므로 운영 환경의 절대 수치가 아니라 같은 조건에서의 비교로 본다.
+--url 을 주면 서버를 띄우지 않고 이미 떠 있는 서버(gunicorn, uvicorn --workers 등)에 요청한다.
+my_settings 의 DB 를 그대로 쓰므로 generate_dataset 으로 데이터를 넣은 DB 에서 실행한다.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from concurrent      import futures
+from urllib.parse    import urlsplit
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from share.benchmark import percentile
+
+# async view 로 바뀌는 읽기 전용 조회
+PATHS = (
+    '/books/recently',
+    '/books/commingsoon?day=60',
+    '/books/bestseller?keyword=1',
+    '/books/recommend?keyword=2',
+    '/books/search?title=%EC%B1%85',
+    '/books/landing_page?maximum=60&seed=1',
+)
+
+
+class ThreadPoolWSGIServer(WSGIServer):
+    # 요청을 고정된 수의 thread 에서 처리한다 (thread 가 모두 바쁘면 다음 요청은 기다린다)
+    request_queue_size = 1024
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietRequestHandler)
+        self.executor = futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_wsgi(port, threads):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'suwee.settings')
+    from suwee.wsgi import application
+
+    server = ThreadPoolWSGIServer(('127.0.0.1', port), threads)
+    server.set_app(application)
+    server.serve_forever()
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, options):
+    port = get_free_port()
+    env  = dict(os.environ)
+    env.pop('SUWEE_ASGI', None)
+    if mode == 'wsgi':
+        command = [sys.executable, os.path.abspath(__file__), '--serve-wsgi', str(port), '--threads', str(options.threads)]
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'suwee.asgi:application', '--host', '127.0.0.1',
+                   '--port', str(port), '--lifespan', 'off', '--no-access-log', '--log-level', 'warning']
+
+    process  = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'{mode} server exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'{mode} server did not start')
+
+
+def send(host, port, path):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        started = time.perf_counter()
+        connection.request('GET', path, headers={'Connection': 'close'})
+        response = connection.getresponse()
+        response.read()
+        return (time.perf_counter() - started) * 1000, response.status
+    finally:
+        connection.close()
+
+
+def run_level(url, concurrency, duration, paths):
+    """
+    concurrency 개 client thread 가 duration 초 동안 paths 를 돌아가며 요청
+
+    Returns: 처리량, p50/p99(ms), 에러 수 (연결 실패, timeout, 5xx)
+    """
+    address   = urlsplit(url)
+    latencies = []
+    errors    = []
+    lock      = threading.Lock()
+    deadline  = time.monotonic() + duration
+
+    def client(index):
+        count = index
+        while time.monotonic() < deadline:
+            path  = paths[count % len(paths)]
+            count += 1
+            try:
+                latency_ms, status = send(address.hostname, address.port, path)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors.append(path)
+                continue
+            with lock:
+                if status >= 500:
+                    errors.append(path)
+                else:
+                    latencies.append(latency_ms)
+
+    started = time.monotonic()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    return {
+        'concurrency' : concurrency,
+        'throughput'  : len(latencies) / elapsed,
+        'p50_ms'      : percentile(latencies, 50) if latencies else None,
+        'p99_ms'      : percentile(latencies, 99) if latencies else None,
+        'errors'      : len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', nargs='+', choices=('wsgi', 'asgi'), default=['wsgi', 'asgi'])
+    parser.add_argument('--threads', type=int, default=8, help='wsgi 서버의 요청 처리 thread 수')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--duration', type=float, default=10, help='동시 요청 수 마다 요청을 보낼 시간 (초)')
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--path', action='append', dest='paths', help='요청할 경로, 반복 가능 (기본값: 읽기 전용 책 조회)')
+    parser.add_argument('--url', help='이미 떠 있는 서버 주소 (예: http://127.0.0.1:8000)')
+    parser.add_argument('--output', help='결과 JSON 파일')
+    parser.add_argument('--serve-wsgi', type=int, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.serve_wsgi:
+        return serve_wsgi(options.serve_wsgi, options.threads)
+
+    paths   = options.paths or PATHS
+    targets = [('url', options.url)] if options.url else [(mode, None) for mode in options.mode]
+    report  = {}
+    print(f'{"mode":<6}{"concurrency":>12}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+    for mode, url in targets:
+        process = None
+        if url is None:
+            process, url = start_server(mode, options)
+        try:
+            run_level(url, 1, options.warmup, paths)
+            report[mode] = []
+            for concurrency in options.concurrency:
+                result = run_level(url, concurrency, options.duration, paths)
+                report[mode].append(result)
+                p50 = f'{result["p50_ms"]:.2f}' if result['p50_ms'] is not None else '-'
+                p99 = f'{result["p99_ms"]:.2f}' if result['p99_ms'] is not None else '-'
+                print(f'{mode:<6}{concurrency:>12}{result["throughput"]:>10.1f}{p50:>10}{p99:>10}{result["errors"]:>8}')
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'threads': options.threads, 'results': report}, output_file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+JSON / MessagePack 응답 크기와 인코딩 시간 비교
+
+    python benchmarks/msgpack_payloads.py [--number 2000]
+
+FastJsonResponse 가 쓰는 JSON 인코더(dumps)와 MessagePackMiddleware 가 쓰는 인코더(dumps_msgpack)를
+book/views.py, library/views.py 리스트 응답 모양의 payload 로 비교한다. gzip 크기도 같이 출력한다.
+"""
+import os
+import sys
+import gzip
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from share.responses import dumps, dumps_msgpack, JsonFragment
+from serialization   import make_card, make_detail
+
+
+def make_library_book(book_id):
+    created_at = datetime(2020, 12, 1, 10, 30) + timedelta(hours=book_id)
+    return {
+        "id"         : book_id,
+        "title"      : f'책 제목 {book_id}',
+        "image"      : f'https://image.suwee.com/books/{book_id}/cover.jpg',
+        "author"     : f'저자 {book_id}',
+        "created_at" : created_at,
+    }
+
+
+def make_payloads():
+    return {
+        'library(100 books)'   : {"libraryBook": [make_library_book(book_id) for book_id in range(1, 101)],
+                                  "nextCursor": "eyJ2IjogIjIwMjAtMTItMDEiLCAiaWQiOiAxMDB9"},
+        'bestseller(30 cards)' : {"bestSellerBook": [JsonFragment(make_card(book_id)) for book_id in range(1, 31)]},
+        'batch(30 details)'    : {"books": [dict(make_detail(book_id), id=book_id) for book_id in range(1, 31)],
+                                  "not_exist": []},
+    }
+
+
+def run(number):
+    print(f'{"payload":<22}{"json B":>10}{"msgpack B":>11}{"json gz":>10}{"msgpack gz":>12}'
+          f'{"json us":>10}{"msgpack us":>12}')
+
+    for name, payload in make_payloads().items():
+        encoded_json    = dumps(payload)
+        encoded_msgpack = dumps_msgpack(payload)
+        json_time       = timeit.timeit(lambda: dumps(payload), number=number) / number * 10**6
+        msgpack_time    = timeit.timeit(lambda: dumps_msgpack(payload), number=number) / number * 10**6
+
+        print(f'{name:<22}{len(encoded_json):>10}{len(encoded_msgpack):>11}'
+              f'{len(gzip.compress(encoded_json)):>10}{len(gzip.compress(encoded_msgpack)):>12}'
+              f'{json_time:>10.1f}{msgpack_time:>12.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=2000)
+    run(parser.parse_args().number)
@@ -0,0 +1,267 @@
+"""
+배포 전 성능 회귀 검사
+
+    PYTHONPATH=<my_settings 경로> python benchmarks/regression_gate.py --baseline main [--candidate HEAD]
+
+기준(baseline)과 후보(candidate) commit 을 각각 git worktree 로 꺼내 별도 SQLite DB 에 migrate 와
+generate_dataset 을 같은 seed 로 실행하고, 두 runserver 를 동시에 띄운 뒤 share/benchmark.py 의
+고정된 요청(book, library, user views)을 같은 순서로 두 서버에 번갈아 보낸다.
+--candidate 를 주지 않으면 지금 작업 중인 checkout(커밋하지 않은 변경 포함)을 후보로 쓴다.
+
+endpoint 마다 p50 변화율의 paired bootstrap 신뢰 구간, 같은 요청끼리의 쿼리 수 차이(X-Query-Count),
+5xx 응답 수를 비교하고 thresholds.json 의 기준을 넘으면 exit code 1 로 끝난다. (설정 오류는 2)
+두 commit 모두 generate_dataset 명령이 있어야 하며, 기준 commit 에 X-Query-Count 가 없으면 쿼리 수는
+비교하지 않는다.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import importlib.util
+import subprocess
+import http.client
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from share.benchmark import get_endpoints, get_threshold, check_regression, make_rng
+
+
+class GateError(Exception):
+    pass
+
+
+def run(command, cwd, env=None):
+    result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise GateError(f'{" ".join(command)} failed in {cwd}\n{result.stdout}{result.stderr}')
+    return result.stdout.strip()
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_token(user_id):
+    # user.views.generate_token 과 같은 token (서버와 같은 my_settings 를 쓴다)
+    import jwt
+    import my_settings
+    token = jwt.encode({'user_id': user_id}, my_settings.SECRET_KEY['secret'], algorithm=my_settings.JWT_ALGORITHM)
+    return token.decode('utf-8') if isinstance(token, bytes) else token
+
+
+class Server:
+    """
+    한 commit 의 runserver
+
+    checkout 마다 my_settings.py 를 복사해 DATABASES 만 전용 SQLite 파일로 바꾸므로
+    기준과 후보가 서로의 데이터나 schema 를 건드리지 않는다.
+    """
+
+    def __init__(self, name, checkout, work_dir):
+        self.name     = name
+        self.checkout = checkout
+        self.port     = get_free_port()
+        self.process  = None
+
+        settings_dir = os.path.join(work_dir, f'{name}_settings')
+        os.makedirs(settings_dir)
+        spec = importlib.util.find_spec('my_settings')
+        if spec is None:
+            raise GateError('my_settings.py is not on PYTHONPATH')
+        with open(spec.origin, encoding='utf-8') as source, \
+                open(os.path.join(settings_dir, 'my_settings.py'), 'w', encoding='utf-8') as target:
+            target.write(source.read())
+            database = os.path.join(work_dir, f'{name}.sqlite3')
+            target.write(f"\nDATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {database!r}}}}}\n")
+
+        # 응답 캐시와 version stamp 도 서버마다 빈 디렉터리에서 시작한다 (checkout 의 cache/ 에 남은 응답이 섞이지 않도록)
+        cache_dir = os.path.join(work_dir, name)
+        self.env  = dict(
+            os.environ,
+            PYTHONPATH               = settings_dir,
+            SUWEE_QUERY_COUNT_HEADER = '1',
+            SUWEE_SLOW_QUERY_LOG     = os.path.join(work_dir, f'{name}_slow_query.log'),
+            SUWEE_RESPONSE_CACHE_DIR = os.path.join(cache_dir, 'responses'),
+            SUWEE_VERSION_DIR        = os.path.join(cache_dir, 'versions'),
+        )
+        self.env.pop('SUWEE_METRICS_DIR', None)
+        self.env.pop('SUWEE_PROFILE_DIR', None)
+
+    def manage(self, *args):
+        return run([sys.executable, 'manage.py', *args], self.checkout, self.env)
+
+    def prepare(self, options):
+        self.manage('migrate', '--noinput')
+        self.manage('generate_dataset', '--users', str(options.users), '--books', str(options.books),
+                    '--seed', str(options.seed))
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', '--noreload', '--nothreading', f'127.0.0.1:{self.port}'],
+            cwd=self.checkout, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise GateError(f'{self.name} server exited with {self.process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise GateError(f'{self.name} server did not start')
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+    def send(self, method, path, params, body, token):
+        headers = {'Content-Type': 'application/json', 'Connection': 'close'}
+        if token:
+            headers['Authorization'] = token
+        url        = f'{path}?{urlencode(params)}' if params else path
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            started = time.perf_counter()
+            connection.request(method.upper(), url, json.dumps(body) if body is not None else None, headers)
+            response = connection.getresponse()
+            response.read()
+            latency_ms = (time.perf_counter() - started) * 1000
+        finally:
+            connection.close()
+
+        query_count = response.getheader('X-Query-Count')
+        return latency_ms, int(query_count) if query_count is not None else None, response.status
+
+
+def run_workload(servers, endpoints, options):
+    # 같은 요청을 두 서버에 보내되 매 요청 순서를 바꿔 (A, B), (B, A) 시간에 따른 잡음을 양쪽에 나눈다
+    dataset = {'users': options.users, 'books': options.books}
+    results = {server.name: {} for server in servers}
+    for endpoint in endpoints:
+        rng      = make_rng(options.seed, endpoint.name)
+        requests = []
+        for _ in range(options.warmup + options.requests):
+            path, params, body = endpoint.make_request(rng, dataset)
+            token              = make_token(rng.randint(1, dataset['users'])) if endpoint.auth else None
+            requests.append((path, params, body, token))
+
+        samples = {server.name: {'latencies_ms': [], 'query_counts': [], 'statuses': []} for server in servers}
+        for index, request in enumerate(requests):
+            for server in (servers if index % 2 == 0 else servers[::-1]):
+                latency_ms, query_count, status = server.send(endpoint.method, *request)
+                if index < options.warmup:
+                    continue
+                samples[server.name]['latencies_ms'].append(latency_ms)
+                samples[server.name]['query_counts'].append(query_count)
+                samples[server.name]['statuses'].append(status)
+
+        for server in servers:
+            results[server.name][endpoint.name] = samples[server.name]
+    return results
+
+
+def add_worktree(ref, path):
+    commit = run(['git', 'rev-parse', '--verify', f'{ref}^{{commit}}'], ROOT)
+    run(['git', 'worktree', 'add', '--detach', path, commit], ROOT)
+    return commit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default='main', help='기준 git ref (기본값: main)')
+    parser.add_argument('--candidate', help='후보 git ref (기본값: 현재 checkout)')
+    parser.add_argument('--thresholds', default=os.path.join(ROOT, 'benchmarks', 'thresholds.json'))
+    parser.add_argument('--endpoint', action='append', dest='endpoints', help='endpoint 이름 또는 app, 반복 가능')
+    parser.add_argument('--requests', type=int, default=60, help='endpoint 당 서버별 측정 요청 수')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=14)
+    parser.add_argument('--iterations', type=int, default=2000, help='bootstrap 반복 횟수')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--output', help='비교 결과 JSON 파일')
+    parser.add_argument('--keep', action='store_true', help='worktree 와 DB 를 지우지 않습니다.')
+    options = parser.parse_args()
+
+    with open(options.thresholds, encoding='utf-8') as thresholds_file:
+        thresholds = json.load(thresholds_file)
+    endpoints = get_endpoints(options.endpoints)
+
+    work_dir  = tempfile.mkdtemp(prefix='suwee-gate-')
+    worktrees = []
+    servers   = []
+    commits   = {}
+    try:
+        for name, ref in (('baseline', options.baseline), ('candidate', options.candidate)):
+            if ref is None:
+                checkout      = ROOT
+                commits[name] = run(['git', 'rev-parse', 'HEAD'], ROOT) + ' (working tree)'
+            else:
+                checkout      = os.path.join(work_dir, name)
+                commits[name] = add_worktree(ref, checkout)
+                worktrees.append(checkout)
+            servers.append(Server(name, checkout, work_dir))
+
+        for server in servers:
+            print(f'preparing {server.name} ({commits[server.name]})', file=sys.stderr)
+            server.prepare(options)
+            server.start()
+
+        samples = run_workload(servers, endpoints, options)
+    finally:
+        for server in servers:
+            server.stop()
+        if not options.keep:
+            for worktree in worktrees:
+                subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=ROOT, capture_output=True)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {}
+    print(f'{"endpoint":<24}{"base p50":>10}{"p50":>10}{"change":>9}{"CI":>20}{"Δq max":>8}  result')
+    for endpoint in endpoints:
+        result = check_regression(samples['baseline'][endpoint.name], samples['candidate'][endpoint.name],
+                                  get_threshold(thresholds, endpoint.name), options.iterations,
+                                  options.confidence, options.seed)
+        report[endpoint.name] = result
+        low, high   = result['change_ci_pct']
+        query_delta = result['query_delta']['max'] if result['query_delta'] else '-'
+        print(f'{endpoint.name:<24}{result["base_p50_ms"]:>10.2f}{result["p50_ms"]:>10.2f}'
+              f'{result["change_pct"]:>8.1f}%{f"[{low:.1f}%, {high:.1f}%]":>20}{query_delta:>8}  '
+              f'{", ".join(result["breaches"]) or "ok"}')
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as output_file:
+            json.dump({
+                'meta'      : {
+                    'baseline'   : commits['baseline'],
+                    'candidate'  : commits['candidate'],
+                    'requests'   : options.requests,
+                    'seed'       : options.seed,
+                    'confidence' : options.confidence,
+                },
+                'endpoints' : report,
+            }, output_file, ensure_ascii=False, indent=2)
+
+    breached = [name for name, result in report.items() if result['breaches']]
+    if breached:
+        print(f'performance regression: {", ".join(breached)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except GateError as error:
+        print(error, file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,92 @@
+"""
+book/views.py 응답 payload 직렬화 벤치마크
+
+    python benchmarks/serialization.py [--number 2000]
+
+JsonResponse(표준 json), FastJsonResponse(orjson 이 있으면 orjson), 미리 인코딩한
+책 카드(JsonFragment)를 끼워 넣는 FastJsonResponse 를 비교한다.
+DB 없이 실행할 수 있도록 payload 는 view 가 만드는 모양대로 직접 만든다.
+"""
+import os
+import sys
+import argparse
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from django.http     import JsonResponse
+
+from share           import responses
+from share.responses import FastJsonResponse, JsonFragment
+
+
+def make_card(book_id):
+    return {
+        "id"     : book_id,
+        "title"  : f'책 제목 {book_id} - 부제목이 붙은 긴 제목',
+        "image"  : f'https://image.suwee.com/books/{book_id}/cover.jpg',
+        "author" : f'저자 {book_id}',
+    }
+
+
+def make_detail(book_id):
+    return {'book_detail': {
+        'id'                    : book_id,
+        'title'                 : f'책 제목 {book_id}',
+        'image_url'             : f'https://image.suwee.com/books/{book_id}/cover.jpg',
+        'company'               : '출판사',
+        'author'                : '저자',
+        'publication_date'      : date(2020, 12, 1),
+        'description'           : '책 소개 ' * 300,
+        'contents'              : '목차\n' * 200,
+        'company_review'        : '출판사 서평 ' * 300,
+        'page'                  : 320,
+        'category'              : '소설',
+        'review_count'          : 42,
+        'reder'                 : 1300,
+        'numeric'               : {'complete': 0.42, 'complete_time': 380},
+    }, 'like': False}
+
+
+def make_payloads():
+    cards = [make_card(book_id) for book_id in range(1, 31)]
+    return {
+        'bestseller(30 cards)' : (
+            {"bestSellerBook": cards},
+            {"bestSellerBook": [JsonFragment(card) for card in cards]},
+        ),
+        'batch(30 details)'    : (
+            {"books": [dict(make_detail(book_id), id=book_id) for book_id in range(1, 31)], "not_exist": []},
+            None,
+        ),
+        'detail'               : (make_detail(1), None),
+    }
+
+
+def run(number):
+    print(f'encoder: {"orjson " + responses.orjson.__version__ if responses.orjson else "json (stdlib)"}')
+    print(f'{"payload":<22}{"JsonResponse":>16}{"FastJsonResponse":>20}{"+ fragments":>16}  (us / response)')
+
+    for name, (payload, fragment_payload) in make_payloads().items():
+        timings = [
+            timeit.timeit(lambda: JsonResponse(payload).content, number=number),
+            timeit.timeit(lambda: FastJsonResponse(payload).content, number=number),
+        ]
+        if fragment_payload is not None:
+            timings.append(timeit.timeit(lambda: FastJsonResponse(fragment_payload).content, number=number))
+
+        columns = ''.join(f'{timing / number * 10**6:>{width}.1f}'
+                          for timing, width in zip(timings, (16, 20, 16)))
+        print(f'{name:<22}{columns}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=2000)
+    run(parser.parse_args().number)
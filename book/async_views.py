@@ -0,0 +1,62 @@
+from django.http      import HttpResponseNotAllowed
+
+from .views           import (
+    TodayBookView,
+    RecentlyBookView,
+    CommingSoonBookView,
+    BestSellerBookView,
+    RecommendBookView,
+    LandingPageView,
+    SearchBookView,
+)
+from share.async_db   import run_in_db_thread
+from share.decorators import get_validators, get_not_modified_response, set_validators
+from share.versions   import versions_are_shared
+from share.responses  import FastJsonResponse
+
+
+def make_async_view(view_class):
+    """
+    view_class.get_payload 로 응답하는 async GET view (ASGI 배포용)
+
+    sync view 와 같은 get_payload 를 share/async_db.py 의 DB thread 에서 실행하므로 응답 본문이 같고,
+    sync view 에 conditional_get_decorator 가 있으면 같은 resource 의 ETag/Last-Modified 로 조건부 GET 을 처리한다.
+    DB 를 기다리는 동안 event loop 는 다른 요청을 받는다.
+    """
+    resources = getattr(view_class.get, 'resources', ())
+
+    async def view(request):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        validators = None
+        if resources and versions_are_shared():
+            validators = await run_in_db_thread(get_validators, request, resources)
+            response   = get_not_modified_response(request, validators, view_class.__name__)
+            if response is not None:
+                return response
+
+        payload, status = await run_in_db_thread(view_class().get_payload, request.GET)
+        response        = FastJsonResponse(payload, status=status)
+        if validators is not None:
+            set_validators(response, validators)
+        return response
+
+    view.__name__     = view_class.__name__
+    view.__qualname__ = view_class.__name__
+    view.__doc__      = view_class.__doc__
+    return view
+
+
+# sync view class : async view (book/urls.py 에서 ASYNC_VIEWS 일 때 바꿔 끼운다)
+ASYNC_BOOK_VIEWS = {
+    view_class: make_async_view(view_class) for view_class in (
+        TodayBookView,
+        RecentlyBookView,
+        CommingSoonBookView,
+        BestSellerBookView,
+        RecommendBookView,
+        LandingPageView,
+        SearchBookView,
+    )
+}
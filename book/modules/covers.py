@@ -0,0 +1,58 @@
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from book.models import Book
+
+
+class CoverWall:
+    """
+    랜딩 페이지 표지 벽
+
+    표지가 있는 책의 (id, image_url) 을 메모리에 올려두고 index 계산만으로 섞인 페이지를 만든다.
+    Book 이 바뀌면 mark_dirty() 로 표시해 두었다가 다음 조회 때 다시 읽는다.
+    다른 프로세스에서 바뀐 책은 COVER_WALL_REFRESH_SECONDS 가 지나면 반영된다.
+    """
+
+    def __init__(self):
+        self.lock      = threading.Lock()
+        self.covers    = ()
+        self.dirty     = True
+        self.loaded_at = 0
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def get_covers(self):
+        if self.dirty or time.monotonic() - self.loaded_at > settings.COVER_WALL_REFRESH_SECONDS:
+            with self.lock:
+                if self.dirty or time.monotonic() - self.loaded_at > settings.COVER_WALL_REFRESH_SECONDS:
+                    # 읽는 도중 바뀐 책을 놓치지 않도록 먼저 dirty 를 내린다
+                    self.dirty     = False
+                    self.covers    = tuple(Book.objects.exclude(image_url='')
+                                           .order_by('id').values_list('id', 'image_url'))
+                    self.loaded_at = time.monotonic()
+        return self.covers
+
+    def page(self, count, offset=0, seed=None):
+        # start + i * stride (mod n) 는 stride 가 n 과 서로소이면 0..n-1 의 순열이 된다
+        # seed 가 같으면 같은 순열이므로 offset 으로 이어지는 페이지를 받을 수 있다
+        covers = self.get_covers()
+        total  = len(covers)
+        if not total or offset >= total:
+            return []
+
+        rng    = random.Random(seed) if seed is not None else random
+        start  = rng.randrange(total)
+        stride = rng.randrange(1, total) if total > 1 else 1
+        while math.gcd(stride, total) != 1:
+            stride = stride % (total - 1) + 1
+
+        return [covers[(start + index * stride) % total]
+                for index in range(offset, min(offset + count, total))]
+
+
+cover_wall = CoverWall()
@@ -1,22 +1,62 @@
 from django.db.models   import (
         Sum,
         Avg,
+        Count,
         Q,
         F,
 )
 
-from user.models import UserBook
+from django.conf import settings
 
+from user.models import UserBook, DailyBookReading
+from book.models import Book
 
-def get_reading_numeric(book_id):
-    user_books = UserBook.objects.select_related('book').filter(book_id=book_id)
-    if not user_books.exists():
-        return {    
+
+def get_empty_numeric():
+    # 독자가 없는 책은 카테고리 평균도 0 으로 내려준다 (상세, 여러 권 조회, 일간 집계 모두 같은 규칙)
+    return {
             'avg_finish'                        : 0.0,
             'expected_reading_minutes'          : 0,
             'category_avg_finish'               : 0.0,
             'category_expected_reading_minutes' : 0,
-            } 
+            }
+
+
+def get_reading_numeric_from_rollup(book_id):
+    # 일간 집계(daily_book_readings) 합계로 계산 : 완독 확률 = 완독자/독자, 완독 예상시간 = 완독자 누적시간/완독자
+    def summarize(readings):
+        totals = readings.aggregate(readers=Sum('readers'), finishes=Sum('finishes'), finish_minutes=Sum('finish_minutes'))
+        if not totals['readers'] or not totals['finishes']:
+            return totals['readers'] or 0, 0.0, 0
+        return totals['readers'], totals['finishes'] / totals['readers'] * 100, int(totals['finish_minutes'] / totals['finishes'])
+
+    readers, avg_finish, expected_reading_minutes     = summarize(DailyBookReading.objects.filter(book_id=book_id))
+    if not readers:
+        return get_empty_numeric()
+
+    category_id                                       = Book.objects.filter(id=book_id).values_list('category_id', flat=True).first()
+    _, category_avg_finish, category_reading_minutes  = summarize(DailyBookReading.objects.filter(book__category_id=category_id))
+
+    return {
+            'avg_finish'                        : avg_finish,
+            'expected_reading_minutes'          : expected_reading_minutes,
+            'category_avg_finish'               : category_avg_finish,
+            'category_expected_reading_minutes' : category_reading_minutes,
+            }
+
+
+def use_rollup():
+    # user_books 를 shard 로 나누면 책 정보와 join 할 수 없으므로 일간 집계를 쓴다
+    return settings.READING_AGGREGATE_SOURCE == 'rollup' or bool(settings.DATABASE_SHARDS)
+
+
+def get_reading_numeric(book_id):
+    if use_rollup():
+        return get_reading_numeric_from_rollup(book_id)
+
+    user_books = UserBook.objects.select_related('book').filter(book_id=book_id)
+    if not user_books.exists():
+        return get_empty_numeric()
 
     # 완독할 확률   = 책 완독한 독자/책 전체 독자 * 100 (완독여부는 읽은 page/책 총 page)
     # 완독 예상시간 = 책 완독자 총 reading time / 책 완독자 수 
@@ -51,3 +91,69 @@ def get_reading_numeric(book_id):
             'category_avg_finish'               : category_avg_finish,
             'category_expected_reading_minutes' : int(category_expected_reading_minutes),
             }
+
+
+def summarize_numeric(total, finished, finish_minutes):
+    if not total or not finished:
+        return 0.0, 0
+    return finished / total * 100, int(finish_minutes)
+
+
+def get_grouped_numeric(book_ids, category_ids):
+    # 책별 / 카테고리별 (독자 수, 완독자 수, 완독자 평균 독서시간)을 group by 한 번씩으로 조회
+    if use_rollup():
+        readings   = DailyBookReading.objects
+        aggregates = {
+            'total'          : Sum('readers'),
+            'finished'       : Sum('finishes'),
+            'finish_minutes' : Sum('finish_minutes'),
+        }
+        def average(row):
+            return row['finish_minutes'] / row['finished'] if row['finished'] else 0
+    else:
+        readings   = UserBook.objects
+        finished   = Q(page__gte=F('book__page'))
+        aggregates = {
+            'total'          : Count('id'),
+            'finished'       : Count('id', filter=finished),
+            'finish_minutes' : Avg('time', filter=finished),
+        }
+        def average(row):
+            return row['finish_minutes'] or 0
+
+    by_book     = {row['book_id']: (row['total'], row['finished'], average(row)) for row in
+                   readings.filter(book_id__in=book_ids).values('book_id').annotate(**aggregates)}
+    by_category = {row['book__category_id']: (row['total'], row['finished'], average(row)) for row in
+                   readings.filter(book__category_id__in=category_ids).values('book__category_id').annotate(**aggregates)}
+
+    return by_book, by_category
+
+
+def get_reading_numeric_bulk(book_categories):
+    """
+    여러 책의 완독 확률/예상 시간을 책 수와 관계없이 일정한 query 수로 계산
+
+    book_categories : {책 id: 카테고리 id}
+    Returns: {책 id: get_reading_numeric 과 같은 형태의 dict}
+    """
+    by_book, by_category = get_grouped_numeric(
+        list(book_categories), [category_id for category_id in set(book_categories.values()) if category_id])
+
+    result = {}
+    for book_id, category_id in book_categories.items():
+        total, finished, finish_minutes = by_book.get(book_id, (0, 0, 0))
+        if not total:
+            result[book_id] = get_empty_numeric()
+            continue
+
+        avg_finish, expected_reading_minutes           = summarize_numeric(total, finished, finish_minutes)
+        category_avg_finish, category_reading_minutes  = summarize_numeric(*by_category.get(category_id, (0, 0, 0)))
+        result[book_id] = {
+            'avg_finish'                        : avg_finish,
+            'expected_reading_minutes'          : expected_reading_minutes,
+            'category_avg_finish'               : category_avg_finish,
+            'category_expected_reading_minutes' : category_reading_minutes,
+            }
+
+    return result
+
@@ -0,0 +1,48 @@
+from django.db                import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from .models                  import Book, Today, Review, Like
+from .modules.covers          import cover_wall
+from share.versions           import bump_versions_on_commit
+from share.response_cache     import invalidate_tags
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def refresh_cover_wall(sender, using, **kwargs):
+    # 커밋 전에 표시하면 그 사이 다시 읽은 조회가 이전 row 로 dirty 를 내려 COVER_WALL_REFRESH_SECONDS 까지 반영되지 않는다
+    transaction.on_commit(cover_wall.mark_dirty, using=using)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def bump_book_version(sender, **kwargs):
+    bump_versions_on_commit('books')
+
+
+@receiver(post_save, sender=Today)
+@receiver(post_delete, sender=Today)
+def bump_today_version(sender, **kwargs):
+    bump_versions_on_commit('today')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def bump_review_version(sender, **kwargs):
+    bump_versions_on_commit('reviews')
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_cache(sender, instance, **kwargs):
+    # keyword 를 바꾼 경우 이전 keyword 의 리스트는 TTL 이 지나야 반영된다
+    invalidate_tags(f'book:{instance.id}', f'keyword:{instance.keyword_id}')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_cache(sender, instance, **kwargs):
+    invalidate_tags(f'book:{instance.book_id}')
@@ -1,7 +1,14 @@
-import json,jwt
+import json,jwt,time
+import asyncio
+from urllib.parse   import urlencode
+from asgiref.sync   import sync_to_async
 from unittest.mock  import patch, MagicMock
-from datetime       import datetime
-from django.test import TestCase, Client
+from datetime       import datetime, date, timedelta
+from django.test import TestCase, TransactionTestCase, SimpleTestCase, Client, override_settings
+from django.urls import path, include
+from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache, caches
 
 import my_settings
 
@@ -10,16 +17,27 @@ from user.models import UserBook, User
 from .models            import (
         Book,
         Category,
+        Keyword,
         Review,
         Like
 )
+from library.models     import Library, LibraryBook
 from user.models        import (
         User,
         UserBook,
+        DailyBookReading,
 )
 from .modules.numeric   import (
         get_reading_numeric,
 )
+from .modules.covers    import cover_wall
+from user.tests         import run_on_commit_callbacks
+from .views             import RecentlyBookView, CommingSoonBookView, SearchBookView, BestSellerBookView
+from .async_views       import ASYNC_BOOK_VIEWS
+from share              import metrics
+from share.slow_queries import slow_query_log
+from share.responses    import FastJsonResponse, JsonFragment
+import msgpack
 
 
 class BookDetailTestCase(TestCase):
@@ -349,7 +367,7 @@ class ReviewTestCase(TestCase):
         )
         self.user2 = User.objects.create(
             id   = 2,
-            nickname  = self.DUMMY_NICKNAME,
+            nickname  = f'{self.DUMMY_NICKNAME}2',
             image_url = self.DUMMY_IMAGE_URL
 
         )
@@ -494,7 +512,7 @@ class ReviewLikeTestCase(TestCase):
         )
         self.user2 = User.objects.create(
             id   = 2,
-            nickname  = self.DUMMY_NICKNAME,
+            nickname  = f'{self.DUMMY_NICKNAME}2',
             image_url = self.DUMMY_IMAGE_URL
 
         )
@@ -580,3 +598,462 @@ class ReviewLikeTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class BookBatchTest(TestCase):
+    def setUp(self):
+        Category.objects.create(id=1, name='소설')
+        Category.objects.create(id=2, name='수필')
+        for i in range(1, 5):
+            User.objects.create(id=i, nickname=f'reader_{i}')
+            Book.objects.create(id=i, title=f'title_{i}', image_url=f'image_{i}', company='company', author='author',
+                                page=100, publication_date='2020-12-01', category_id=1 if i < 4 else 2)
+
+        UserBook.objects.bulk_create([
+            UserBook(user_id=1, book_id=1, page=100, time=120),
+            UserBook(user_id=2, book_id=1, page=30, time=40),
+            UserBook(user_id=1, book_id=2, page=100, time=60),
+            UserBook(user_id=3, book_id=4, page=10, time=5),
+        ])
+        Review.objects.create(user_id=1, book_id=1, contents='good')
+
+    def test_book_batch_get_same_as_detail(self):
+        response = self.client.get('/books/batch', {'ids':'1,2,3,4'})
+
+        self.assertEqual(response.status_code, 200)
+        for book in response.json()['books']:
+            detail = self.client.get(f'/books/{book["id"]}').json()
+            self.assertEqual({'book_detail':book['book_detail'], 'like':book['like']}, detail)
+
+        # 일간 집계 기준 : 독자가 없는 책(3)은 같은 카테고리에 독자가 있어도 두 경로 모두 0
+        DailyBookReading.objects.bulk_create([
+            DailyBookReading(day=date.today(), book_id=1, readers=2, finishes=1, finish_minutes=120),
+            DailyBookReading(day=date.today(), book_id=2, readers=1, finishes=1, finish_minutes=60),
+            DailyBookReading(day=date.today(), book_id=4, readers=1),
+        ])
+        for alias in ('local', 'shared'):
+            caches[alias].clear()
+        with self.settings(READING_AGGREGATE_SOURCE='rollup'):
+            books = self.client.get('/books/batch', {'ids':'1,2,3,4'}).json()['books']
+            for book in books:
+                detail = self.client.get(f'/books/{book["id"]}').json()
+                self.assertEqual({'book_detail':book['book_detail'], 'like':book['like']}, detail)
+        self.assertEqual(books[2]['book_detail']['numeric']['category_avg_finish'], 0.0)
+
+    def test_book_batch_get_constant_queries(self):
+        with self.assertNumQueries(5):
+            self.client.get('/books/batch', {'ids':'1,2'})
+        with self.assertNumQueries(5):
+            response = self.client.get('/books/batch', {'ids':'1,2,3,4,404'})
+
+        self.assertEqual([book['id'] for book in response.json()['books']], [1, 2, 3, 4])
+        self.assertEqual(response.json()['not_exist'], [404])
+
+    def test_book_batch_get_invalid_request(self):
+        response = self.client.get('/books/batch', {'ids':'one'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_REQUEST'})
+
+
+    def test_book_detail_get_fields(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/books/1', {'fields':'page,title'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'book_detail':{'title':'title_1', 'page':100}, 'like':False})
+
+    def test_book_detail_get_fields_computed(self):
+        full     = self.client.get('/books/1').json()['book_detail']
+        response = self.client.get('/books/1', {'fields':'category,reder,numeric'})
+
+        self.assertEqual(response.json()['book_detail'], {
+            'category' : full['category'],
+            'reder'    : full['reder'],
+            'numeric'  : full['numeric'],
+        })
+
+    def test_book_detail_get_invalid_fields(self):
+        response = self.client.get('/books/1', {'fields':'title,password'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_FIELDS'})
+
+    def test_book_batch_get_fields(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/books/batch', {'ids':'1,2', 'fields':'title,review_count'})
+
+        self.assertEqual(response.json()['books'], [
+            {'id':1, 'book_detail':{'title':'title_1', 'review_count':1}, 'like':False},
+            {'id':2, 'book_detail':{'title':'title_2', 'review_count':0}, 'like':False},
+        ])
+
+class SlowSectionView:
+    calls = 0
+
+    def get_payload(self, params):
+        SlowSectionView.calls += 1
+        time.sleep(0.5)
+        return {"slowBook": []}, 200
+
+
+class FastSectionView:
+    def get_payload(self, params):
+        return {"fastBook": [1]}, 200
+
+
+class BrokenSectionView:
+    def get_payload(self, params):
+        raise ValueError
+
+
+@override_settings(HOME_FEED_WORKERS=0)
+class HomeFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        cover_wall.mark_dirty()
+        Book.objects.create(id=1, title='지난 책', image_url='image_1', company='company', author='author',
+                            page=100, publication_date=date.today() - timedelta(days=3))
+        Book.objects.create(id=2, title='나올 책', image_url='image_2', company='company', author='author',
+                            page=100, publication_date=date.today() + timedelta(days=3))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_home_feed_get_same_as_sections(self):
+        response = self.client.get('/books/home')
+        sections = response.json()['sections']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['timedOut'], [])
+        self.assertEqual(sections['today'], None)
+        self.assertEqual(sections['recently'], self.client.get('/books/recently').json())
+        self.assertEqual(sections['commingSoon'], self.client.get('/books/commingsoon').json())
+        self.assertEqual(sorted(book['id'] for book in sections['landingPage']['books']), [1, 2])
+
+    def test_home_feed_get_cached_sections(self):
+        self.client.get('/books/home')
+        Book.objects.filter(id=1).update(title='바뀐 책')
+
+        with self.assertNumQueries(3):  # 책이 없어 캐시되지 않은 today, bestSeller, recommend 섹션만 다시 조회
+            response = self.client.get('/books/home')
+        self.assertEqual(response.json()['sections']['recently']['oneMonthBook'][0]['title'], '지난 책')
+
+    @override_settings(HOME_FEED_WORKERS=2, HOME_FEED_TIMEOUT_SECONDS=0.2)
+    def test_home_feed_get_partial_result(self):
+        sections = {'slow':SlowSectionView, 'fast':FastSectionView, 'broken':BrokenSectionView}
+        with patch.dict('book.views.HOME_SECTIONS', sections, clear=True):
+            response = self.client.get('/books/home')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'message'  : 'SUCCESS',
+            'sections' : {'fast':{'fastBook':[1]}},
+            'timedOut' : ['slow'],
+            'failed'   : ['broken'],
+        })
+
+
+    @override_settings(HOME_FEED_WORKERS=2, HOME_FEED_TIMEOUT_SECONDS=0.1)
+    def test_home_feed_get_in_flight_section_not_resubmitted(self):
+        SlowSectionView.calls = 0
+        with patch.dict('book.views.HOME_SECTIONS', {'slow':SlowSectionView}, clear=True):
+            for _ in range(3):
+                self.assertEqual(self.client.get('/books/home').json()['timedOut'], ['slow'])
+            time.sleep(0.6)
+
+        self.assertEqual(SlowSectionView.calls, 1)
+
+
+class LandingPageTest(TestCase):
+    def setUp(self):
+        cover_wall.mark_dirty()
+        for i in range(1, 11):
+            Book.objects.create(id=i, title=f'title_{i}', image_url=f'image_{i}' if i != 10 else '',
+                                company='company', author='author', page=100, publication_date='2020-12-01')
+
+    def test_landing_page_get_without_query(self):
+        self.client.get('/books/landing_page')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/books/landing_page', {'maximum':4})
+
+        books = response.json()['books']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(books), 4)
+        self.assertEqual(len({book['id'] for book in books}), 4)
+        for book in books:
+            self.assertEqual(book['image_url'], f'image_{book["id"]}')
+
+    def test_landing_page_get_seeded_pages(self):
+        first  = self.client.get('/books/landing_page', {'maximum':5, 'seed':7}).json()['books']
+        second = self.client.get('/books/landing_page', {'maximum':5, 'seed':7, 'offset':5}).json()['books']
+        again  = self.client.get('/books/landing_page', {'maximum':5, 'seed':7}).json()['books']
+
+        self.assertEqual(first, again)
+        self.assertEqual(len(second), 4)
+        self.assertEqual(sorted(book['id'] for book in first + second), list(range(1, 10)))
+
+    @override_settings(LANDING_PAGE_MAXIMUM=3)
+    def test_landing_page_get_maximum_capped(self):
+        response = self.client.get('/books/landing_page', {'maximum':1000})
+
+        self.assertEqual(len(response.json()['books']), 3)
+
+    def test_landing_page_get_refreshed_on_book_change(self):
+        self.client.get('/books/landing_page')
+        Book.objects.get(id=10).delete()
+        Book.objects.filter(id=1).first().delete()
+
+        # 커밋 전에는 다시 읽지 않고 커밋 후에 다시 읽는다
+        self.assertFalse(cover_wall.dirty)
+        run_on_commit_callbacks()
+        response = self.client.get('/books/landing_page', {'maximum':100})
+        self.assertEqual(sorted(book['id'] for book in response.json()['books']), list(range(2, 10)))
+
+    def test_landing_page_get_invalid_request(self):
+        response = self.client.get('/books/landing_page', {'maximum':'many'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_REQUEST'})
+
+
+@override_settings(RESPONSE_CACHE_TTL={})
+class RankingTest(TestCase):
+    def setUp(self):
+        Keyword.objects.bulk_create([Keyword(id=2, name='요즘 뜨는'), Keyword(id=3, name='힐링')])
+        Book.objects.bulk_create([Book(id=book_id, title=f'title_{book_id}', image_url='', company='company',
+                                       author='author', page=100, publication_date='2020-12-01',
+                                       keyword_id=keyword_id)
+                                  for book_id, keyword_id in ((1, 2), (2, 2), (3, 3))])
+        User.objects.bulk_create([User(id=user_id, nickname=f'user_{user_id}') for user_id in range(1, 4)])
+
+    def test_bestseller_get_ranked_by_keyword_in_one_query(self):
+        for user_id, book_id in ((1, 2), (2, 2), (1, 1), (1, 3), (2, 3), (3, 3)):
+            UserBook.objects.create(user_id=user_id, book_id=book_id, page=10, time=5)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/books/bestseller', {'keyword':2})
+
+        self.assertEqual([book['id'] for book in response.json()['bestSellerBook']], [2, 1])
+
+    def test_recommend_get_ranked_by_keyword_in_one_query(self):
+        for user_id, book_id in ((1, 1), (2, 1), (3, 2), (1, 3), (2, 3), (3, 3)):
+            library = Library.objects.create(user_id=user_id, name=f'user_{user_id}', image_url='')
+            LibraryBook.objects.create(library=library, user_id=user_id, book_id=book_id, book_title='title',
+                                       book_author='author', book_publication_date='2020-12-01')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/books/recommend', {'keyword':2})
+
+        self.assertEqual([book['id'] for book in response.json()['recommendBook']], [1, 2])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['versions'].clear()
+        Book.objects.create(id=1, title='지난 책', image_url='image_1', company='company', author='author',
+                            page=100, publication_date=date.today() - timedelta(days=3))
+
+    def tearDown(self):
+        cache.clear()
+        caches['versions'].clear()
+
+    def test_conditional_get_not_modified_without_query(self):
+        response = self.client.get('/books/recently')
+        etag     = response['ETag']
+        count    = metrics.get_counter('conditional_get_not_modified_total', view='RecentlyBookView')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/books/recently', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(metrics.get_counter('conditional_get_not_modified_total', view='RecentlyBookView'), count + 1)
+        self.assertIn('conditional_get_not_modified_total{view="RecentlyBookView"}',
+                      self.client.get('/metrics').content.decode())
+
+    def test_conditional_get_modified_after_book_write(self):
+        etag = self.client.get('/books/recently')['ETag']
+        Book.objects.filter(id=1).first().save()
+
+        response = self.client.get('/books/recently', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_conditional_get_etag_per_query(self):
+        etag     = self.client.get('/books/recently')['ETag']
+        response = self.client.get('/books/recently', {'limit':1}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CACHES=dict(settings.CACHES, versions={
+        'BACKEND' : 'django.core.cache.backends.locmem.LocMemCache',
+    }))
+    def test_conditional_get_off_with_process_local_versions(self):
+        response = self.client.get('/books/recently')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.client.get('/books/recently', HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_conditional_get_no_etag_on_error(self):
+        response = self.client.get('/books/commingsoon')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class FastJsonResponseTest(SimpleTestCase):
+    PAYLOAD = {
+        "bestSellerBook" : [JsonFragment({"id":1, "title":"안녕 고맛나", "image":"image_1", "author":"고수희"})] * 3,
+        "date"           : datetime(2020, 12, 1, 10, 30, 15, 123456),
+        "counts"         : {1:2},
+    }
+    EXPECTED = {
+        "bestSellerBook" : [{"id":1, "title":"안녕 고맛나", "image":"image_1", "author":"고수희"}] * 3,
+        "date"           : "2020-12-01T10:30:15.123",
+        "counts"         : {"1":2},
+    }
+
+    def test_fast_json_response_same_as_json_response(self):
+        response = FastJsonResponse(self.PAYLOAD, status=201)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), self.EXPECTED)
+        self.assertEqual(json.loads(response.content), json.loads(JsonResponse(self.EXPECTED).content))
+
+    def test_fast_json_response_without_orjson(self):
+        with patch('share.responses.orjson', None):
+            content = FastJsonResponse(self.PAYLOAD).content
+
+        self.assertEqual(json.loads(content), self.EXPECTED)
+
+    def test_fast_json_response_fragment_not_reencoded(self):
+        fragment = JsonFragment({"id":1}, encoded=b'{"id":1,"cached":true}')
+
+        with patch('share.responses.orjson', None):
+            self.assertEqual(FastJsonResponse({"book":fragment}).content, b'{"book":{"id":1,"cached":true}}')
+
+    def test_fast_json_response_not_safe(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+        self.assertEqual(json.loads(FastJsonResponse([1, 2], safe=False).content), [1, 2])
+
+    def test_fast_json_response_rendered_lazily(self):
+        response = FastJsonResponse({"book":1})
+        response.data['book'] = 2
+
+        self.assertEqual(json.loads(response.content), {"book":2})
+        self.assertTrue(response.is_rendered)
+
+
+class MessagePackTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Book.objects.create(id=1, title='지난 책', image_url='image_1', company='company', author='author',
+                            page=100, publication_date=date.today() - timedelta(days=3))
+
+    def test_msgpack_get_same_as_json(self):
+        json_response    = self.client.get('/books/recently')
+        msgpack_response = self.client.get('/books/recently', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(msgpack_response.status_code, 200)
+        self.assertEqual(msgpack_response['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', msgpack_response['Vary'])
+        self.assertIn('Accept', json_response['Vary'])
+        self.assertEqual(msgpack.unpackb(msgpack_response.content), json_response.json())
+        self.assertNotEqual(msgpack_response['ETag'], json_response['ETag'])
+
+    def test_msgpack_get_dates_as_json_strings(self):
+        response = self.client.get('/books/1', {'fields':'publication_date'}, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(msgpack.unpackb(response.content)['book_detail'],
+                         self.client.get('/books/1', {'fields':'publication_date'}).json()['book_detail'])
+
+    def test_msgpack_get_json_preferred(self):
+        response = self.client.get('/books/recently', HTTP_ACCEPT='application/json, application/msgpack;q=0.5')
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['oneMonthBook'][0]['id'], 1)
+
+    def test_msgpack_get_error_response(self):
+        response = self.client.get('/books/404', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(msgpack.unpackb(response.content), {'message':'NOT_EXIST_BOOK'})
+
+
+# AsyncViewTest 용 URLconf : 기존 URL 은 그대로 두고 async view 를 /async/... 에 붙인다
+urlpatterns = [
+    path('', include('suwee.urls')),
+    path('async/recently', ASYNC_BOOK_VIEWS[RecentlyBookView]),
+    path('async/commingsoon', ASYNC_BOOK_VIEWS[CommingSoonBookView]),
+    path('async/search', ASYNC_BOOK_VIEWS[SearchBookView]),
+    path('async/bestseller', ASYNC_BOOK_VIEWS[BestSellerBookView]),
+]
+
+
+def slow_recently_payload(self, params):
+    time.sleep(0.3)
+    return {"oneMonthBook": []}, 200
+
+
+@override_settings(ROOT_URLCONF='book.tests')
+class AsyncViewTest(TransactionTestCase):
+    # async view 는 DB 를 별도 thread 에서 조회하므로 TestCase 의 transaction 밖에서 데이터를 넣는다
+    def setUp(self):
+        cache.clear()
+        Book.objects.create(id=1, title='지난 책', image_url='image_1', company='늘빛출판사', author='author',
+                            page=100, publication_date=date.today() - timedelta(days=3))
+        Book.objects.create(id=2, title='나올 책', image_url='image_2', company='company', author='고수희',
+                            page=100, publication_date=date.today() + timedelta(days=3))
+        User.objects.create(id=1, nickname='test1')
+        UserBook.objects.create(user_id=1, book_id=1, page=10, time=10)
+
+    def tearDown(self):
+        cache.clear()
+
+    async def test_async_view_get_same_as_sync(self):
+        for name, params in (('recently', {}), ('commingsoon', {}), ('search', {'author':'고수희'}),
+                             ('search', {}), ('bestseller', {'keyword':0})):
+            # django 3.1 AsyncClient 는 data 를 query string 으로 넘기지 않아 URL 에 붙인다
+            response      = await self.async_client.get(f'/async/{name}?{urlencode(params)}')
+            sync_response = await sync_to_async(self.client.get)(f'/books/{name}', params)
+
+            self.assertEqual(response.status_code, sync_response.status_code)
+            self.assertEqual(response.json(), sync_response.json())
+
+    async def test_async_view_not_modified(self):
+        etag  = (await self.async_client.get('/async/recently'))['ETag']
+        count = metrics.get_counter('conditional_get_not_modified_total', view='RecentlyBookView')
+
+        # django 3.1 AsyncClient 는 header 를 ASGI scope 로 넘긴다
+        response = await self.async_client.get(
+            '/async/recently', headers=[(b'host', b'testserver'), (b'if-none-match', etag.encode())])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(metrics.get_counter('conditional_get_not_modified_total', view='RecentlyBookView'), count + 1)
+
+    @override_settings(QUERY_COUNT_HEADER=True, SLOW_QUERY_THRESHOLD_MS=0)
+    async def test_async_view_request_context_in_db_thread(self):
+        with patch.object(slow_query_log, 'enqueue') as enqueue:
+            response = await self.async_client.get('/async/recently')
+
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertEqual(enqueue.call_args_list[0][0][0]['view'], 'book.async_views.RecentlyBookView')
+
+    async def test_async_view_concurrent(self):
+        with patch.object(RecentlyBookView, 'get_payload', slow_recently_payload):
+            started   = time.perf_counter()
+            responses = await asyncio.gather(*[
+                self.async_client.get(f'/async/recently?limit={limit}') for limit in range(4)])
+            elapsed   = time.perf_counter() - started
+
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        self.assertLess(elapsed, 0.3 * 2)  # 차례로 처리하면 1.2초
+
+    async def test_async_view_method_not_allowed(self):
+        response = await self.async_client.post('/async/recently')
+
+        self.assertEqual(response.status_code, 405)
@@ -1,9 +1,11 @@
+from django.conf     import settings
 from django.urls     import path
 
 from .views          import (
     TodayBookView,
     RecentlyBookView,
     BookDetailView,
+    BookBatchView,
     SearchBookView,
     CommingSoonBookView,
     BestSellerBookView,
@@ -11,17 +13,29 @@ from .views          import (
     ReviewView,
     ReviewLikeView,
     LandingPageView,
+    HomeFeedView,
 )
+from .async_views    import ASYNC_BOOK_VIEWS
+
+
+def get_view(view_class):
+    # ASGI 로 띄우면(ASYNC_VIEWS) 읽기 전용 조회는 async view 로 처리한다 (book/async_views.py)
+    if settings.ASYNC_VIEWS and view_class in ASYNC_BOOK_VIEWS:
+        return ASYNC_BOOK_VIEWS[view_class]
+    return view_class.as_view()
+
 
 urlpatterns = [
-    path('/today', TodayBookView.as_view()),
-    path('/recently', RecentlyBookView.as_view()),
+    path('/today', get_view(TodayBookView)),
+    path('/recently', get_view(RecentlyBookView)),
     path('/<int:book_id>', BookDetailView.as_view()),
-    path('/bestseller', BestSellerBookView.as_view()),
-    path('/search', SearchBookView.as_view()),
-    path('/commingsoon', CommingSoonBookView.as_view()),
+    path('/batch', BookBatchView.as_view()),
+    path('/bestseller', get_view(BestSellerBookView)),
+    path('/search', get_view(SearchBookView)),
+    path('/commingsoon', get_view(CommingSoonBookView)),
     path('/<int:book_id>/review',ReviewView.as_view()),
     path('/reviewlike', ReviewLikeView.as_view()),
-    path('/recommend', RecommendBookView.as_view()),
-    path('/landing_page', LandingPageView.as_view()),
+    path('/recommend', get_view(RecommendBookView)),
+    path('/landing_page', get_view(LandingPageView)),
+    path('/home', HomeFeedView.as_view()),
 ]
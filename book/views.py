@@ -1,11 +1,16 @@
 import json
 import datetime
+import threading
+from functools        import lru_cache
+from collections      import Counter
+from concurrent       import futures
 from datetime         import timedelta, date
 
+from django.conf      import settings
 from django.views     import View
 from django.db        import transaction
-from django.db.models import Q, Count
-from django.http      import JsonResponse
+from django.core.cache import cache
+from django.db.models import Q, Count, Sum
 
 from .models          import (
     Book,
@@ -19,10 +24,77 @@ from library.models   import (
         Library,
         LibraryBook,
 )
-from user.models      import UserBook
+from user.models      import UserBook, DailyBookReading
+
+from .modules.numeric import get_reading_numeric, get_reading_numeric_bulk
+from .modules.covers  import cover_wall
+from share.decorators import check_auth_decorator, conditional_get_decorator
+from share.responses  import FastJsonResponse, JsonFragment
+from share.response_cache import cached_payload
+from share.request_context import bind_context
+from share.db_connections import run_with_connections
+
+
+@lru_cache(maxsize=4096)
+def get_book_card(book_id, title, image_url, author):
+    # 책 카드는 여러 리스트에서 반복되므로 인코딩 결과를 재사용한다
+    # 책 정보가 바뀌면 인자가 달라지므로 따로 무효화할 필요가 없다
+    return JsonFragment({
+        "id"     : book_id,  # 책 id
+        "title"  : title,  # 책 제목
+        "image"  : image_url,  # 책 표지 이미지
+        "author" : author  # 책 저자
+    })
+
+
+def count_by_book(counts, queryset):
+    # shard 하나의 queryset 을 책별로 센 결과를 counts 에 더한다
+    counts.update(dict(queryset.values_list('book_id').annotate(count=Count('id')).order_by()))
+    return counts
+
+
+def get_reader_counts(book_ids=None):
+    # 책별 독자 수 : user_books 가 사용자별 shard 에 나뉘어 있으므로 shard 마다 센 뒤 합친다 (scatter-gather)
+    def count(user_books):
+        if book_ids is not None:
+            user_books = user_books.filter(book_id__in=book_ids)
+        return count_by_book(Counter(), user_books)
+
+    return sum(UserBook.objects.scatter(count), Counter())
+
+
+def get_ranked_books(counts, books, limit):
+    """
+    counts(책 id: 수)가 큰 순서로 books 조건에 맞는 책을 limit 권 조회
+
+    shard 에는 책 테이블이 없어 keyword 조건은 합친 뒤 default 에서 건다.
+    순위대로 끊어서 조회하므로 조건에 맞는 책이 앞쪽에 많으면 쿼리 한 번으로 끝난다.
+    """
+    ranked     = [book_id for book_id, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+    chunk_size = max(limit * 5, 100)
+    result     = []
+    for start in range(0, len(ranked), chunk_size):
+        chunk  = ranked[start:start + chunk_size]
+        found  = {book['id']: book for book in books.filter(id__in=chunk).values('id', 'title', 'image_url', 'author')}
+        result += [found[book_id] for book_id in chunk if book_id in found]
+        if len(result) >= limit:
+            break
+    return result[:limit]
+
+
+def get_keyword_tags(params, default):
+    # 베스트셀러/추천 리스트는 keyword 별 책에 따라 달라진다 (keyword 가 2~6 이 아니면 전체 책)
+    try:
+        keyword = int(params.get('keyword', default))
+    except ValueError:
+        return ['books']
+    return [f'keyword:{keyword}'] if keyword in range(2,7) else ['books']
+
+
+def get_book_tags(books):
+    # 리스트에 나온 책 : 독자 수, 서재 담기가 바뀌면 순위가 바뀐다 (새로 순위에 드는 책은 TTL 후 반영)
+    return [f'book:{book.value["id"] if isinstance(book, JsonFragment) else book["id"]}' for book in books]
 
-from .modules.numeric import get_reading_numeric
-from share.decorators import check_auth_decorator
 
 class TodayBookView(View):
     """
@@ -38,14 +110,15 @@ class TodayBookView(View):
 
     """
 
-    def get(self, request):
+    @cached_payload(tags=('books', 'today', 'reviews'))
+    def get_payload(self, params):
 
         today      = date.today().strftime('%Y-%m-%d')
         today_book = Book.objects.prefetch_related(
             'review_set','review_set__like_set').filter(today__pick_date=today)
 
         if not today_book.exists():
-            return JsonResponse({"message":"NO_BOOK"}, status = 400)
+            return {"message":"NO_BOOK"}, 400
 
         today_review = today_book.first().review_set.prefetch_related(
             'like_set').values('user__nickname', 'user__image_url',
@@ -64,7 +137,12 @@ class TodayBookView(View):
                 else '',
             "reviewContent"  : today_review.get('contents'),
         } for book in today_book]
-        return JsonResponse({"todayBook":book}, status = 200)
+        return {"todayBook":book}, 200
+
+    @conditional_get_decorator('books', 'today', 'reviews')
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
 
 
 class RecentlyBookView(View):
@@ -82,50 +160,195 @@ class RecentlyBookView(View):
 
     """
 
-    def get(self, request):
-        day    = request.GET.get('day', '30')  # 조회할 출간 일자 : 기본값 30일
-        limit  = request.GET.get('limit', '10')  # 출력할 책 리스트의 갯수 : 기본값 10일
+    @cached_payload(tags=('books',))
+    def get_payload(self, params):
+        day    = params.get('day', '30')  # 조회할 출간 일자 : 기본값 30일
+        limit  = params.get('limit', '10')  # 출력할 책 리스트의 갯수 : 기본값 10일
 
         today          = date.today()  # 오늘 날짜 조회
         previous_days  = today - timedelta(days=int(day))  # 오늘 날짜 기준 조회할 출간일자
 
-        books = [{
-            "id"     : book.id,  # 책 id
-            "title"  : book.title,  # 책 타이틀
-            "image"  : book.image_url,  # 책 표지 이미지
-            "author" : book.author  # 책 저자
-            } for book in (Book.objects.filter(
+        books = [get_book_card(book.id, book.title, book.image_url, book.author)
+            for book in (Book.objects.filter(
                 publication_date__range=[previous_days, today])
                 .order_by('-publication_date')[:int(limit)])]
 
         if not books:
-            return JsonResponse({"message": "NO_BOOKS"}, status=400)
-        return JsonResponse({"oneMonthBook": books}, status=200)
+            return {"message": "NO_BOOKS"}, 400
+        return {"oneMonthBook": books}, 200
+
+    @conditional_get_decorator('books')
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
+
+
+# 책 상세 정보로 내보낼 수 있는 필드 (fields= 로 일부만 요청 가능)
+BOOK_DETAIL_FIELDS = (
+    'title',
+    'subtitle',
+    'image_url',
+    'company',
+    'author',
+    'contents',
+    'company_review',
+    'page',
+    'publication_date',
+    'description',
+    'category',
+    'review_count',
+    'reder',
+    'numeric',
+)
+# 별도 조회로 계산하는 필드
+BOOK_COMPUTED_FIELDS = ('category', 'review_count', 'reder', 'numeric')
+
+
+def get_book_fields(value):
+    # fields=title,page 형태, 없으면 전체 필드
+    if not value:
+        return BOOK_DETAIL_FIELDS
+
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    if not requested or requested - set(BOOK_DETAIL_FIELDS):
+        raise ValueError(value)
+    return tuple(field for field in BOOK_DETAIL_FIELDS if field in requested)
+
+
+def get_book_queryset(fields):
+    # 요청한 컬럼만 조회 (contents, company_review, description 은 수 KB 씩 되므로)
+    columns  = [field for field in fields if field not in BOOK_COMPUTED_FIELDS]
+    queryset = Book.objects.only('id', 'category_id', *columns)
+    if 'category' in fields:
+        queryset = queryset.select_related('category').only('id', 'category_id', 'category__name', *columns)
+    return queryset
+
+
+def get_book_detail(book, review_count, reader_count, numeric, fields=BOOK_DETAIL_FIELDS):
+    computed = {
+        'review_count' : review_count,
+        'reder'        : reader_count,
+        'numeric'      : numeric,
+    }
+
+    book_detail = {}
+    for field in fields:
+        if field == 'category':
+            book_detail[field] = book.category.name if book.category_id else None
+        elif field in computed:
+            book_detail[field] = computed[field]
+        else:
+            book_detail[field] = getattr(book, field)
+    return book_detail
+
 
 class BookDetailView(View):
-    def get(self, request, book_id):
+    """
+    책 상세 정보 조회
+
+    Args:
+        fields : 필요한 필드만 쉼표로 구분해 요청 (예: fields=title,page,numeric), 없으면 전체 필드
+
+    Note:
+        요청하지 않은 numeric, review_count, reder 는 계산하지 않는다.
+    """
+
+    @cached_payload(tags=lambda params, book_id: [f'book:{book_id}', 'reading_rollup'])
+    def get_payload(self, params, book_id):
+        try:
+            fields = get_book_fields(params.get('fields'))
+        except ValueError:
+            return {'message':'INVALID_FIELDS'}, 400
+
         try :
-            data = get_reading_numeric(book_id)
-            book = Book.objects.select_related('category').prefetch_related('review_set').get(id=book_id)
-            book_detail = {
-                'title'            : book.title,
-                'subtitle'         : book.subtitle,
-                'image_url'        : book.image_url,
-                'company'          : book.company,
-                'author'           : book.author,
-                'contents'         : book.contents,
-                'company_review'   : book.company_review,
-                'page'             : book.page,
-                'publication_date' : book.publication_date,
-                'description'      : book.description,
-                'category'         : book.category.name,
-                'review_count'     : book.review_set.count(),
-                'reder'            : book.userbook_set.count(),
-                'numeric'          : data
-                }
-            return JsonResponse({'book_detail':book_detail, 'like':False}, status=200)
+            book = get_book_queryset(fields).get(id=book_id)
         except Book.DoesNotExist:
-            return JsonResponse({'message':'NOT_EXIST_BOOK'}, status=400)
+            return {'message':'NOT_EXIST_BOOK'}, 400
+
+        review_count = book.review_set.count() if 'review_count' in fields else None
+        reader_count = get_reader_counts([book.id]).get(book.id, 0) if 'reder' in fields else None
+        data         = get_reading_numeric(book_id) if 'numeric' in fields else None
+        book_detail  = get_book_detail(book, review_count, reader_count, data, fields)
+        return {'book_detail':book_detail, 'like':False}, 200
+
+    def get(self, request, book_id):
+        payload, status = self.get_payload(request.GET, book_id)
+        return FastJsonResponse(payload, status=status)
+
+
+def get_batch_ids(params):
+    # ids=1,2,3 (ids 를 여러 번 보내도 됨), 중복은 처음 순서대로 하나만
+    return list(dict.fromkeys(
+        int(book_id) for value in params.getlist('ids') for book_id in value.split(',') if book_id))
+
+
+def get_batch_tags(params):
+    try:
+        book_ids = get_batch_ids(params)
+    except ValueError:
+        return []
+    if len(book_ids) > settings.BOOK_BATCH_MAX:
+        return []
+    return [f'book:{book_id}' for book_id in book_ids] + ['reading_rollup']
+
+
+class BookBatchView(View):
+    """
+    여러 책 상세 정보 한 번에 조회 (홈 화면 카드용)
+
+    ids=1,2,3 으로 최대 BOOK_BATCH_MAX 권까지 조회하며, 책 수와 관계없이
+    책 / 리뷰 수 / 독자 수 / 완독 수치(책별, 카테고리별)를 group by 조회 5번으로 만든다.
+    fields= 는 BookDetailView 와 같고, 요청하지 않은 계산 필드의 조회는 생략한다.
+
+    Returns: 요청 순서대로 BookDetailView 와 같은 형태의 상세 정보 리스트, 없는 책 id 리스트
+
+    """
+
+    @cached_payload(tags=get_batch_tags)
+    def get_payload(self, params):
+        try:
+            book_ids = get_batch_ids(params)
+        except ValueError:
+            return {'message':'INVALID_REQUEST'}, 400
+
+        try:
+            fields = get_book_fields(params.get('fields'))
+        except ValueError:
+            return {'message':'INVALID_FIELDS'}, 400
+
+        if not book_ids:
+            return {'message':'INVALID_REQUEST'}, 400
+        if len(book_ids) > settings.BOOK_BATCH_MAX:
+            return {'message':'TOO_MANY_BOOKS'}, 400
+
+        books         = get_book_queryset(fields).in_bulk(book_ids)
+        review_counts = {}
+        reader_counts = {}
+        numerics      = {}
+        if 'review_count' in fields:
+            review_counts = dict(Review.objects.filter(book_id__in=books).values(
+                'book_id').annotate(count=Count('id')).values_list('book_id', 'count'))
+        if 'reder' in fields:
+            reader_counts = get_reader_counts(list(books))
+        if 'numeric' in fields:
+            numerics = get_reading_numeric_bulk({book.id: book.category_id for book in books.values()})
+
+        book_list = [{
+            'id'          : book_id,
+            'book_detail' : get_book_detail(books[book_id], review_counts.get(book_id, 0),
+                                            reader_counts.get(book_id, 0), numerics.get(book_id), fields),
+            'like'        : False,
+        } for book_id in book_ids if book_id in books]
+
+        return {
+            'books'     : book_list,
+            'not_exist' : [book_id for book_id in book_ids if book_id not in books],
+        }, 200
+
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
+
 
 class CommingSoonBookView(View):
     """
@@ -141,9 +364,10 @@ class CommingSoonBookView(View):
 
     """
 
-    def get(self, request):
-        day    = request.GET.get('day', '30')  # 조회할 출간 일자 : 기본값 30일
-        limit  = request.GET.get('limit', '10')  # 츨력할 책 리스트 갯수: 기본값 10일
+    @cached_payload(tags=('books',))
+    def get_payload(self, params):
+        day    = params.get('day', '30')  # 조회할 출간 일자 : 기본값 30일
+        limit  = params.get('limit', '10')  # 츨력할 책 리스트 갯수: 기본값 10일
 
         today            = date.today()  # 오늘 날짜 조회
         next_publication = today + timedelta(days=int(day))  # 조회할 다음 출간일
@@ -163,18 +387,25 @@ class CommingSoonBookView(View):
             ('publication_date')[:int(limit)])]  # 출간일 순으로 오름차순으로 출력
 
         if not book_list:
-            return JsonResponse({"message": "NO_BOOKS"}, status=400)
-        return JsonResponse({"commingSoonBook": book_list}, status=200)
+            return {"message": "NO_BOOKS"}, 400
+        return {"commingSoonBook": book_list}, 200
+
+    @conditional_get_decorator('books')
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
 
 
 class SearchBookView(View):
-    def get(self, request):
+    @cached_payload(tags=('books',))
+    def get_payload(self, params):
         conditions = {
-                'author__icontains'  : request.GET.get('author', ''),
-                'title__icontains'   : request.GET.get('title', ''),
-                'company__icontains' : request.GET.get('company', ''),
+                'author__icontains'  : params.get('author', ''),
+                'title__icontains'   : params.get('title', ''),
+                'company__icontains' : params.get('company', ''),
         }
 
+        or_conditions = Q()
         for key, value in conditions.items():
             if value:
                 or_conditions.add(Q(**{key: value}), Q.OR)
@@ -189,9 +420,13 @@ class SearchBookView(View):
                                 'company'
                                 )
                         )
-            return JsonResponse({"message":"SUCCESS", "books":json_data}, status=200)
+            return {"message":"SUCCESS", "books":json_data}, 200
+
+        return {"message":"INVALID_REQUEST"}, 400
 
-        return JsonResponse({"message":"INVALID_REQUEST"}, status=400)
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
 
 class ReviewView(View):
     @check_auth_decorator
@@ -207,12 +442,13 @@ class ReviewView(View):
                     book_id  = book_id,
                     contents = contents
                 )
-                return JsonResponse({'message':'SUCCESS'}, status=200)
-            return JsonResponse({'message':'LONG_CONTENTS'}, status=400)
+                return FastJsonResponse({'message':'SUCCESS'}, status=200)
+            return FastJsonResponse({'message':'LONG_CONTENTS'}, status=400)
         except KeyError:
-            return JsonResponse({'message':'KEY_ERROR'}, status=400)
+            return FastJsonResponse({'message':'KEY_ERROR'}, status=400)
 
-    def get(self, request, book_id):
+    @cached_payload(tags=lambda params, book_id: [f'book:{book_id}'])
+    def get_payload(self, params, book_id):
         try:
             reviews = Book.objects.get(id=book_id).review_set.all()
             review_list = [{
@@ -222,9 +458,13 @@ class ReviewView(View):
                 'content'    : review.contents,
                 'created_at' : review.created_at.strftime('%Y.%m.%d'),
             } for review in reviews ]
-            return JsonResponse({'review_list':review_list}, status=200)
+            return {'review_list':review_list}, 200
         except Review.DoesNotExist:
-            return JsonResponse({'message':'NOT_EXIST_REVIEW'}, status=400)
+            return {'message':'NOT_EXIST_REVIEW'}, 400
+
+    def get(self, request, book_id):
+        payload, status = self.get_payload(request.GET, book_id)
+        return FastJsonResponse(payload, status=status)
 
     @check_auth_decorator
     def delete(self, request, book_id):
@@ -234,10 +474,10 @@ class ReviewView(View):
             review    = Review.objects.get(id=review_id)
             if review.user_id == user_id:
                 review.delete()
-                return JsonResponse({'message':'SUCCESS'}, status=200)
-            return JsonResponse({'message':'UNAUTHORIZED'}, status=400)
+                return FastJsonResponse({'message':'SUCCESS'}, status=200)
+            return FastJsonResponse({'message':'UNAUTHORIZED'}, status=400)
         except Review.DoesNotExist:
-            return JsonResponse({'message':'NOT_EXIST_REVIEW'}, status=400)
+            return FastJsonResponse({'message':'NOT_EXIST_REVIEW'}, status=400)
 
 class ReviewLikeView(View):
     @check_auth_decorator
@@ -250,11 +490,11 @@ class ReviewLikeView(View):
             if Review.objects.filter(id=review_id).exists():
                 like = Like.objects.get(user_id=user_id, review_id=review_id)
                 like.delete()
-                return JsonResponse({'message':'CANCEL', 'like':False}, status=200)
-            return JsonResponse({'message':'NOT_EXIST_REVIEW'}, status=400)
+                return FastJsonResponse({'message':'CANCEL', 'like':False}, status=200)
+            return FastJsonResponse({'message':'NOT_EXIST_REVIEW'}, status=400)
         except Like.DoesNotExist:
             Like.objects.create(user_id=user_id, review_id=review_id)
-            return JsonResponse({'message':'SUCCESS'}, status=200)
+            return FastJsonResponse({'message':'SUCCESS'}, status=200)
 
 class BestSellerBookView(View):
     """
@@ -270,31 +510,61 @@ class BestSellerBookView(View):
 
     """
 
-    def get(self, request):
-        keyword = request.GET.get('keyword', '1')  # 태그의 번호
-        limit   = request.GET.get('limit', '10')  # 출력할 책의 갯수
+    def get_from_rollup(self, keyword, limit):
+        # 일간 집계(daily_book_readings)의 신규 독자 수 합계 기준
+        if keyword in range(2,7):
+            readings = DailyBookReading.objects.filter(book__keyword_id=keyword)
+        else:
+            readings = DailyBookReading.objects.filter(book__keyword_id__gte=2)
+
+        books = readings.values('book_id', 'book__title', 'book__image_url',
+                                'book__author').annotate(count=Sum(
+                                    'readers')).order_by('-count')[:limit]
+        if not books:
+            return {"message": "NO_BOOKS"}, 400
+
+        book_list = [get_book_card(book['book_id'], book['book__title'],
+                                   book['book__image_url'], book['book__author']) for book in books]
+        return {"bestSellerBook":book_list}, 200
+
+    @cached_payload(tags=lambda params: get_keyword_tags(params, '1'),
+                    result_tags=lambda payload: get_book_tags(payload['bestSellerBook']))
+    def get_payload(self, params):
+        keyword = params.get('keyword', '1')  # 태그의 번호
+        limit   = params.get('limit', '10')  # 출력할 책의 갯수
+
+        if settings.READING_AGGREGATE_SOURCE == 'rollup':
+            return self.get_from_rollup(int(keyword), int(limit))
 
         if int(keyword) in range(2,7):
-           books = UserBook.objects.select_related('book').filter(
-               book__keyword_id=int(keyword)).annotate(count=Count(
-                   'book_id')).order_by('-count')[:int(limit)]
-           if not books:
-               return JsonResponse({"message": "NO_BOOKS"}, status=400)
+           books      = Book.objects.filter(keyword_id=int(keyword))
+           user_books = UserBook.objects.filter(book__keyword_id=int(keyword))
+        else:
+           books      = Book.objects.filter(keyword_id__gte=2)
+           user_books = UserBook.objects.filter(book__keyword_id__gte=2)
 
+        if settings.DATABASE_SHARDS:
+            # 사용자 서재(user_books)에 담긴 수 : shard 에는 책 테이블이 없어 shard 별로 책마다 세서 합친 뒤 keyword 조건에 맞는 책만 고른다
+            books = [{'book_id': book['id'], 'book__title': book['title'], 'book__image_url': book['image_url'],
+                      'book__author': book['author']} for book in get_ranked_books(get_reader_counts(), books, int(limit))]
         else:
-           books = UserBook.objects.select_related('book').filter(
-               book__keyword_id__gte=2).annotate(count=Count(
-                   'book_id')).order_by('-count')[:int(limit)]
-           if not books:
-               return JsonResponse({"message": "NO_BOOKS"}, status=400)
+            # 사용자 서재(user_books)에 담긴 수 : keyword 조건에 맞는 책만 DB 에서 책별로 세서 순위를 매긴다
+            books = user_books.values('book_id', 'book__title', 'book__image_url',
+                                      'book__author').annotate(count=Count(
+                                          'id')).order_by('-count', 'book_id')[:int(limit)]
+
+        if not books:
+            return {"message": "NO_BOOKS"}, 400
+
+        book_list = [get_book_card(book['book_id'], book['book__title'], book['book__image_url'], book['book__author'])
+                     for book in books]
+        return {"bestSellerBook":book_list}, 200
+
+    @conditional_get_decorator('books', 'user_books', 'reading_rollup')
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
 
-        book_list = [{
-            "id"     : book.book.id,  # 책 id
-            "title"  : book.book.title,  # 책 제목
-            "image"  : book.book.image_url,  # 책 표지 이미지
-            "author" : book.book.author  # 책 저자
-        } for book in books]
-        return JsonResponse ({"bestSellerBook":book_list}, status=200)
 
 class RecommendBookView(View):
     """
@@ -310,10 +580,11 @@ class RecommendBookView(View):
 
     """
 
-
-    def get(self, request):
-        keyword    = request.GET.get('keyword', '2')  # 태그 번호
-        limit      = request.GET.get('limit', '6')  # 출력할 책의 갯수
+    @cached_payload(tags=lambda params: get_keyword_tags(params, '2'),
+                    result_tags=lambda payload: get_book_tags(payload['recommendBook']))
+    def get_payload(self, params):
+        keyword    = params.get('keyword', '2')  # 태그 번호
+        limit      = params.get('limit', '6')  # 출력할 책의 갯수
 
         today_iso  = datetime.datetime.now().isocalendar()
         year       = today_iso[0]  # 현재년도
@@ -322,33 +593,176 @@ class RecommendBookView(View):
         week_start = date.fromisocalendar(year, week, 1)  # 한 주의 가장 첫 시작 일요일 추출
         now        = datetime.datetime.now()  # 오늘 날짜
 
-        books = LibraryBook.objects.prefetch_related('book_set').filter(
-            created_at__range=[week_start, now], book__keyword_id=int(
-                keyword)).values('book_id', 'book__title', 'book__image_url',
-                                'book__author').annotate(count=Count(
-                    'book_id')).order_by('-count')[:int(limit)]
+        if settings.DATABASE_SHARDS:
+            # 이번 주에 서재에 담긴 수 : shard 에는 책 테이블이 없어 shard 별로 책마다 세서 합친 뒤 keyword 조건에 맞는 책만 고른다
+            counts = sum(LibraryBook.objects.scatter(lambda library_books: count_by_book(
+                Counter(), library_books.filter(created_at__range=[week_start, now]))), Counter())
+            books  = [{'book_id': book['id'], 'book__title': book['title'], 'book__image_url': book['image_url'],
+                       'book__author': book['author']} for book in get_ranked_books(
+                           counts, Book.objects.filter(keyword_id=int(keyword)), int(limit))]
+        else:
+            # 이번 주에 서재에 담긴 수 : keyword 조건에 맞는 책만 DB 에서 책별로 센다
+            books = LibraryBook.objects.filter(
+                created_at__range=[week_start, now], book__keyword_id=int(
+                    keyword)).values('book_id', 'book__title', 'book__image_url',
+                                    'book__author').annotate(count=Count(
+                        'id')).order_by('-count', 'book_id')[:int(limit)]
 
         book_list = [
             {
-                "id"     : book.get('book_id'),  # 책 id
-                "title"  : book.get('book__title'),  # 책 제목
-                "image"  : book.get('book__image_url'),  # 책 표지 이미지
-                "author" : book.get('book__author')  # 책 저자
+                "id"     : book['book_id'],  # 책 id
+                "title"  : book['book__title'],  # 책 제목
+                "image"  : book['book__image_url'],  # 책 표지 이미지
+                "author" : book['book__author']  # 책 저자
             } for book in books]
 
         if not book_list:
-            return JsonResponse({"message": "NO_BOOKS"}, status=400)
-        return JsonResponse({"recommendBook": book_list}, status=200)
+            return {"message": "NO_BOOKS"}, 400
+        return {"recommendBook": book_list}, 200
 
-class LandingPageView(View):
     def get(self, request):
-        maximum_count = int(request.GET.get('maximum', 60))
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
+
+
+class LandingPageView(View):
+    """
+    랜딩 페이지 표지 벽 조회
+
+    Args:
+        maximum : 출력할 표지 갯수 (LANDING_PAGE_MAXIMUM 까지)
+        seed    : 같은 순서로 섞인 페이지를 받기 위한 값, 없으면 매번 무작위
+        offset  : seed 와 함께 보낼 때 이어서 받을 위치
+
+    Note:
+        DB 를 조회하지 않고 미리 올려둔 표지 배열에서 골라낸다. (book/modules/covers.py)
+    """
+
+    def get_payload(self, params):
+        try:
+            maximum_count = min(int(params.get('maximum', 60)), settings.LANDING_PAGE_MAXIMUM)
+            offset        = int(params.get('offset', 0))
+            seed          = params.get('seed')
+            seed          = int(seed) if seed is not None else None
+        except ValueError:
+            return {"message":"INVALID_REQUEST"}, 400
+
+        if maximum_count < 0 or offset < 0:
+            return {"message":"INVALID_REQUEST"}, 400
 
         result = [
             {
-                'id'        : book.id,
-                'image_url' : book.image_url
-            } for book in Book.objects.exclude(image_url='')[0:maximum_count]
+                'id'        : book_id,
+                'image_url' : image_url
+            } for book_id, image_url in cover_wall.page(maximum_count, offset, seed)
         ]
 
-        return JsonResponse({"message":"SUCCESS", "books":result}, status=200)
+        return {"message":"SUCCESS", "books":result}, 200
+
+    def get(self, request):
+        payload, status = self.get_payload(request.GET)
+        return FastJsonResponse(payload, status=status)
+
+
+HOME_SECTIONS = {
+    'today'       : TodayBookView,
+    'recently'    : RecentlyBookView,
+    'commingSoon' : CommingSoonBookView,
+    'bestSeller'  : BestSellerBookView,
+    'recommend'   : RecommendBookView,
+    'landingPage' : LandingPageView,
+}
+
+home_lock     = threading.Lock()
+home_executor = None
+home_builds   = {}  # 섹션 이름 : 조립 중인 작업 (Future)
+
+
+def get_home_executor():
+    global home_executor
+
+    with home_lock:
+        if home_executor is None:
+            home_executor = futures.ThreadPoolExecutor(
+                max_workers=settings.HOME_FEED_WORKERS, thread_name_prefix='home-feed')
+    return home_executor
+
+
+def submit_home_section(name):
+    # 같은 섹션을 조립 중이면 새로 넣지 않고 그 작업을 같이 기다린다
+    # (제한 시간을 넘긴 작업이 끝나기 전에 요청마다 같은 작업이 queue 에 쌓이지 않도록)
+    executor = get_home_executor()
+    with home_lock:
+        task = home_builds.get(name)
+        if task is None:
+            # worker thread 의 DB 연결은 요청 thread 와 같이 확인 후 재사용한다 (share/db_connections.py)
+            task              = executor.submit(bind_context(run_with_connections), build_home_section, name)
+            home_builds[name] = task
+            task.add_done_callback(lambda task: finish_home_section(name, task))
+    return task
+
+
+def finish_home_section(name, task):
+    with home_lock:
+        if home_builds.get(name) is task:
+            del home_builds[name]
+
+
+def build_home_section(name):
+    # 섹션별 TTL 로 캐시하고, 실패 응답(NO_BOOKS 등)은 캐시하지 않는다
+    key     = f'home_section:{name}'
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload, status = HOME_SECTIONS[name]().get_payload({})
+    if status != 200:
+        return None
+    cache.set(key, payload, settings.HOME_FEED_SECTION_TTL.get(name, 60))
+    return payload
+
+
+class HomeFeedView(View):
+    """
+    홈 화면 섹션 묶음 조회
+
+    Returns:
+        sections : 섹션 이름별 기존 섹션 API 응답 (책이 없는 섹션은 None)
+        timedOut : 제한 시간 안에 조립하지 못한 섹션 이름 리스트
+        failed   : 조립 중 에러가 발생한 섹션 이름 리스트
+
+    Note:
+        섹션들은 thread pool 에서 동시에 조립된다.
+        제한 시간을 넘긴 섹션은 응답에서 빠지지만 작업은 계속 진행되어 캐시에 저장된다.
+        같은 섹션을 조립 중이면 다른 요청은 새 작업을 넣지 않고 그 작업을 기다린다.
+    """
+
+    def get(self, request):
+        sections  = {}
+        timed_out = []
+        failed    = []
+
+        if not settings.HOME_FEED_WORKERS:
+            for name in HOME_SECTIONS:
+                try:
+                    sections[name] = build_home_section(name)
+                except Exception:
+                    failed.append(name)
+        else:
+            tasks = {submit_home_section(name): name for name in HOME_SECTIONS}
+            done, not_done = futures.wait(tasks, timeout=settings.HOME_FEED_TIMEOUT_SECONDS)
+
+            for task in done:
+                name = tasks[task]
+                if task.exception() is not None:
+                    failed.append(name)
+                    continue
+                sections[name] = task.result()
+            timed_out = [tasks[task] for task in not_done]
+
+        return FastJsonResponse({
+            "message"  : "SUCCESS",
+            "sections" : {name: sections[name] for name in HOME_SECTIONS if name in sections},
+            "timedOut" : [name for name in HOME_SECTIONS if name in timed_out],
+            "failed"   : [name for name in HOME_SECTIONS if name in failed],
+        }, status=200)
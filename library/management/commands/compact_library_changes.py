@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand
+from django.db                   import transaction
+from django.db.models            import Max
+
+from library.models import LibraryChange, LibraryChangeCompaction
+
+
+class Command(BaseCommand):
+    help = '내 서재 변경 로그(library_changes)를 정리합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type    = int,
+            default = settings.LIBRARY_CHANGE_RETENTION_DAYS,
+            help    = '보관 기간(일). 이보다 오래된 변경은 삭제하고 해당 token 은 전체 재조회 대상이 됩니다.',
+        )
+
+    def handle(self, *args, **options):
+        # 1. 같은 (user, book) 의 이전 변경은 마지막 변경으로 대체되므로 언제든 삭제 가능
+        superseded = 0
+        user_ids   = LibraryChange.objects.values_list('user_id', flat=True).distinct()
+        for user_id in user_ids.iterator():
+            changes   = LibraryChange.objects.filter(user_id=user_id)
+            keep_ids  = list(changes.values('book_id').annotate(keep_id=Max('id')).values_list('keep_id', flat=True))
+            superseded += changes.exclude(id__in=keep_ids).delete()[0]
+
+        # 2. 보관 기간이 지난 변경은 watermark(token 인 seq) 를 남기고 삭제
+        expired = 0
+        cutoff  = datetime.now() - timedelta(days=options['days'])
+        LibraryChange.assign_sequence()
+        through = LibraryChange.objects.filter(
+            created_at__lt=cutoff, seq__isnull=False).order_by('-seq').values_list('seq', flat=True).first()
+        if through:
+            with transaction.atomic():
+                LibraryChangeCompaction.objects.create(compacted_through=through)
+                expired = LibraryChange.objects.filter(seq__lte=through).delete()[0]
+
+        self.stdout.write(f'deleted {superseded} superseded and {expired} expired changes')
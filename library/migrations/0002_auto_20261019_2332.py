@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-19 23:32
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_library_books(apps, schema_editor):
+    # 같은 서재에 중복으로 담긴 책은 가장 먼저 담은 row만 남긴다
+    LibraryBook = apps.get_model('library', 'LibraryBook')
+    keep_ids    = (LibraryBook.objects.values('library_id', 'book_id')
+                   .annotate(keep_id=Min('id')).values_list('keep_id', flat=True))
+
+    LibraryBook.objects.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_library_books, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='librarybook',
+            constraint=models.UniqueConstraint(fields=('library', 'book'), name='unique_library_book'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 3.1.3 on 2026-10-19 23:33
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_sort_keys(apps, schema_editor):
+    Book        = apps.get_model('book', 'Book')
+    Library     = apps.get_model('library', 'Library')
+    LibraryBook = apps.get_model('library', 'LibraryBook')
+    book        = Book.objects.filter(id=OuterRef('book_id'))
+
+    LibraryBook.objects.update(
+        user_id               = Subquery(Library.objects.filter(id=OuterRef('library_id')).values('user_id')[:1]),
+        book_title            = Subquery(book.values('title')[:1]),
+        book_author           = Subquery(book.values('author')[:1]),
+        book_publication_date = Subquery(book.values('publication_date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0002_auto_20201208_1316'),
+        ('user', '0002_auto_20261019_2331'),
+        ('library', '0002_auto_20261019_2332'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='librarybook',
+            name='book_author',
+            field=models.CharField(max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='librarybook',
+            name='book_publication_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='librarybook',
+            name='book_title',
+            field=models.CharField(max_length=45, null=True),
+        ),
+        migrations.AddField(
+            model_name='librarybook',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='user.user'),
+        ),
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='librarybook',
+            name='book_author',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='librarybook',
+            name='book_publication_date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='librarybook',
+            name='book_title',
+            field=models.CharField(max_length=45),
+        ),
+        migrations.AlterField(
+            model_name='librarybook',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='user.user'),
+        ),
+        migrations.AddIndex(
+            model_name='librarybook',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='library_book_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='librarybook',
+            index=models.Index(fields=['user', 'book_title', 'id'], name='library_book_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='librarybook',
+            index=models.Index(fields=['user', 'book_author', 'id'], name='library_book_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='librarybook',
+            index=models.Index(fields=['user', '-book_publication_date', '-id'], name='library_book_pubdate_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.1.3 on 2026-10-19 23:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0002_auto_20201208_1316'),
+        ('user', '0003_userstatistics'),
+        ('library', '0003_auto_20261019_2333'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryChangeCompaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compacted_through', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'library_change_compactions',
+            },
+        ),
+        migrations.CreateModel(
+            name='LibraryChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('add', 'add'), ('remove', 'remove')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('book', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='book.book')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='user.user')),
+            ],
+            options={
+                'db_table': 'library_changes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='librarychange',
+            index=models.Index(fields=['user', 'id'], name='library_change_user_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.3 on 2026-10-20 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_auto_20261020_0003'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='librarybook',
+            index=models.Index(fields=['user', 'id'], name='library_book_user_id_idx'),
+        ),
+    ]
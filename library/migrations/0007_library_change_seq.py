@@ -0,0 +1,45 @@
+# Generated by Django 3.1.3 on 2026-10-20 01:00
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def assign_existing_seq(apps, schema_editor):
+    # 이미 내려준 token(id)이 그대로 쓰이도록 기존 변경은 seq = id 로 둔다
+    LibraryChange         = apps.get_model('library', 'LibraryChange')
+    LibraryChangeSequence = apps.get_model('library', 'LibraryChangeSequence')
+    alias                 = schema_editor.connection.alias
+
+    LibraryChange.objects.using(alias).update(seq=F('id'))
+    last_seq = LibraryChange.objects.using(alias).aggregate(last_seq=Max('id'))['last_seq'] or 0
+    LibraryChangeSequence.objects.using(alias).create(id=1, last_seq=last_seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_user_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryChangeSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'library_change_sequences',
+            },
+        ),
+        migrations.AddField(
+            model_name='librarychange',
+            name='seq',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='librarychange',
+            index=models.Index(fields=['user', 'seq'], name='library_change_user_seq_idx'),
+        ),
+        migrations.RunPython(assign_existing_seq, migrations.RunPython.noop, hints={'model_name': 'librarychange'}),
+    ]
@@ -1,20 +1,139 @@
-from django.db import models
+from django.db        import models, transaction
+from django.db.models import F, Min, Max
+
+from share.shards     import ShardedManager
 
 
 class Library(models.Model):
-    user       = models.ForeignKey('user.User', on_delete=models.CASCADE)
+    # 서재와 서재 책은 user id 로 shard 를 나누므로 사용자, 책과는 DB 제약 없이 id 로만 연결 (share/shards.py)
+    user       = models.ForeignKey('user.User', on_delete=models.CASCADE, db_constraint=False)
     name       = models.CharField(max_length=45)
     image_url  = models.URLField(max_length=200)
     books      = models.ManyToManyField('book.Book', through='LibraryBook')
 
+    objects    = ShardedManager()
+
     class Meta:
         db_table = 'libraries'
 
 
 class LibraryBook(models.Model):
-    library     = models.ForeignKey(Library, on_delete=models.CASCADE)
-    book        = models.ForeignKey('book.Book', on_delete=models.CASCADE)
+    library               = models.ForeignKey(Library, on_delete=models.CASCADE)
+    book                  = models.ForeignKey('book.Book', on_delete=models.CASCADE, db_constraint=False)
+    created_at            = models.DateTimeField(auto_now_add=True)
+    # 내 서재 정렬용 비정규화 컬럼 (library.user, book.title/author/publication_date)
+    user                  = models.ForeignKey('user.User', on_delete=models.CASCADE, db_index=False,
+                                              db_constraint=False)
+    book_title            = models.CharField(max_length=45)
+    book_author           = models.CharField(max_length=200)
+    book_publication_date = models.DateField()
+
+    objects               = ShardedManager()
+
+    class Meta:
+        db_table    = 'library_books'
+        constraints = [
+            models.UniqueConstraint(fields=['library', 'book'], name='unique_library_book'),
+        ]
+        indexes     = [
+            models.Index(fields=['user', '-created_at', '-id'], name='library_book_created_idx'),
+            models.Index(fields=['user', 'book_title', 'id'], name='library_book_title_idx'),
+            models.Index(fields=['user', 'book_author', 'id'], name='library_book_author_idx'),
+            models.Index(fields=['user', '-book_publication_date', '-id'], name='library_book_pubdate_idx'),
+            # 내보내기(LibraryExportView)의 사용자별 id 순서 keyset 조회
+            models.Index(fields=['user', 'id'], name='library_book_user_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None:
+            self.user_id = self.library.user_id
+        if self.book_publication_date is None:
+            self.set_book_fields(self.book)
+        super().save(*args, **kwargs)
+
+    def set_book_fields(self, book):
+        self.book_title            = book.title
+        self.book_author           = book.author
+        self.book_publication_date = book.publication_date
+
+
+class LibraryChange(models.Model):
+    """
+    내 서재 변경 로그 (delta sync 용)
+
+    seq 가 클라이언트의 change token 이며, 책을 빼면 remove row(tombstone)를 남긴다.
+    id 는 insert 순서라 늦게 커밋된 변경이 이미 내려준 token 보다 작을 수 있으므로, seq 는 커밋된 뒤에 매긴다. (assign_sequence)
+    """
+
+    ADD    = 'add'
+    REMOVE = 'remove'
+
+    ACTION_CHOICES = (
+        (ADD, ADD),
+        (REMOVE, REMOVE),
+    )
+
+    id          = models.BigAutoField(primary_key=True)
+    user        = models.ForeignKey('user.User', on_delete=models.CASCADE, db_index=False)
+    book        = models.ForeignKey('book.Book', on_delete=models.DO_NOTHING, db_constraint=False)
+    action      = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    seq         = models.BigIntegerField(null=True, unique=True)  # 커밋 순서 번호, 매기기 전에는 None
     created_at  = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        db_table = 'library_books'
+        db_table = 'library_changes'
+        indexes  = [
+            models.Index(fields=['user', 'id'], name='library_change_user_idx'),
+            models.Index(fields=['user', 'seq'], name='library_change_user_seq_idx'),
+        ]
+
+    @classmethod
+    def assign_sequence(cls):
+        """
+        커밋된 변경 중 seq 가 없는 변경에 id 순서대로 지금까지 매긴 seq 보다 큰 seq 를 매긴다
+
+        LibraryChangeSequence row 를 잠그고 매기므로 나중에 커밋되어 보이게 된 변경일수록 seq 가 크다.
+        아직 커밋되지 않은 변경은 보이지 않으므로 커밋된 뒤의 조회에서 그때까지의 seq 보다 큰 seq 를 받는다.
+        """
+        pending = cls.objects.filter(seq=None)
+        if not pending.exists():
+            return
+
+        with transaction.atomic():
+            sequence, created = LibraryChangeSequence.objects.select_for_update().get_or_create(id=1)
+            bounds            = pending.aggregate(first=Min('id'), last=Max('id'))
+            if bounds['first'] is None:
+                return
+
+            # seq = id + offset : id 순서를 지키면서 이전 seq 보다 크다
+            offset = sequence.last_seq - bounds['first'] + 1
+            pending.filter(id__range=(bounds['first'], bounds['last'])).update(seq=F('id') + offset)
+            sequence.last_seq = bounds['last'] + offset
+            sequence.save(update_fields=['last_seq'])
+
+
+class LibraryChangeSequence(models.Model):
+    """
+    library_changes.seq 를 매기는 counter (row 하나, 매기는 동안 잠근다)
+    """
+
+    last_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'library_change_sequences'
+
+
+class LibraryChangeCompaction(models.Model):
+    """
+    변경 로그 정리 이력 : compacted_through(seq) 이하의 token 으로는 delta sync 불가 (전체 재조회 필요)
+    """
+
+    compacted_through = models.BigIntegerField()
+    created_at        = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'library_change_compactions'
+
+    @classmethod
+    def watermark(cls):
+        return cls.objects.order_by('-id').values_list('compacted_through', flat=True).first() or 0
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from .models                  import LibraryBook, LibraryChange
+from book.models              import Book
+from share.shards             import get_shard_aliases
+from share.response_cache     import invalidate_tags
+
+
+@receiver(post_save, sender=Book)
+def update_library_book_sort_keys(sender, instance, created, **kwargs):
+    # 책 정보가 바뀌면 내 서재 정렬용 비정규화 컬럼도 갱신
+    if created:
+        return
+
+    # 그 책을 담은 사용자들의 서재 책이 모든 shard 에 흩어져 있다
+    for alias in get_shard_aliases():
+        LibraryBook.objects.on_shard(alias).filter(book_id=instance.id).update(
+            book_title            = instance.title,
+            book_author           = instance.author,
+            book_publication_date = instance.publication_date,
+        )
+
+
+@receiver(post_save, sender=LibraryBook)
+def log_library_book_added(sender, instance, created, **kwargs):
+    if created:
+        LibraryChange.objects.create(user_id=instance.user_id, book_id=instance.book_id, action=LibraryChange.ADD)
+
+
+@receiver(post_delete, sender=LibraryBook)
+def log_library_book_removed(sender, instance, **kwargs):
+    LibraryChange.objects.create(user_id=instance.user_id, book_id=instance.book_id, action=LibraryChange.REMOVE)
+
+
+@receiver(post_save, sender=LibraryBook)
+@receiver(post_delete, sender=LibraryBook)
+def invalidate_book_cache(sender, instance, **kwargs):
+    # 이번 주 추천 순위
+    invalidate_tags(f'book:{instance.book_id}')
@@ -1,10 +1,15 @@
 import jwt, json
+from io            import StringIO
 from unittest.mock import patch, MagicMock
 from random        import randint
 
-from django.test   import TestCase, Client
+from django.test   import TestCase, Client, override_settings
+from django.core.management import call_command
+from django.db     import connection
+from django.test.utils import CaptureQueriesContext
 
-from .models       import Library, LibraryBook
+from .models       import Library, LibraryBook, LibraryChange
+from .views        import MyLibraryView
 from user.models   import User,UserBook
 from book.models   import (
     Book,
@@ -61,6 +66,88 @@ class MyLibraryTestCase(TestCase):
             name      = self.DUMMY_LIBRARY_NAME,
             image_url = self.DUMMY_LIBRARY_IMAGE_URL
         )
+        Book.objects.bulk_create([
+            Book(
+                id               = i,
+                title            = self.DUMMY_TITLE,
+                image_url        = self.DUMMY_IMAGE_URL,
+                company          = self.DUMMY_COMPANY,
+                author           = self.DUMMY_AUTHOR,
+                page             = self.DUMMY_PAGE,
+                publication_date = self.DUMMY_PUBLICATION_DATE,
+                category_id      = self.category.id) for i in range(1, 4)])
+
+        self.headers = {
+            'HTTP_Authorization': jwt.encode(
+                {'user_id':self.user.id},
+                my_settings.SECRET_KEY['secret'],
+                algorithm=my_settings.JWT_ALGORITHM
+            ).decode('utf-8')
+        }
+
+    def test_mylibrary_post_success(self):
+        response = self.client.post(self.URL, json.dumps({'book_id':1}),
+                                    content_type='application/json', **self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'book_save':'SUCCESS'})
+        self.assertTrue(LibraryBook.objects.filter(library=self.library, book_id=1).exists())
+
+    def test_mylibrary_post_already_book(self):
+        LibraryBook.objects.create(library=self.library, book_id=1)
+
+        response = self.client.post(self.URL, json.dumps({'book_id':1}),
+                                    content_type='application/json', **self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'ALREADY_BOOK'})
+        self.assertEqual(LibraryBook.objects.filter(library=self.library, book_id=1).count(), 1)
+
+    def test_mylibrary_post_bulk_success(self):
+        LibraryBook.objects.create(library=self.library, book_id=1)
+
+        response = self.client.post(self.URL, json.dumps({'book_id':[1, 2, 3, 404]}),
+                                    content_type='application/json', **self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'book_save'    : 'SUCCESS',
+            'added'        : [2, 3],
+            'already_book' : [1],
+            'not_exist'    : [404],
+        })
+        self.assertEqual(LibraryBook.objects.filter(library=self.library).count(), 3)
+
+    def test_mylibrary_add_book_insert_select(self):
+        # 책을 따로 조회하지 않고 INSERT ... SELECT 한 번과 변경 로그 한 번만 쓴다 (SAVEPOINT 는 TestCase 의 transaction)
+        with CaptureQueriesContext(connection) as queries:
+            response = MyLibraryView().add_book(self.user.id, self.library.id, 2)
+
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 2, statements)
+
+        self.assertEqual(response.status_code, 200)
+        library_book = LibraryBook.objects.get(library=self.library, book_id=2)
+        self.assertEqual(
+            (library_book.user_id, library_book.book_title, library_book.book_author),
+            (self.user.id, self.DUMMY_TITLE, self.DUMMY_AUTHOR))
+        self.assertTrue(LibraryChange.objects.filter(
+            user_id=self.user.id, book_id=2, action=LibraryChange.ADD).exists())
+
+    def test_mylibrary_post_not_exist_book(self):
+        response = self.client.post(self.URL, json.dumps({'book_id':404}),
+                                    content_type='application/json', **self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'NOT_EXIST_BOOK'})
+        self.assertFalse(LibraryChange.objects.filter(book_id=404).exists())
+
+    def test_mylibrary_post_key_error(self):
+        response = self.client.post(self.URL, json.dumps({'book':1}),
+                                    content_type='application/json', **self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVAILD_KEYS'})
 
 
 class LibraryBookListTest(TestCase):
@@ -179,7 +266,8 @@ class LibraryBookListTest(TestCase):
                                      "title"         : "안녕 고맛나",
                                      "author"        : "고수희"
                                  }
-                             ]
+                             ],
+                             "nextCursor": None
                          })
 
     def test_librarybooklist_get_success_ordering_2(self):
@@ -209,7 +297,8 @@ class LibraryBookListTest(TestCase):
                                      "title"         : "파이를 햇볕에 쬐면 파이썬",
                                      "author"        : "수희고"
                                  },
-                             ]
+                             ],
+                             "nextCursor": None
                          })
 
     def test_librarybooklist_get_success_ordering_3(self):
@@ -240,7 +329,8 @@ class LibraryBookListTest(TestCase):
                                      "title"         : "백엔드냐 프론트냐 그것이 문제로다",
                                      "author"        : "원장님"
                                  }
-                             ]
+                             ],
+                             "nextCursor": None
                          })
 
     def test_librarybooklist_get_success_ordering_4(self):
@@ -271,7 +361,8 @@ class LibraryBookListTest(TestCase):
                                      "title"         : "백엔드냐 프론트냐 그것이 문제로다",
                                      "author"        : "원장님"
                                  }
-                             ]
+                             ],
+                             "nextCursor": None
                          })
 
     def test_librarybooklist_get_not_found(self):
@@ -284,10 +375,189 @@ class LibraryBookListTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(),
                          {
-                             "libraryBook":[]
+                             "libraryBook":[],
+                             "nextCursor":None
                          }
                         )
 
+class LibraryBookPaginationTest(TestCase):
+    def setUp(self):
+        self.user    = User.objects.create(nickname='burgundy')
+        self.library = Library.objects.create(user_id=self.user.id, name='서재', image_url='')
+        self.headers = {
+            'HTTP_Authorization': jwt.encode(
+                {'user_id':self.user.id},
+                my_settings.SECRET_KEY['secret'],
+                algorithm=my_settings.JWT_ALGORITHM
+            ).decode('utf-8')
+        }
+
+        titles = ['다', '가', '나', '가', '라']
+        for i, title in enumerate(titles, start=1):
+            Book.objects.create(
+                id               = i,
+                title            = title,
+                image_url        = f'image_{i}',
+                company          = 'company',
+                author           = f'author_{6 - i}',
+                page             = 100,
+                publication_date = f'2020-12-0{i}',
+            )
+            LibraryBook.objects.create(library=self.library, book_id=i)
+
+    def get_all_pages(self, ordering):
+        ids, cursor = [], None
+        while True:
+            params = {'ordering':ordering, 'limit':2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/library/books', params, **self.headers)
+            self.assertEqual(response.status_code, 200)
+
+            ids   += [book['id'] for book in response.json()['libraryBook']]
+            cursor = response.json()['nextCursor']
+            if not cursor:
+                return ids
+
+    def test_librarybooklist_get_pages_ordering_created_at(self):
+        self.assertEqual(self.get_all_pages(1), [5, 4, 3, 2, 1])
+
+    def test_librarybooklist_get_pages_ordering_title(self):
+        self.assertEqual(self.get_all_pages(2), [2, 4, 3, 1, 5])
+
+    def test_librarybooklist_get_pages_ordering_author(self):
+        self.assertEqual(self.get_all_pages(3), [5, 4, 3, 2, 1])
+
+    def test_librarybooklist_get_pages_ordering_publication_date(self):
+        self.assertEqual(self.get_all_pages(4), [5, 4, 3, 2, 1])
+
+    def test_librarybooklist_sort_keys_follow_book_update(self):
+        book       = Book.objects.get(id=1)
+        book.title = '아'
+        book.save()
+
+        self.assertEqual(LibraryBook.objects.get(book_id=1).book_title, '아')
+
+    def test_librarybooklist_get_invalid_cursor(self):
+        response = self.client.get('/library/books', {'cursor':'invalid'}, **self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_CURSOR'})
+
+
+class LibraryBookChangesTest(TestCase):
+    def setUp(self):
+        self.user    = User.objects.create(nickname='burgundy')
+        self.library = Library.objects.create(user_id=self.user.id, name='서재', image_url='')
+        self.headers = {
+            'HTTP_Authorization': jwt.encode(
+                {'user_id':self.user.id},
+                my_settings.SECRET_KEY['secret'],
+                algorithm=my_settings.JWT_ALGORITHM
+            ).decode('utf-8')
+        }
+
+        for i in range(1, 4):
+            Book.objects.create(id=i, title=f'title_{i}', image_url=f'image_{i}', company='company',
+                                author='author', page=100, publication_date='2020-12-01')
+
+    def get_changes(self, since=None):
+        params = {} if since is None else {'since':since}
+        return self.client.get('/library/books/changes', params, **self.headers).json()
+
+    def test_librarybookchanges_get_reset_without_token(self):
+        response = self.get_changes()
+
+        self.assertEqual(response, {'reset':True, 'token':'0'})
+
+    def test_librarybookchanges_get_added_and_removed(self):
+        token = self.get_changes()['token']
+        LibraryBook.objects.create(library=self.library, book_id=1)
+        LibraryBook.objects.create(library=self.library, book_id=2)
+        LibraryBook.objects.get(book_id=1).delete()
+
+        response = self.get_changes(token)
+
+        self.assertEqual(response['reset'], False)
+        self.assertEqual(response['added'], [{'id':2, 'title':'title_2', 'image':'image_2', 'author':'author'}])
+        self.assertEqual(response['removed'], [1])
+        self.assertEqual(self.get_changes(response['token'])['added'], [])
+
+    def test_librarybookchanges_get_late_committed_change(self):
+        token = self.get_changes()['token']
+        LibraryChange.objects.create(id=10, user_id=self.user.id, book_id=1, action=LibraryChange.ADD)
+        response = self.get_changes(token)
+        self.assertEqual([book['id'] for book in response['added']], [1])
+
+        # 늦게 커밋된 변경 : id 는 이미 내려준 변경보다 작지만 커밋 순서 token 으로 다음 조회에서 내려간다
+        LibraryChange.objects.create(id=5, user_id=self.user.id, book_id=2, action=LibraryChange.ADD)
+        response = self.get_changes(response['token'])
+
+        self.assertEqual([book['id'] for book in response['added']], [2])
+        self.assertEqual(self.get_changes(response['token'])['added'], [])
+
+    def test_librarybookchanges_get_reset_after_compaction(self):
+        LibraryBook.objects.create(library=self.library, book_id=1)
+        LibraryBook.objects.get(book_id=1).delete()
+        LibraryBook.objects.create(library=self.library, book_id=1)
+
+        call_command('compact_library_changes', stdout=StringIO())
+        self.assertEqual(LibraryChange.objects.count(), 1)
+
+        call_command('compact_library_changes', '--days', '-1', stdout=StringIO())
+        self.assertEqual(self.get_changes(0)['reset'], True)
+
+
+@override_settings(LIBRARY_EXPORT_CHUNK_SIZE=2)
+class LibraryExportTest(TestCase):
+    def setUp(self):
+        self.user    = User.objects.create(nickname='burgundy')
+        self.library = Library.objects.create(user_id=self.user.id, name='서재', image_url='')
+        self.headers = {
+            'HTTP_Authorization': jwt.encode(
+                {'user_id':self.user.id},
+                my_settings.SECRET_KEY['secret'],
+                algorithm=my_settings.JWT_ALGORITHM
+            ).decode('utf-8')
+        }
+
+        for i in range(1, 4):
+            Book.objects.create(id=i, title=f'제목_{i}', image_url=f'image_{i}', company='company',
+                                author='author', page=100, publication_date='2020-12-01')
+            LibraryBook.objects.create(library=self.library, book_id=i)
+        UserBook.objects.create(user=self.user, book_id=1, page=10, time=20)
+
+    def test_libraryexport_get_ndjson(self):
+        response = self.client.get('/library/export', **self.headers)
+        rows     = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['type'] for row in rows], ['library_book'] * 3 + ['user_book'])
+        self.assertEqual([row['book_id'] for row in rows], [1, 2, 3, 1])
+        self.assertEqual(rows[3]['title'], '제목_1')
+        self.assertEqual(rows[3]['time'], 20)
+
+    def test_libraryexport_get_csv(self):
+        response = self.client.get('/library/export', {'format':'csv'}, **self.headers)
+        lines    = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(lines[0], 'type,book_id,title,author,page,time,created_at,updated_at')
+        self.assertEqual(len(lines), 5)
+
+    def test_libraryexport_keyset_uses_user_id_index(self):
+        for model, index in ((LibraryBook, 'library_book_user_id_idx'), (UserBook, 'user_book_user_id_idx')):
+            plan = model.objects.for_user(self.user.id).filter(id__gt=0).order_by('id').values('id')[:100].explain()
+            self.assertIn(index, plan)
+
+    def test_libraryexport_get_invalid_format(self):
+        response = self.client.get('/library/export', {'format':'xml'}, **self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_FORMAT'})
+
+
 class LibraryTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -3,6 +3,8 @@ from .views          import (
     MyLibraryView,
     LibraryInfoView,
     LibraryBookListView,
+    LibraryBookChangesView,
+    LibraryExportView,
     StatisticsView
 )
 
@@ -10,5 +12,7 @@ urlpatterns = [
     path('/mylibrary', MyLibraryView.as_view()),
     path('/statistics', StatisticsView.as_view()),
     path('/books', LibraryBookListView.as_view()),
+    path('/books/changes', LibraryBookChangesView.as_view()),
+    path('/export', LibraryExportView.as_view()),
     path('', LibraryInfoView.as_view())
 ]
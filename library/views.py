@@ -1,43 +1,158 @@
-import json, requests
+import json, requests, base64, csv
+from datetime         import date, datetime, timedelta
 
-from django.http      import JsonResponse
+from django.conf      import settings
+from django.http      import StreamingHttpResponse
 from django.views     import View
-from django.db.models import (
-    Sum,
-    Count
-)
+from django.db        import transaction, connections, IntegrityError, DEFAULT_DB_ALIAS
+from django.db.models import Q
 
-from .models          import Library, LibraryBook
-from user.models      import User, UserBook
+from .models          import (
+    Library,
+    LibraryBook,
+    LibraryChange,
+    LibraryChangeCompaction,
+)
+from user.models      import User, UserBook, UserStatistics, DailyUserReading
 from book.models      import Book
 from share.decorators import check_auth_decorator
+from share.responses  import FastJsonResponse
+from share.shards     import get_shard_alias
+from share.response_cache import invalidate_tags
 
 
 class MyLibraryView(View):
+    """
+    내 서재에 책 담기
+
+    - book_id 가 숫자이면 한 권, 리스트이면 여러 권을 한 번에 담는다
+    - (library, book) unique 제약으로 중복을 막으므로 같은 요청을 반복해도 결과가 같다
+
+    Returns: 담기 결과 (이미 담긴 책 여부 포함)
+
+    """
+
+    def get_library_id(self, user_id):
+        library_id = Library.objects.for_user(user_id).values_list('id', flat=True).first()
+        if not library_id:
+            nickname   = User.objects.get(id=user_id).nickname
+            library_id = Library.objects.for_user(user_id).create(user_id=user_id, name=nickname).id
+
+        return library_id
+
+    def new_library_book(self, user_id, library_id, book):
+        library_book = LibraryBook(user_id=user_id, library_id=library_id, book=book)
+        library_book.set_book_fields(book)
+
+        return library_book
+
+    def insert_library_book(self, user_id, library_id, book_id):
+        """
+        books 의 제목, 저자, 출간일을 그대로 복사해 서재 책을 넣는다 (INSERT ... SELECT, 넣은 row 수)
+
+        책을 먼저 조회하지 않으므로 books 와 library_books 가 같은 DB(default) 에 있을 때만 쓴다.
+        """
+        connection = connections[DEFAULT_DB_ALIAS]
+        quote      = connection.ops.quote_name
+        fields     = LibraryBook._meta
+        columns    = ', '.join(quote(fields.get_field(name).column) for name in (
+            'library', 'book', 'created_at', 'user', 'book_title', 'book_author', 'book_publication_date'))
+        sql        = (f'INSERT INTO {quote(fields.db_table)} ({columns}) '
+                      f'SELECT %s, {quote("id")}, %s, %s, {quote("title")}, {quote("author")}, '
+                      f'{quote("publication_date")} FROM {quote(Book._meta.db_table)} WHERE {quote("id")} = %s')
+        created_at = connection.ops.adapt_datetimefield_value(datetime.now())
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [library_id, created_at, user_id, book_id])
+            return cursor.rowcount
+
+    def add_book(self, user_id, library_id, book_id):
+        alias = get_shard_alias(user_id)
+        if alias == DEFAULT_DB_ALIAS:
+            try:
+                with transaction.atomic():
+                    if not self.insert_library_book(user_id, library_id, book_id):
+                        return FastJsonResponse({'message':'NOT_EXIST_BOOK'}, status=400)
+                    # save() 를 거치지 않으므로 post_save signal 이 하던 변경 로그, 캐시 무효화를 직접 한다
+                    LibraryChange.objects.create(user_id=user_id, book_id=book_id, action=LibraryChange.ADD)
+                    invalidate_tags(f'book:{book_id}')
+            except IntegrityError:
+                return FastJsonResponse({'message':'ALREADY_BOOK'}, status=400)
+
+            return FastJsonResponse({'book_save':'SUCCESS'}, status=200)
+
+        # 사용자의 shard 가 books 와 다른 DB 이면 책을 먼저 조회해서 비정규화 컬럼을 채운다
+        book = Book.objects.filter(id=book_id).only('title', 'author', 'publication_date').first()
+        if not book:
+            return FastJsonResponse({'message':'NOT_EXIST_BOOK'}, status=400)
+
+        try:
+            # 서재 책은 사용자의 shard 에, 변경 로그(signal)는 default 에 쓴다
+            with transaction.atomic(), transaction.atomic(using=alias):
+                self.new_library_book(user_id, library_id, book).save(force_insert=True)
+        except IntegrityError:
+            return FastJsonResponse({'message':'ALREADY_BOOK'}, status=400)
+
+        return FastJsonResponse({'book_save':'SUCCESS'}, status=200)
+
+    def add_books(self, user_id, library_id, book_ids):
+        book_ids = set(int(book_id) for book_id in book_ids)
+        if len(book_ids) > settings.LIBRARY_BULK_ADD_MAX:
+            return FastJsonResponse({'message':'TOO_MANY_BOOKS'}, status=400)
+
+        books        = {book.id: book for book in Book.objects.filter(
+            id__in=book_ids).only('title', 'author', 'publication_date')}
+        existing_ids = set(LibraryBook.objects.for_user(user_id).filter(
+            library_id=library_id, book_id__in=books).values_list('book_id', flat=True))
+        added_ids    = set(books) - existing_ids
+
+        # 동시에 같은 책을 담는 요청이 있어도 unique 제약 충돌은 무시
+        LibraryBook.objects.for_user(user_id).bulk_create(
+            [self.new_library_book(user_id, library_id, books[book_id]) for book_id in sorted(added_ids)],
+            ignore_conflicts = True,
+        )
+        # bulk_create 는 post_save signal 을 보내지 않으므로 변경 로그 기록과 응답 캐시 무효화를 직접 한다
+        LibraryChange.objects.bulk_create(
+            [LibraryChange(user_id=user_id, book_id=book_id, action=LibraryChange.ADD) for book_id in sorted(added_ids)]
+        )
+        invalidate_tags(*[f'book:{book_id}' for book_id in sorted(added_ids)])
+
+        return FastJsonResponse({
+            'book_save'    : 'SUCCESS',
+            'added'        : sorted(added_ids),
+            'already_book' : sorted(existing_ids),
+            'not_exist'    : sorted(book_ids - set(books)),
+        }, status=200)
+
     @check_auth_decorator
     def post(self, request):
         data = json.loads(request.body)
         try:
-            user      = request.user
-            book_id   = data['book_id']
-            library   = Library.objects.filter(user_id=user)
-            nickname  = User.objects.get(id=user).nickname
-
-            if not library:
-                library = Library.objects.create(
-                    user_id = user,
-                    name    = nickname
-                )
-                return JsonResponse({'message':'CREATED_LIBRARY'}, status=200)
-            if LibraryBook.objects.filter(book_id=book_id, library_id=library.first().id).exists():
-                return JsonResponse({'message':'ALREADY_BOOK'}, status=400)
-            book_save  = LibraryBook.objects.create(
-                book_id    = book_id,
-                library_id = library.first().id
-            )
-            return JsonResponse({'book_save':'SUCCESS'}, status=200)
-        except KeyError:
-            return JsonResponse({'message':'INVAILD_KEYS'}, status=400)
+            book_id    = data['book_id']
+            library_id = self.get_library_id(request.user)
+
+            if isinstance(book_id, list):
+                return self.add_books(request.user, library_id, book_id)
+            return self.add_book(request.user, library_id, int(book_id))
+        except (KeyError, TypeError, ValueError):
+            return FastJsonResponse({'message':'INVAILD_KEYS'}, status=400)
+
+
+def encode_cursor(value, last_id):
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+
+    return base64.urlsafe_b64encode(json.dumps([value, last_id]).encode('utf-8')).decode('utf-8')
+
+
+def decode_cursor(cursor, field):
+    value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')))
+    if field == 'created_at':
+        value = datetime.fromisoformat(value)
+    elif field == 'book_publication_date':
+        value = date.fromisoformat(value)
+
+    return value, int(last_id)
 
 
 class LibraryBookListView(View):
@@ -50,34 +165,222 @@ class LibraryBookListView(View):
              2020-12-11(고수희) : 1차 수정 - 정렬 변경
              2021-01-20(고수희) : 2차 수정 - 변수 명 수정, 주석 추가
 
-    Returns: 내 서재 책 리스트
+    cursor 기반(keyset) 페이지네이션 : (정렬 컬럼, id) 복합 인덱스 범위 조회로 filesort 없이 한 페이지씩 조회
+
+    Returns: 내 서재 책 리스트, 다음 페이지 cursor
 
     """
 
+    conditions = {
+        1: ('created_at', True),  # 생성일자 내림차순
+        2: ('book_title', False),  # 책 제목순
+        3: ('book_author', False),  # 책 저자 순
+        4: ('book_publication_date', True)  # 책 출간일 내림차순
+    }
+
     @check_auth_decorator
     def get(self, request):
         user_id  = request.user
         ordering = request.GET.get('ordering', '1')  # 책 정렬 순서
+        cursor   = request.GET.get('cursor')  # 이전 페이지 마지막 책 위치
+        limit    = request.GET.get('limit', settings.LIBRARY_BOOK_PAGE_SIZE)  # 한 페이지 책 갯수
+
+        try:
+            field, descending = self.conditions[int(ordering)]
+            limit             = max(min(int(limit), settings.LIBRARY_BOOK_PAGE_SIZE_MAX), 1)
+        except (KeyError, ValueError):
+            return FastJsonResponse({"message": "INVALID_REQUEST"}, status=400)
 
-        conditions = {
-            1: '-created_at',  # 생성일자 내림차순
-            2: 'book__title',  # 책 제목순
-            3: 'book__author',  # 책 저자 순
-            4: '-book__publication_date'  # 책 출간일 내림차순
-        }
+        books = LibraryBook.objects.for_user(user_id)
 
-        books = LibraryBook.objects.select_related(
-            'book', 'library').filter(
-                library__user_id=user_id).order_by(conditions[int(ordering)])
+        if cursor:
+            try:
+                value, last_id = decode_cursor(cursor, field)
+            except (ValueError, TypeError):
+                return FastJsonResponse({"message": "INVALID_CURSOR"}, status=400)
 
+            lookup = 'lt' if descending else 'gt'
+            books  = books.filter(Q(**{f'{field}__{lookup}': value})
+                                  | Q(**{field: value, f'id__{lookup}': last_id}))
+
+        order_by = (f'-{field}', '-id') if descending else (field, 'id')
+        books    = list(books.order_by(*order_by)[:limit + 1])
+
+        next_cursor = None
+        if len(books) > limit:
+            last        = books[limit - 1]
+            books       = books[:limit]
+            next_cursor = encode_cursor(getattr(last, field), last.id)
+
+        # 서재 책은 사용자의 shard 에 있으므로 표지 이미지는 default 의 책에서 따로 조회
+        images    = dict(Book.objects.filter(id__in=[library.book_id for library in books]).values_list('id', 'image_url'))
         book_list = {
             "libraryBook" : [{
-                "id"     : library.book.id,  # 책 id
-                "title"  : library.book.title,  # 책 제목
-                "image"  : library.book.image_url,  # 책 표지 이미지
-                "author" : library.book.author  # 책 저자
-            } for library in books]}
-        return JsonResponse(book_list, status=200)
+                "id"     : library.book_id,  # 책 id
+                "title"  : library.book_title,  # 책 제목
+                "image"  : images.get(library.book_id),  # 책 표지 이미지
+                "author" : library.book_author  # 책 저자
+            } for library in books],
+            "nextCursor"  : next_cursor}
+        return FastJsonResponse(book_list, status=200)
+
+
+class LibraryBookChangesView(View):
+    """
+    내 서재 변경분 조회 (delta sync)
+
+    - since : 이전 응답의 token. 없거나 정리(compaction)된 범위이면 reset=True 로 전체 재조회를 요청
+    - 같은 책의 여러 변경은 마지막 변경만 반영해서 added / removed 로 나눈다
+    - token 은 커밋 순서로 매긴 seq 이므로 늦게 커밋된 변경도 다음 조회에서 내려간다 (LibraryChange.assign_sequence)
+
+    Returns: 추가된 책 리스트, 삭제된 책 id 리스트, 다음 token
+
+    """
+
+    @check_auth_decorator
+    def get(self, request):
+        user_id = request.user
+        since   = request.GET.get('since')
+        limit   = settings.LIBRARY_CHANGE_PAGE_SIZE
+
+        LibraryChange.assign_sequence()
+        changes = LibraryChange.objects.filter(seq__isnull=False)
+
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            return FastJsonResponse({"message": "INVALID_TOKEN"}, status=400)
+
+        if since is None or since < LibraryChangeCompaction.watermark():
+            latest = changes.order_by('-seq').values_list('seq', flat=True).first() or 0
+            return FastJsonResponse({"reset": True, "token": str(latest)}, status=200)
+
+        rows  = list(changes.filter(user_id=user_id, seq__gt=since).order_by('seq')
+                     .values_list('seq', 'book_id', 'action')[:limit + 1])
+        token = since
+        if rows:
+            token = rows[:limit][-1][0]
+
+        actions = {}
+        for seq, book_id, action in rows[:limit]:
+            actions[book_id] = action
+
+        added_ids   = [book_id for book_id, action in actions.items() if action == LibraryChange.ADD]
+        removed_ids = [book_id for book_id, action in actions.items() if action == LibraryChange.REMOVE]
+
+        added = [{
+            "id"     : book['id'],  # 책 id
+            "title"  : book['title'],  # 책 제목
+            "image"  : book['image_url'],  # 책 표지 이미지
+            "author" : book['author']  # 책 저자
+        } for book in Book.objects.filter(id__in=added_ids).values('id', 'title', 'image_url', 'author')]
+
+        return FastJsonResponse({
+            "reset"   : False,
+            "added"   : added,
+            "removed" : removed_ids,
+            "token"   : str(token),
+            "hasMore" : len(rows) > limit,
+        }, status=200)
+
+
+def iterate_chunks_by_id(queryset, chunk_size):
+    """
+    id 순서로 chunk_size 씩 끊어서 조회 (keyset)
+
+    MySQL 드라이버는 .iterator() 에서도 결과 전체를 클라이언트 메모리에 받으므로
+    chunk 단위로 다시 조회해서 사용자 데이터 양과 관계없이 메모리 사용량을 일정하게 유지한다.
+    """
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id')[:chunk_size].iterator(chunk_size=chunk_size))
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def iterate_by_id(queryset, chunk_size):
+    for rows in iterate_chunks_by_id(queryset, chunk_size):
+        yield from rows
+
+
+class Echo:
+    """csv.writer 가 쓴 한 줄을 그대로 돌려주는 buffer"""
+
+    def write(self, value):
+        return value
+
+
+class LibraryExportView(View):
+    """
+    내 서재 / 독서 기록 내보내기
+
+    StreamingHttpResponse 로 한 row 씩 NDJSON(기본) 또는 CSV 로 내려준다.
+
+    Returns: 내 서재 책(library_book), 독서 기록(user_book) row
+
+    """
+
+    columns = ('type', 'book_id', 'title', 'author', 'page', 'time', 'created_at', 'updated_at')
+
+    def iter_rows(self, user_id):
+        chunk_size    = settings.LIBRARY_EXPORT_CHUNK_SIZE
+        library_books = LibraryBook.objects.for_user(user_id).values(
+            'id', 'book_id', 'book_title', 'book_author', 'created_at')
+        user_books    = UserBook.objects.for_user(user_id).values(
+            'id', 'book_id', 'page', 'time', 'created_at', 'updated_at')
+
+        for row in iterate_by_id(library_books, chunk_size):
+            yield {
+                'type'       : 'library_book',
+                'book_id'    : row['book_id'],
+                'title'      : row['book_title'],
+                'author'     : row['book_author'],
+                'created_at' : row['created_at'].isoformat(),
+            }
+
+        # user_books 는 사용자의 shard 에 있으므로 책 제목, 저자는 chunk 마다 default 에서 조회
+        for rows in iterate_chunks_by_id(user_books, chunk_size):
+            books = {book['id']: book for book in Book.objects.filter(
+                id__in=[row['book_id'] for row in rows]).values('id', 'title', 'author')}
+            for row in rows:
+                book = books.get(row['book_id'], {})
+                yield {
+                    'type'       : 'user_book',
+                    'book_id'    : row['book_id'],
+                    'title'      : book.get('title'),
+                    'author'     : book.get('author'),
+                    'page'       : row['page'],
+                    'time'       : row['time'],
+                    'created_at' : row['created_at'].isoformat(),
+                    'updated_at' : row['updated_at'].isoformat(),
+                }
+
+    def iter_ndjson(self, rows):
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+
+    def iter_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.columns)
+        for row in rows:
+            yield writer.writerow([row.get(column, '') for column in self.columns])
+
+    @check_auth_decorator
+    def get(self, request):
+        export_format = request.GET.get('format', 'ndjson')  # ndjson / csv
+        rows          = self.iter_rows(request.user)
+
+        if export_format == 'ndjson':
+            response = StreamingHttpResponse(self.iter_ndjson(rows), content_type='application/x-ndjson')
+        elif export_format == 'csv':
+            response = StreamingHttpResponse(self.iter_csv(rows), content_type='text/csv; charset=utf-8')
+        else:
+            return FastJsonResponse({"message": "INVALID_FORMAT"}, status=400)
+
+        response['Content-Disposition'] = f'attachment; filename="suwee_library.{export_format}"'
+        return response
 
 
 class StatisticsView(View):
@@ -85,27 +388,36 @@ class StatisticsView(View):
     def get(self, request):
         result = {}
 
-        # 사용자의 총 독서권수, 총 독서시간        
-        userbook = UserBook.objects.select_related('user', 'book').filter(user_id = request.user)
-        
-        result['total_book_count'] = userbook.count()
-        result['total_read_time']  = userbook.aggregate(total_read_time=Sum('time'))['total_read_time']
-        if not result['total_read_time']:
-            result['total_read_time'] = 0            
-        
+        # 사용자의 총 독서권수, 총 독서시간 : UserBook 변경 시 증분 갱신된 통계 한 row 조회
+        statistics = UserStatistics.get_for_user(request.user)
+
+        result['total_book_count'] = statistics.total_book_count
+        result['total_read_time']  = statistics.total_read_time
+
+        # 최근 7일 일별 독서시간, 완독 권수 : 일간 집계(daily_user_readings) 조회
+        today    = date.today()
+        days     = [today - timedelta(days=i) for i in range(6, -1, -1)]
+        readings = {reading['day']: reading for reading in DailyUserReading.objects.filter(
+            user_id=request.user, day__gte=days[0]).values('day', 'minutes', 'finishes')}
+
+        result['daily_read_time']     = [{
+            'day'     : day.isoformat(),
+            'minutes' : readings[day]['minutes'] if day in readings else 0,
+        } for day in days]
+        result['weekly_finish_count'] = sum(reading['finishes'] for reading in readings.values())
+
         # 추천 책 선정
         if not result['total_book_count']:
             result['recommand_book'] = list(Book.objects.all().order_by('-publication_date').values('id', 'title', 'image_url', 'author')[:1])[0]
-        else:
-            count_of_category = list(userbook.values('book__category_id').annotate(count = Count('book__category_id')))
-            target            = max(count_of_category, key=lambda x:x['count'])
-            category_id       = target['book__category_id']
-                    
-            books = Book.objects.filter(category_id=category_id).order_by('-publication_date')
-            if books:
-                result['recommand_book'] = list(books.values('id', 'title', 'image_url', 'author'))[0]
-        
-        return JsonResponse({"message":"SUCCESS", "data":result}, status=200)
+        elif statistics.category_counts:
+            category_id = max(statistics.category_counts.items(), key=lambda x:x[1])[0]
+
+            book = Book.objects.filter(category_id=int(category_id)).order_by(
+                '-publication_date').values('id', 'title', 'image_url', 'author').first()
+            if book:
+                result['recommand_book'] = book
+
+        return FastJsonResponse({"message":"SUCCESS", "data":result}, status=200)
 
 
 class LibraryInfoView(View):
@@ -134,7 +446,7 @@ class LibraryInfoView(View):
                 "userImage"    : library.user.image_url  # 사용자 프로필 이미지
                     if library.user.image_url is not None
                     else '',
-            } for library in Library.objects.filter(
-                user_id=user_id)]}
+            } for library in Library.objects.for_user(
+                user_id)]}
 
-        return JsonResponse (library_info, status=200)
+        return FastJsonResponse (library_info, status=200)
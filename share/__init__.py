@@ -0,0 +1 @@
+default_app_config = 'share.apps.ShareConfig'
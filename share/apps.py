@@ -0,0 +1,20 @@
+import os
+
+from django.apps                import AppConfig
+from django.conf                import settings
+from django.db.backends.signals import connection_created
+
+
+class ShareConfig(AppConfig):
+    name = 'share'
+
+    def ready(self):
+        from .slow_queries    import install_slow_query_log
+        from .request_context import install_query_recorder
+
+        # 로그 파일은 처음 쓸 때 열리므로(delay) 디렉터리만 미리 만든다
+        for log_file in (settings.SLOW_QUERY_LOG_FILE, settings.READING_PROGRESS_DEAD_LETTER_FILE):
+            if log_file:
+                os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        connection_created.connect(install_slow_query_log)
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import contextvars
+from concurrent import futures
+
+from django.conf import settings
+
+from .db_connections import run_with_connections
+
+executor_lock = threading.Lock()
+executor      = None
+
+
+def get_executor():
+    global executor
+
+    with executor_lock:
+        if executor is None:
+            executor = futures.ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix='async-db')
+    return executor
+
+
+async def run_in_db_thread(func, *args):
+    """
+    func(*args) 를 DB 전용 thread pool 에서 실행하고 event loop 를 막지 않고 결과를 기다린다
+
+    Django 3.1 ORM 은 async 를 지원하지 않아 event loop 에서 직접 쿼리하면 SynchronousOnlyOperation 이 난다.
+    sync_to_async(thread_sensitive=True) 와 달리 요청들이 thread 하나에 줄 서지 않고 ASYNC_DB_WORKERS 개 thread 에서
+    동시에 실행된다. (DB 연결은 thread 마다 열리므로 worker 수가 프로세스의 최대 연결 수가 된다)
+    요청의 context(replica routing 상태, 쿼리 기록)를 복사해서 넘긴다.
+    """
+    loop    = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), context.run, run_with_connections, func, *args)
@@ -0,0 +1,201 @@
+import json
+import math
+import random
+
+
+class Endpoint:
+    """
+    benchmark 대상 endpoint
+
+    make_request(rng, dataset) 는 (path, params, body) 를 돌려주며, 같은 seed 면 같은 요청 순서가 된다.
+    """
+
+    def __init__(self, name, method, make_request, auth=False):
+        self.name         = name
+        self.method       = method
+        self.make_request = make_request
+        self.auth         = auth
+
+
+def get_ids(rng, dataset, name, count):
+    return ','.join(str(rng.randint(1, dataset[name])) for _ in range(count))
+
+
+ENDPOINTS = [
+    Endpoint('books.today', 'get', lambda rng, dataset: ('/books/today', {}, None)),
+    Endpoint('books.recently', 'get', lambda rng, dataset: ('/books/recently', {}, None)),
+    Endpoint('books.commingsoon', 'get', lambda rng, dataset: ('/books/commingsoon', {}, None)),
+    Endpoint('books.bestseller', 'get',
+             lambda rng, dataset: ('/books/bestseller', {'keyword': rng.randint(1, 6)}, None)),
+    Endpoint('books.recommend', 'get',
+             lambda rng, dataset: ('/books/recommend', {'keyword': rng.randint(2, 6)}, None)),
+    Endpoint('books.landing_page', 'get', lambda rng, dataset: ('/books/landing_page', {}, None)),
+    Endpoint('books.home', 'get', lambda rng, dataset: ('/books/home', {}, None)),
+    Endpoint('books.detail', 'get',
+             lambda rng, dataset: (f'/books/{rng.randint(1, dataset["books"])}', {}, None)),
+    Endpoint('books.detail_fields', 'get',
+             lambda rng, dataset: (f'/books/{rng.randint(1, dataset["books"])}',
+                                   {'fields': 'title,image_url,numeric'}, None)),
+    Endpoint('books.batch', 'get',
+             lambda rng, dataset: ('/books/batch', {'ids': get_ids(rng, dataset, 'books', 10)}, None)),
+    Endpoint('books.search', 'get',
+             lambda rng, dataset: ('/books/search', {'title': rng.choice(['바다', '기억', '김', '별'])}, None)),
+    Endpoint('books.reviews', 'get',
+             lambda rng, dataset: (f'/books/{rng.randint(1, dataset["books"])}/review', {}, None)),
+    Endpoint('library.info', 'get', lambda rng, dataset: ('/library', {}, None), auth=True),
+    Endpoint('library.books', 'get',
+             lambda rng, dataset: ('/library/books', {'ordering': rng.randint(1, 4)}, None),
+             auth=True),
+    Endpoint('library.books_changes', 'get',
+             lambda rng, dataset: ('/library/books/changes', {}, None), auth=True),
+    Endpoint('library.statistics', 'get', lambda rng, dataset: ('/library/statistics', {}, None), auth=True),
+    Endpoint('library.export', 'get', lambda rng, dataset: ('/library/export', {}, None), auth=True),
+    Endpoint('user.check_nickname', 'get',
+             lambda rng, dataset: ('/user/check_nickname', {'nickname': f'reader{rng.randint(1, 10**6)}'}, None)),
+    Endpoint('user.sign_in', 'post',
+             lambda rng, dataset: ('/user/sign_in', {}, {
+                 'phone_number' : f'010{rng.randint(1, dataset["users"]):08d}',
+                 'password'     : 'password1234!',
+             })),
+    Endpoint('user.progress', 'post',
+             lambda rng, dataset: ('/user/progress', {}, {'progress': [{
+                 'book_id' : rng.randint(1, dataset['books']),
+                 'page'    : rng.randint(1, 80),
+                 'time'    : rng.randint(1, 10),
+             }]}), auth=True),
+]
+
+
+def get_endpoints(names=None):
+    if not names:
+        return ENDPOINTS
+    endpoints = [endpoint for endpoint in ENDPOINTS if endpoint.name in names or endpoint.name.split('.')[0] in names]
+    if not endpoints:
+        raise ValueError(f'unknown endpoints: {names}')
+    return endpoints
+
+
+def percentile(values, percent):
+    # 선형 보간 percentile (numpy 기본값과 같음)
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * percent / 100
+    lower    = math.floor(position)
+    upper    = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies_ms, query_counts, statuses):
+    return {
+        'requests'     : len(latencies_ms),
+        'p50_ms'       : round(percentile(latencies_ms, 50), 3),
+        'p95_ms'       : round(percentile(latencies_ms, 95), 3),
+        'p99_ms'       : round(percentile(latencies_ms, 99), 3),
+        'mean_ms'      : round(sum(latencies_ms) / len(latencies_ms), 3),
+        'queries'      : {
+            'min'  : min(query_counts) if query_counts else None,
+            'max'  : max(query_counts) if query_counts else None,
+            'mean' : round(sum(query_counts) / len(query_counts), 3) if query_counts else None,
+        },
+        'statuses'     : {str(status): statuses.count(status) for status in sorted(set(statuses))},
+        'latencies_ms' : [round(latency, 3) for latency in latencies_ms],
+        'query_counts' : query_counts,
+    }
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as result_file:
+        return json.load(result_file)
+
+
+def compare_results(baseline, candidate):
+    # endpoint 별 (이름, 기준 p50, 비교 p50, 변화율 %, 기준 평균 쿼리 수, 비교 평균 쿼리 수)
+    rows = []
+    for name, result in candidate['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        change = (result['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100 if base['p50_ms'] else 0.0
+        rows.append((name, base['p50_ms'], result['p50_ms'], change,
+                     base['queries']['mean'], result['queries']['mean']))
+    return rows
+
+
+def make_rng(seed, name):
+    # endpoint 마다 독립된 난수열 (endpoint 를 골라 실행해도 같은 요청이 나가도록)
+    return random.Random(f'{seed}:{name}')
+
+
+def bootstrap_change_ci(baseline, candidate, iterations=2000, confidence=0.95, seed=0):
+    """
+    p50 지연 시간 변화율(%)과 paired bootstrap 신뢰 구간
+
+    baseline[i] 와 candidate[i] 는 같은 요청을 두 서버에 번갈아 보낸 결과이므로 요청 index 를
+    복원 추출해 (후보 p50 - 기준 p50) / 기준 p50 분포를 만든다. (변화율, 하한, 상한) 을 돌려준다.
+    """
+    if not baseline or len(baseline) != len(candidate):
+        raise ValueError('baseline and candidate must have the same number of samples')
+
+    rng     = random.Random(seed)
+    count   = len(baseline)
+    changes = []
+    for _ in range(iterations):
+        indexes     = [rng.randrange(count) for _ in range(count)]
+        base_median = percentile([baseline[index] for index in indexes], 50)
+        median      = percentile([candidate[index] for index in indexes], 50)
+        changes.append((median - base_median) / base_median * 100 if base_median else 0.0)
+
+    base_median = percentile(baseline, 50)
+    change      = (percentile(candidate, 50) - base_median) / base_median * 100 if base_median else 0.0
+    tail        = (1 - confidence) / 2 * 100
+    return change, percentile(changes, tail), percentile(changes, 100 - tail)
+
+
+def get_threshold(thresholds, name):
+    # "default" 위에 "endpoints" 의 endpoint 별 값을 덮어쓴다
+    threshold = dict(thresholds.get('default', {}))
+    threshold.update(thresholds.get('endpoints', {}).get(name, {}))
+    return threshold
+
+
+def check_regression(baseline, candidate, threshold, iterations=2000, confidence=0.95, seed=0):
+    """
+    한 endpoint 의 기준/후보 측정값(latencies_ms, query_counts, statuses)을 비교한다
+
+    - latency : 변화율 신뢰 구간의 하한이 latency_change_pct 를 넘으면 (확실히 그만큼 느려졌을 때만)
+    - queries : 같은 요청끼리 비교한 쿼리 수 증가가 query_delta 를 넘으면
+    - errors  : 후보의 5xx 응답이 기준보다 많으면
+    """
+    change, low, high = bootstrap_change_ci(baseline['latencies_ms'], candidate['latencies_ms'],
+                                            iterations, confidence, seed)
+    query_deltas = None
+    if None not in baseline['query_counts'] and None not in candidate['query_counts']:
+        query_deltas = [count - base_count
+                        for base_count, count in zip(baseline['query_counts'], candidate['query_counts'])]
+    base_errors = sum(1 for status in baseline['statuses'] if status >= 500)
+    errors      = sum(1 for status in candidate['statuses'] if status >= 500)
+
+    breaches = []
+    if low > threshold.get('latency_change_pct', float('inf')):
+        breaches.append('latency')
+    if query_deltas is not None and max(query_deltas) > threshold.get('query_delta', float('inf')):
+        breaches.append('queries')
+    if errors > base_errors:
+        breaches.append('errors')
+
+    return {
+        'base_p50_ms'        : round(percentile(baseline['latencies_ms'], 50), 3),
+        'p50_ms'             : round(percentile(candidate['latencies_ms'], 50), 3),
+        'change_pct'         : round(change, 2),
+        'change_ci_pct'      : [round(low, 2), round(high, 2)],
+        'query_delta'        : {
+            'min'  : min(query_deltas),
+            'max'  : max(query_deltas),
+            'mean' : round(sum(query_deltas) / len(query_deltas), 3),
+        } if query_deltas is not None else None,
+        'base_server_errors' : base_errors,
+        'server_errors'      : errors,
+        'threshold'          : threshold,
+        'breaches'           : breaches,
+    }
@@ -0,0 +1,179 @@
+import time
+import pickle
+import threading
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.module_loading     import import_string
+
+
+class RedisCache(BaseCache):
+    """
+    redis(또는 같은 명령을 쓰는 서버) cache backend (django 3.1 에는 없다)
+
+        'BACKEND'  : 'share.cache_backends.RedisCache',
+        'LOCATION' : 'redis://127.0.0.1:6379/0',
+
+    값은 pickle 로 저장한다. client 는 OPTIONS 의 CLIENT_CLASS(기본값 redis.Redis) 의 from_url 로 만들고,
+    LOCATION 이 local:// 이면 redis 없이 프로세스 안에서 같은 명령을 흉내 내는 LocalRedis 를 쓴다. (개발, 테스트용)
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        default = 'share.cache_backends.LocalRedis' if server.startswith('local://') else 'redis.Redis'
+
+        self.location     = server
+        self.client_class = import_string(options.get('CLIENT_CLASS', default))
+        self._client      = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_class.from_url(self.location)
+        return self._client
+
+    def get_timeout_ms(self, timeout=DEFAULT_TIMEOUT):
+        # redis 는 만료 시각이 아닌 남은 시간(ms)을 받는다 (None 이면 만료 없음)
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    def make_valid_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout_ms = self.get_timeout_ms(timeout)
+        if timeout_ms == 0:
+            return False
+        return bool(self.client.set(self.make_valid_key(key, version), pickle.dumps(value), px=timeout_ms, nx=True))
+
+    def get(self, key, default=None, version=None):
+        value = self.client.get(self.make_valid_key(key, version))
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key        = self.make_valid_key(key, version)
+        timeout_ms = self.get_timeout_ms(timeout)
+        if timeout_ms == 0:
+            self.client.delete(key)
+            return
+        self.client.set(key, pickle.dumps(value), px=timeout_ms)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key        = self.make_valid_key(key, version)
+        timeout_ms = self.get_timeout_ms(timeout)
+        if timeout_ms is None:
+            return bool(self.client.persist(key)) or bool(self.client.exists(key))
+        return bool(self.client.pexpire(key, timeout_ms))
+
+    def delete(self, key, version=None):
+        return bool(self.client.delete(self.make_valid_key(key, version)))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.make_valid_key(key, version) for key in keys])
+        return {key: pickle.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def has_key(self, key, version=None):
+        return bool(self.client.exists(self.make_valid_key(key, version)))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_valid_key(key, version) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        self.client.flushdb()
+
+    def close(self, **kwargs):
+        # client 가 연결 pool 을 가지고 있으므로 요청마다 닫지 않는다
+        pass
+
+
+class LocalRedis:
+    """
+    RedisCache 가 쓰는 redis 명령만 프로세스 메모리로 구현한 client
+
+    같은 URL 이면 같은 저장소를 쓰므로 thread 마다 만들어지는 cache 객체끼리 값을 공유한다.
+    프로세스끼리는 공유하지 않으므로 운영 환경에서는 redis 를 쓴다.
+    """
+
+    instances = {}
+    lock      = threading.Lock()
+
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.data    = {}
+        self.expires = {}
+
+    @classmethod
+    def from_url(cls, url):
+        with cls.lock:
+            if url not in cls.instances:
+                cls.instances[url] = cls()
+            return cls.instances[url]
+
+    def expire_key(self, name):
+        deadline = self.expires.get(name)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(name, None)
+            self.expires.pop(name, None)
+
+    def get(self, name):
+        with self.lock:
+            self.expire_key(name)
+            return self.data.get(name)
+
+    def set(self, name, value, px=None, nx=False):
+        with self.lock:
+            self.expire_key(name)
+            if nx and name in self.data:
+                return None
+            self.data[name] = value
+            if px is None:
+                self.expires.pop(name, None)
+            else:
+                self.expires[name] = time.monotonic() + px / 1000
+            return True
+
+    def mget(self, names):
+        return [self.get(name) for name in names]
+
+    def delete(self, *names):
+        with self.lock:
+            deleted = 0
+            for name in names:
+                self.expire_key(name)
+                if self.data.pop(name, None) is not None:
+                    deleted += 1
+                self.expires.pop(name, None)
+            return deleted
+
+    def exists(self, *names):
+        with self.lock:
+            for name in names:
+                self.expire_key(name)
+            return sum(1 for name in names if name in self.data)
+
+    def pexpire(self, name, milliseconds):
+        with self.lock:
+            self.expire_key(name)
+            if name not in self.data:
+                return False
+            self.expires[name] = time.monotonic() + milliseconds / 1000
+            return True
+
+    def persist(self, name):
+        with self.lock:
+            return self.expires.pop(name, None) is not None
+
+    def flushdb(self):
+        with self.lock:
+            self.data.clear()
+            self.expires.clear()
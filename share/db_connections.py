@@ -0,0 +1,121 @@
+import time
+import weakref
+import threading
+
+from django.conf import settings
+from django.db   import connections, close_old_connections, DatabaseError
+
+from .           import metrics
+
+# MySQL 에러 코드 : 읽기 전용(failover 로 replica 가 된 예전 primary), 연결 끊김
+FAILOVER_ERROR_CODES = {1290, 1792, 1836, 2006, 2013}
+
+lock        = threading.Lock()
+generation  = 0  # failover 가 감지될 때마다 올린다 (이전 세대 연결은 다음 요청에서 닫음)
+persistent  = weakref.WeakSet()  # 이 프로세스에서 계측 중인 연결 (thread 별 DatabaseWrapper)
+
+
+def recycle_connections():
+    # 이 프로세스의 모든 연결을 각 thread 의 다음 요청 시작 때 닫고 새로 연결하게 한다
+    global generation
+
+    with lock:
+        generation += 1
+    metrics.increment('db_connection_recycles_total')
+
+
+def is_failover_error(connection, error):
+    if connection.vendor != 'mysql':
+        return False
+    code = error.args[0] if error.args else None
+    return code in FAILOVER_ERROR_CODES
+
+
+def detect_failover(execute, sql, params, many, context):
+    try:
+        return execute(sql, params, many, context)
+    except DatabaseError as error:
+        if is_failover_error(context['connection'], error):
+            recycle_connections()
+        raise
+
+
+def instrument(connection):
+    """
+    연결을 열 때(get_new_connection) 걸린 시간과 횟수를 기록하고, 실패 조치용 execute wrapper 를 건다
+
+    DatabaseWrapper 는 thread 마다 하나이므로 처음 보는 wrapper 에 한 번만 건다.
+    """
+    if getattr(connection, 'suwee_instrumented', False):
+        return
+
+    get_new_connection = connection.get_new_connection
+
+    def timed_get_new_connection(conn_params):
+        started = time.perf_counter()
+        new_connection = get_new_connection(conn_params)
+        metrics.observe('db_connection_handshake_seconds', time.perf_counter() - started,
+                        metrics.HANDSHAKE_BUCKETS, alias=connection.alias)
+        metrics.increment('db_connections_opened_total', alias=connection.alias)
+        connection.suwee_generation = generation
+        return new_connection
+
+    connection.get_new_connection = timed_get_new_connection
+    connection.suwee_generation   = generation
+    connection.suwee_last_used    = time.monotonic()
+    connection.suwee_instrumented = True
+    connection.execute_wrappers.append(detect_failover)
+    persistent.add(connection)
+
+
+def count_open(alias):
+    return sum(1 for connection in list(persistent) if connection.alias == alias and connection.connection is not None)
+
+
+def close(connection, reason):
+    metrics.increment('db_connections_closed_total', alias=connection.alias, reason=reason)
+    connection.close()
+
+
+def check_connections():
+    # 요청 시작 : 이전 세대 연결은 닫고, 오래 쉬었던 연결은 is_usable() 로 확인한 뒤 재사용한다
+    now = time.monotonic()
+    for alias in connections:
+        connection = connections[alias]
+        instrument(connection)
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+
+        if connection.suwee_generation != generation:
+            close(connection, 'recycled')
+        elif (now - connection.suwee_last_used >= settings.DATABASE_HEALTH_CHECK_IDLE_SECONDS
+              and not connection.is_usable()):
+            close(connection, 'unusable')
+        else:
+            metrics.increment('db_connections_reused_total', alias=alias)
+
+
+def release_connections():
+    # 요청 끝 : 프로세스의 열린 연결이 DATABASE_MAX_PERSISTENT_CONNECTIONS 를 넘으면 이 thread 의 연결은 닫는다
+    now = time.monotonic()
+    for alias in connections:
+        connection = connections[alias]
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+
+        connection.suwee_last_used = now
+        limit = settings.DATABASE_MAX_PERSISTENT_CONNECTIONS
+        if limit is not None and count_open(alias) > limit:
+            close(connection, 'limit')
+
+
+def run_with_connections(func, *args):
+    # 요청 밖 thread(thread pool, background thread)의 작업 하나 : WSGI 요청 thread 의 request_started/finished,
+    # ConnectionManagementMiddleware 와 같이 연결을 확인하고 재사용하며, 작업마다 모든 연결을 닫지 않는다
+    close_old_connections()
+    check_connections()
+    try:
+        return func(*args)
+    finally:
+        release_connections()
+        close_old_connections()
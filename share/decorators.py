@@ -1,11 +1,18 @@
 import json
 import jwt
+import hashlib
+from datetime           import date, datetime
 
-from django.http import JsonResponse
+from django.http        import JsonResponse
+from django.utils.http  import http_date
+from django.utils.cache import get_conditional_response
 
 from user.models import (
     User,
 )
+from .versions   import get_versions, versions_are_shared
+from .responses  import accepts_msgpack
+from .           import metrics
 import my_settings
 
 
@@ -28,3 +35,61 @@ def check_auth_decorator(func):
             return JsonResponse({"message":"INVALID_TOKEN"}, status=400)
 
     return wrapper
+
+
+def get_validators(request, resources):
+    # (ETag, Last-Modified) : 응답 본문 없이 경로, query string, 오늘 날짜, 응답 형식, version stamp 로 계산
+    today    = date.today()
+    versions = get_versions(*resources)
+    etag     = '"{}"'.format(hashlib.sha1('|'.join(
+        [request.get_full_path(), today.isoformat(), 'msgpack' if accepts_msgpack(request) else 'json']
+        + [str(version) for version in versions]
+    ).encode()).hexdigest())
+    last_modified = max(
+        max(versions) // 10**9,
+        int(datetime.combine(today, datetime.min.time()).timestamp()),
+    )
+    return etag, last_modified
+
+
+def get_not_modified_response(request, validators, view_name):
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        metrics.increment('conditional_get_not_modified_total', view=view_name)
+    return response
+
+
+def set_validators(response, validators):
+    if response.status_code == 200:
+        etag, last_modified       = validators
+        response['ETag']          = etag
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_get_decorator(*resources):
+    """
+    resource version stamp 로 ETag/Last-Modified 를 만들어 조건부 GET 처리
+
+    ETag 는 응답 본문을 만들지 않고 경로, query string, 오늘 날짜, 응답 형식, version stamp 만으로 계산하므로
+    If-None-Match/If-Modified-Since 가 맞으면 DB 조회 없이 304 를 돌려준다.
+    오늘 날짜 기준으로 결과가 달라지는 view 가 있어 날짜가 바뀌면 ETag 도 바뀐다.
+    resources 는 같은 조건부 GET 을 하는 async view 를 위해 wrapper.resources 로 남긴다. (book/async_views.py)
+    version stamp 를 프로세스끼리 공유하지 않는 설정(locmem)이면 304 가 바뀐 내용을 가릴 수 있어 그대로 실행한다.
+    """
+    def decorator(func):
+        def wrapper(self, request, *args, **kwargs):
+            if not versions_are_shared():
+                return func(self, request, *args, **kwargs)
+
+            validators = get_validators(request, resources)
+            response   = get_not_modified_response(request, validators, self.__class__.__name__)
+            if response is not None:
+                return response
+
+            return set_validators(func(self, request, *args, **kwargs), validators)
+
+        wrapper.resources = resources
+        return wrapper
+    return decorator
@@ -0,0 +1,122 @@
+import json
+import time
+import logging
+import subprocess
+from datetime import datetime
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db                   import connection
+from django.db.models            import Max
+from django.test                 import Client
+from django.test.utils           import override_settings
+
+from book.models     import Book
+from user.models     import User
+from user.views      import generate_token
+from share.benchmark import get_endpoints, summarize, make_rng, load_results, compare_results
+
+
+class Command(BaseCommand):
+    help = ('endpoint 별로 고정된 요청을 보내 지연 시간(p50/p95/p99)과 요청당 쿼리 수를 측정해 JSON 으로 출력합니다. '
+            'generate_dataset 으로 만든 데이터에서 실행합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='endpoint 당 측정 요청 수')
+        parser.add_argument('--warmup', type=int, default=5, help='endpoint 당 측정 전 요청 수')
+        parser.add_argument('--seed', type=int, default=14)
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='측정할 endpoint 이름 또는 app (예: books.detail, library), 반복 가능')
+        parser.add_argument('--output', help='결과 JSON 파일 (기본값: 표준 출력)')
+        parser.add_argument('--compare', help='이 결과 JSON 과 p50, 평균 쿼리 수를 비교해 출력합니다.')
+
+    def get_dataset(self):
+        dataset = {
+            'users' : User.objects.aggregate(id=Max('id'))['id'],
+            'books' : Book.objects.aggregate(id=Max('id'))['id'],
+        }
+        if not dataset['users'] or not dataset['books']:
+            raise CommandError('no data to benchmark (run generate_dataset first)')
+        return dataset
+
+    def send(self, client, endpoint, rng, dataset):
+        path, params, body = endpoint.make_request(rng, dataset)
+        headers            = {}
+        if endpoint.auth:
+            headers['HTTP_AUTHORIZATION'] = generate_token(rng.randint(1, dataset['users']))
+
+        started = time.perf_counter()
+        if endpoint.method == 'get':
+            response = client.get(path, params, **headers)
+        else:
+            response = client.post(path, json.dumps(body), content_type='application/json', **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        latency_ms = (time.perf_counter() - started) * 1000
+        # 쿼리 수는 RequestMetricsMiddleware 가 세어 X-Query-Count 로 붙인다
+        # (모든 DB 연결(replica, shard)과 요청이 thread 로 넘긴 조회까지 포함, share/request_context.py)
+        return latency_ms, int(response['X-Query-Count']), response.status_code
+
+    def get_git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        try:
+            endpoints = get_endpoints(options['endpoints'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        with override_settings(QUERY_COUNT_HEADER=True):
+            self.benchmark(endpoints, options)
+
+    def benchmark(self, endpoints, options):
+        dataset = self.get_dataset()
+        client  = Client(raise_request_exception=False)
+        # 500 응답은 결과의 statuses 로 남기고 traceback 은 출력하지 않는다
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        results = {}
+        for endpoint in endpoints:
+            rng = make_rng(options['seed'], endpoint.name)
+            for _ in range(options['warmup']):
+                self.send(client, endpoint, rng, dataset)
+
+            latencies, query_counts, statuses = [], [], []
+            for _ in range(options['requests']):
+                latency_ms, query_count, status = self.send(client, endpoint, rng, dataset)
+                latencies.append(latency_ms)
+                query_counts.append(query_count)
+                statuses.append(status)
+
+            results[endpoint.name] = summarize(latencies, query_counts, statuses)
+            self.stderr.write(f'{endpoint.name:<24} p50={results[endpoint.name]["p50_ms"]:>9.2f}ms '
+                              f'p95={results[endpoint.name]["p95_ms"]:>9.2f}ms '
+                              f'queries={results[endpoint.name]["queries"]["mean"]}')
+
+        output = {
+            'meta'      : {
+                'created_at' : datetime.now().isoformat(),
+                'git_commit' : self.get_git_commit(),
+                'database'   : connection.vendor,
+                'seed'       : options['seed'],
+                'requests'   : options['requests'],
+                'warmup'     : options['warmup'],
+                'dataset'    : dataset,
+            },
+            'endpoints' : results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                json.dump(output, output_file, ensure_ascii=False, indent=2)
+        else:
+            self.stdout.write(json.dumps(output, ensure_ascii=False, indent=2))
+
+        if options['compare']:
+            self.stderr.write(f'{"endpoint":<24}{"base p50":>10}{"p50":>10}{"change":>9}{"base q":>8}{"q":>8}')
+            for name, base_p50, p50, change, base_queries, queries in compare_results(
+                    load_results(options['compare']), output):
+                self.stderr.write(f'{name:<24}{base_p50:>10.2f}{p50:>10.2f}{change:>8.1f}%'
+                                  f'{base_queries:>8}{queries:>8}')
@@ -0,0 +1,200 @@
+import random
+from datetime import date, timedelta
+
+import bcrypt
+from django.core.management.base import BaseCommand, CommandError
+from django.db                   import transaction
+
+from book.models         import Book, Category, Keyword, Today, Review, Like
+from book.modules.covers import cover_wall
+from library.models      import Library, LibraryBook, LibraryChange
+from user.models         import (
+    User,
+    UserBook,
+    UserStatistics,
+    ReadingEvent,
+    DailyBookReading,
+    DailyUserReading,
+)
+from user.modules.bloom  import user_identity_filter
+from payment.models      import Payment
+from share.versions      import bump_versions
+from share.shards        import is_sharded, get_shard_aliases, group_by_shard
+
+CATEGORIES = ['소설', '에세이', '인문', '경제경영', '자기계발', '과학', '역사', '시', '여행', '요리', '예술', '사회']
+KEYWORDS   = ['전체', '요즘 뜨는', '힐링', '성장', '몰입', '지식', '감성', '고전', '추리', '로맨스']
+ADJECTIVES = ['조용한', '푸른', '작은', '오래된', '따뜻한', '낯선', '깊은', '빛나는', '느린', '새벽의', '마지막', '우리의']
+NOUNS      = ['바다', '도서관', '정원', '기억', '여름', '고양이', '편지', '숲', '도시', '별', '우주', '골목', '시간', '섬']
+FAMILY     = ['김', '이', '박', '최', '정', '강', '조', '윤', '장', '임', '한', '오', '서', '신', '권']
+GIVEN      = ['민준', '서연', '도윤', '하은', '지호', '수아', '예준', '지유', '시우', '채원', '하준', '지민', '수희', '은서']
+COMPANIES  = ['민음사', '문학동네', '창비', '위즈덤하우스', '김영사', '한빛미디어', '열린책들', '다산북스']
+SENTENCES  = [
+    '책장을 넘길 때마다 새로운 풍경이 펼쳐진다.',
+    '작가는 평범한 하루 속에서 특별한 순간을 찾아낸다.',
+    '오랫동안 곁에 두고 다시 읽고 싶은 책이다.',
+    '복잡한 개념을 쉬운 언어로 풀어낸 점이 돋보인다.',
+    '마지막 장을 덮고 나서도 긴 여운이 남는다.',
+    '등장인물들의 대화가 생생하게 살아 있다.',
+    '출퇴근길에 조금씩 읽기 좋은 분량이다.',
+    '우리가 미처 몰랐던 세계를 보여준다.',
+]
+
+
+class Command(BaseCommand):
+    help = '성능 측정용 합성 데이터(사용자, 책, 서재, 독서 기록, 리뷰, 좋아요)를 bulk_create 로 생성합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=5000)
+        parser.add_argument('--user-books', type=int, default=20, help='사용자당 평균 독서 기록 수')
+        parser.add_argument('--library-books', type=int, default=30, help='사용자당 평균 서재 책 수')
+        parser.add_argument('--reviews', type=int, default=3, help='책당 평균 리뷰 수')
+        parser.add_argument('--likes', type=int, default=2, help='리뷰당 평균 좋아요 수')
+        parser.add_argument('--seed', type=int, default=14, help='같은 seed 면 같은 데이터를 만듭니다.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help='기존 데이터를 모두 지우고 생성합니다.')
+
+    def text(self, count):
+        return ' '.join(self.random.choice(SENTENCES) for _ in range(count))
+
+    def title(self):
+        return f'{self.random.choice(ADJECTIVES)} {self.random.choice(NOUNS)}'
+
+    def person(self):
+        return f'{self.random.choice(FAMILY)}{self.random.choice(GIVEN)}'
+
+    def around(self, mean):
+        # 평균 mean 근처의 0 이상 정수 (사용자, 책마다 편차가 있도록)
+        return max(0, int(self.random.expovariate(1 / mean))) if mean else 0
+
+    def create(self, model, rows):
+        if is_sharded(model):
+            for alias, shard_rows in group_by_shard(rows, lambda row: row.user_id).items():
+                model.objects.on_shard(alias).bulk_create(shard_rows, batch_size=self.batch_size)
+        else:
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+        self.stdout.write(f'{model._meta.db_table}: {len(rows)}')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['books'] < 1:
+            raise CommandError('--users and --books must be at least 1')
+
+        self.random     = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            if options['clear']:
+                # signal(변경 로그, 통계 증분 갱신)과 cascade 수집 없이 참조하는 쪽부터 바로 지운다
+                for model in (Payment, Like, Review, Today, LibraryChange, LibraryBook, Library, ReadingEvent,
+                              DailyBookReading, DailyUserReading, UserStatistics, UserBook, Book, User,
+                              Category, Keyword):
+                    for alias in (get_shard_aliases() if is_sharded(model) else [model.objects.db]):
+                        model.objects.all()._raw_delete(alias)
+            elif User.objects.exists() or Book.objects.exists():
+                raise CommandError('database is not empty (use --clear to replace existing data)')
+
+            self.generate(options)
+
+        user_identity_filter.reset()
+        cover_wall.mark_dirty()
+        bump_versions('books', 'today', 'reviews', 'user_books')
+
+    def generate(self, options):
+        today    = date.today()
+        password = bcrypt.hashpw('password1234!'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+        self.create(Category, [Category(id=index, name=name) for index, name in enumerate(CATEGORIES, start=1)])
+        self.create(Keyword, [Keyword(id=index, name=name) for index, name in enumerate(KEYWORDS, start=1)])
+
+        self.create(User, [User(
+            id           = user_id,
+            nickname     = f'{self.random.choice(ADJECTIVES)}{self.random.choice(NOUNS)}{user_id}',
+            password     = password,
+            email        = f'reader{user_id}@suwee.com',
+            image_url    = f'https://image.suwee.com/users/{user_id}.jpg',
+            phone_number = f'010{user_id:08d}',
+        ) for user_id in range(1, options['users'] + 1)])
+
+        books = []
+        for book_id in range(1, options['books'] + 1):
+            # 대부분 지난 3년 안에 출간, 일부는 한 달 안에 출간 예정
+            days = self.random.randint(-30, -1) if self.random.random() < 0.05 else self.random.randint(0, 365 * 3)
+            books.append(Book(
+                id               = book_id,
+                title            = self.title()[:45],
+                subtitle         = self.title()[:45],
+                image_url        = f'https://image.suwee.com/books/{book_id}/cover.jpg' if self.random.random() < 0.95 else '',
+                company          = self.random.choice(COMPANIES),
+                author           = self.person(),
+                about_author     = self.text(3),
+                contents         = '\n'.join(f'{chapter}장 {self.title()}' for chapter in range(1, self.random.randint(5, 20))),
+                company_review   = self.text(self.random.randint(10, 40)),
+                page             = self.random.randint(80, 800),
+                publication_date = today - timedelta(days=days),
+                description      = self.text(self.random.randint(10, 60)),
+                category_id      = self.random.randint(1, len(CATEGORIES)),
+                keyword_id       = self.random.randint(1, len(KEYWORDS)),
+            ))
+        self.create(Book, books)
+        pages = {book.id: book.page for book in books}
+
+        self.create(Today, [Today(
+            book_id     = self.random.randint(1, options['books']),
+            description = self.text(2),
+            pick_date   = today - timedelta(days=days),
+        ) for days in range(30)])
+
+        user_books, libraries, library_books = [], [], []
+        for user_id in range(1, options['users'] + 1):
+            for book_id in self.random.sample(range(1, options['books'] + 1),
+                                              min(self.around(options['user_books']), options['books'])):
+                finished = self.random.random() < 0.4
+                user_books.append(UserBook(
+                    user_id = user_id,
+                    book_id = book_id,
+                    page    = pages[book_id] if finished else self.random.randint(1, pages[book_id]),
+                    time    = self.random.randint(10, 900),
+                ))
+
+            libraries.append(Library(id=user_id, user_id=user_id, name=f'{user_id}의 서재',
+                                     image_url=f'https://image.suwee.com/libraries/{user_id}.jpg'))
+            for book_id in self.random.sample(range(1, options['books'] + 1),
+                                              min(self.around(options['library_books']), options['books'])):
+                book = books[book_id - 1]
+                library_books.append(LibraryBook(
+                    library_id            = user_id,
+                    user_id               = user_id,
+                    book_id               = book_id,
+                    book_title            = book.title,
+                    book_author           = book.author,
+                    book_publication_date = book.publication_date,
+                ))
+        self.create(UserBook, user_books)
+        self.create(Library, libraries)
+        self.create(LibraryBook, library_books)
+
+        reviews = [Review(
+            id       = review_id,
+            user_id  = self.random.randint(1, options['users']),
+            book_id  = book_id,
+            contents = self.text(2)[:200],
+        ) for review_id, book_id in enumerate(
+            (book_id for book_id in range(1, options['books'] + 1) for _ in range(self.around(options['reviews']))),
+            start=1,
+        )]
+        self.create(Review, reviews)
+
+        self.create(Like, [Like(review_id=review.id, user_id=user_id) for review in reviews
+                           for user_id in self.random.sample(range(1, options['users'] + 1),
+                                                             min(self.around(options['likes']), options['users']))])
+
+        # bulk_create 는 signal 을 보내지 않으므로 통계도 UserStatistics.compute 와 같은 형식으로 직접 만든다
+        statistics = {user_id: UserStatistics(user_id=user_id, category_counts={})
+                      for user_id in range(1, options['users'] + 1)}
+        for user_book in user_books:
+            row                   = statistics[user_book.user_id]
+            category_id           = str(books[user_book.book_id - 1].category_id)
+            row.total_book_count += 1
+            row.total_read_time  += user_book.time
+            row.category_counts[category_id] = row.category_counts.get(category_id, 0) + 1
+        self.create(UserStatistics, list(statistics.values()))
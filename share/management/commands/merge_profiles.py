@@ -0,0 +1,44 @@
+import os
+import glob
+from collections import Counter
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'sampling profiler 가 남긴 route 별 collapsed stack 을 합쳐 flamegraph 입력(collapsed 형식)으로 출력합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILER_DIR, help='profile 파일 디렉터리')
+        parser.add_argument('--route', help='이 문자열이 들어간 route 만 (예: "GET books/<int:book_id>")')
+        parser.add_argument('--output', help='출력 파일 (기본값: 표준 출력)')
+        parser.add_argument('--clear', action='store_true', help='합친 뒤 원본 profile 파일을 삭제합니다.')
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(os.path.join(glob.escape(options['dir']), '*.collapsed')))
+        if not paths:
+            raise CommandError(f'no profiles in {options["dir"]}')
+
+        stacks = Counter()
+        for path in paths:
+            with open(path, encoding='utf-8') as profile_file:
+                for line in profile_file:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if not stack or not count.isdigit():
+                        continue
+                    if options['route'] and options['route'].replace(' ', '_') not in stack.split(';', 1)[0]:
+                        continue
+                    stacks[stack] += int(count)
+
+        lines = [f'{stack} {count}\n' for stack, count in sorted(stacks.items())]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                output_file.writelines(lines)
+        else:
+            self.stdout.write(''.join(lines), ending='')
+
+        if options['clear']:
+            for path in paths:
+                os.remove(path)
+        self.stderr.write(f'merged {len(paths)} files, {sum(stacks.values())} samples, {len(stacks)} stacks')
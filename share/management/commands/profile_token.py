@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from share.profiler import PROFILE_HEADER, make_profile_token
+
+
+class Command(BaseCommand):
+    help = '요청을 profiling 하기 위한 서명된 X-Suwee-Profile 헤더를 출력합니다. (PROFILER_HEADER_MAX_AGE 초 동안 유효)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{PROFILE_HEADER}: {make_profile_token()}')
@@ -0,0 +1,67 @@
+import glob
+import json
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = '느린 쿼리 로그(SLOW_QUERY_LOG_FILE, 회전된 파일 포함)를 SQL 별로 모아 순위를 출력합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.SLOW_QUERY_LOG_FILE, help='로그 파일 경로')
+        parser.add_argument('--order', choices=['total', 'count', 'max'], default='total',
+                            help='정렬 기준 (누적 시간, 횟수, 최대 시간)')
+        parser.add_argument('--top', type=int, default=20, help='출력할 SQL 수')
+        parser.add_argument('--since', help='이 시각(ISO 형식) 이후 기록만 집계')
+
+    def read_entries(self, path, since):
+        for file_path in sorted(glob.glob(f'{glob.escape(path)}*')):
+            # logrotate 가 압축한 예전 파일(.gz)은 건너뛴다
+            if file_path.endswith('.gz'):
+                continue
+            with open(file_path, encoding='utf-8') as log_file:
+                for line in log_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since and entry['time'] < since:
+                        continue
+                    yield entry
+
+    def handle(self, *args, **options):
+        if not options['file']:
+            raise CommandError('SLOW_QUERY_LOG_FILE is not configured')
+
+        # 같은 SQL(파라미터 자리 표시 %s 는 그대로)끼리 묶는다
+        offenders = {}
+        for entry in self.read_entries(options['file'], options['since']):
+            offender = offenders.setdefault(entry['sql'], {
+                'count' : 0, 'total' : 0.0, 'max' : 0.0, 'views' : set(), 'slowest' : None,
+            })
+            offender['count'] += 1
+            offender['total'] += entry['duration_ms']
+            offender['views'].add(entry['view'] or '-')
+            if entry['duration_ms'] >= offender['max']:
+                offender['max']     = entry['duration_ms']
+                offender['slowest'] = entry
+
+        if not offenders:
+            self.stdout.write('no slow queries')
+            return
+
+        ranked = sorted(offenders.items(), key=lambda item: item[1][options['order']], reverse=True)
+        for rank, (sql, offender) in enumerate(ranked[:options['top']], start=1):
+            slowest = offender['slowest']
+            self.stdout.write(
+                f'#{rank} total={offender["total"]:.1f}ms count={offender["count"]} '
+                f'avg={offender["total"] / offender["count"]:.1f}ms max={offender["max"]:.1f}ms '
+                f'views={",".join(sorted(offender["views"]))}'
+            )
+            self.stdout.write(f'    sql: {sql}')
+            self.stdout.write(f'    params: {slowest["params"]}')
+            for frame in slowest['stack']:
+                self.stdout.write(f'    at {frame}')
+            for row in slowest['explain'] or []:
+                self.stdout.write(f'    explain: {row}')
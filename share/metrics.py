@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import bisect
+import tempfile
+import threading
+
+from django.conf import settings
+
+# 요청 처리 시간(초), 쿼리 수, DB 시간(초), 응답 크기(byte) histogram bucket 상한
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS    = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS     = (100, 1000, 10000, 100000, 1000000, 10000000)
+# DB 연결 시간(초) : TCP + 인증 handshake
+HANDSHAKE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+_lock       = threading.Lock()
+_counters   = {}
+_histograms = {}
+_flushed_at = 0
+
+
+def get_key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def increment(name, amount=1, **labels):
+    key = get_key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, buckets, **labels):
+    # bucket 별 개수만 더해 두고, 누적 개수(le)는 출력할 때 계산한다
+    key   = get_key(name, labels)
+    index = bisect.bisect_left(buckets, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [list(buckets), [0] * (len(buckets) + 1), 0.0]
+        histogram[1][index] += 1
+        histogram[2]        += value
+
+
+def get_counter(name, **labels):
+    return _counters.get(get_key(name, labels), 0)
+
+
+def get_histogram(name, **labels):
+    # (bucket 별 개수, 합계) - 없으면 None
+    histogram = _histograms.get(get_key(name, labels))
+    return (list(histogram[1]), histogram[2]) if histogram else None
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters'   : [[name, labels, value] for (name, labels), value in _counters.items()],
+            'histograms' : [[name, labels, buckets, list(counts), total]
+                            for (name, labels), (buckets, counts, total) in _histograms.items()],
+        }
+
+
+def get_snapshot_path(pid):
+    return os.path.join(settings.METRICS_DIR, f'metrics_{pid}.json')
+
+
+def flush(force=False):
+    """
+    이 프로세스의 지표를 METRICS_DIR/metrics_<pid>.json 으로 저장
+
+    요청마다 호출되지만 METRICS_FLUSH_SECONDS 에 한 번만 쓴다. METRICS_DIR 이 없으면 아무것도 하지 않는다.
+    """
+    global _flushed_at
+
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _flushed_at < settings.METRICS_FLUSH_SECONDS:
+        return
+    _flushed_at = now
+
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    descriptor, path = tempfile.mkstemp(dir=settings.METRICS_DIR, prefix='.metrics_')
+    with os.fdopen(descriptor, 'w') as snapshot_file:
+        json.dump(snapshot(), snapshot_file)
+    os.replace(path, get_snapshot_path(os.getpid()))
+
+
+def collect():
+    """
+    모든 worker 프로세스의 지표 합계
+
+    METRICS_DIR 이 없으면 이 프로세스의 지표만 돌려준다.
+    종료된 worker 의 파일도 합산하므로 (counter 가 줄지 않도록) 배포할 때 METRICS_DIR 을 비운다.
+    """
+    snapshots = [snapshot()]
+    if settings.METRICS_DIR and os.path.isdir(settings.METRICS_DIR):
+        own_path = get_snapshot_path(os.getpid())
+        for file_name in os.listdir(settings.METRICS_DIR):
+            path = os.path.join(settings.METRICS_DIR, file_name)
+            if not file_name.startswith('metrics_') or path == own_path:
+                continue
+            try:
+                with open(path) as snapshot_file:
+                    snapshots.append(json.load(snapshot_file))
+            except (OSError, ValueError):
+                continue
+
+    counters, histograms = {}, {}
+    for data in snapshots:
+        for name, labels, value in data['counters']:
+            key           = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total in data['histograms']:
+            key       = (name, tuple(tuple(label) for label in labels))
+            histogram = histograms.setdefault(key, [buckets, [0] * len(counts), 0.0])
+            if histogram[0] != buckets:
+                continue
+            histogram[1] = [current + count for current, count in zip(histogram[1], counts)]
+            histogram[2] += total
+    return counters, histograms
+
+
+def format_labels(labels, extra=()):
+    label_text = ','.join(f'{key}="{value}"' for key, value in tuple(labels) + tuple(extra))
+    return f'{{{label_text}}}' if label_text else ''
+
+
+def render():
+    # Prometheus text format
+    counters, histograms = collect()
+
+    lines = []
+    for name in sorted({name for name, labels in counters}):
+        lines.append(f'# TYPE {name} counter')
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f'{name}{format_labels(labels)} {value}')
+
+    for name in sorted({name for name, labels in histograms}):
+        lines.append(f'# TYPE {name} histogram')
+        for (histogram_name, labels), (buckets, counts, total) in sorted(histograms.items()):
+            if histogram_name != name:
+                continue
+            cumulative = 0
+            for bucket, count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels, [("le", bucket)])} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
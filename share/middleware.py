@@ -0,0 +1,235 @@
+import abc
+import sys
+import random
+import asyncio
+import time
+
+from django.conf        import settings
+from django.core.cache  import cache
+from django.utils.cache import patch_vary_headers
+
+from .responses         import FastJsonResponse, accepts_msgpack, dumps_msgpack
+from .                  import metrics
+from .request_context   import RequestState, current_request
+from .profiler          import PROFILE_HEADER, profiler, is_valid_profile_token, save_samples
+from .routers           import RoutingState, routing_state, get_pin_key
+from .db_connections    import check_connections, release_connections
+from .async_db          import run_in_db_thread
+
+
+class HybridMiddleware(abc.ABC):
+    """
+    WSGI(sync) 와 ASGI(async) 양쪽에서 쓰는 middleware 의 abstract base class
+
+    sync 전용 middleware 는 ASGI 에서 요청마다 thread 하나로 넘겨져 요청들이 줄을 서므로,
+    get_response 가 coroutine 이면 acall 로 event loop 에서 처리한다. (django MiddlewareMixin 과 같은 방식)
+    하위 class 는 call(sync) 과 acall(async) 을 모두 구현해야 한다. (하나라도 없으면 만들 수 없다)
+    """
+
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async     = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # 바깥 handler 가 이 middleware 를 coroutine function 으로 보게 한다
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    @abc.abstractmethod
+    def call(self, request):
+        """WSGI 요청 처리 : self.get_response(request) 의 응답을 돌려준다"""
+
+    @abc.abstractmethod
+    async def acall(self, request):
+        """ASGI 요청 처리 : await self.get_response(request) 의 응답을 돌려준다"""
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """
+    route 별 요청 처리 시간, 쿼리 수, DB 시간, 응답 크기 histogram 기록
+
+    route 는 URL pattern (예: books/<int:book_id>) 이라 id 별로 지표가 흩어지지 않는다.
+    지표는 프로세스 메모리에 쌓이고 METRICS_DIR 이 있으면 주기적으로 파일로 남겨 /metrics 에서 합친다.
+    쿼리는 share/request_context.py 의 execute wrapper 가 세므로 async view 가 thread 에서 실행한 쿼리도 포함된다.
+    """
+
+    def call(self, request):
+        state   = RequestState()
+        token   = current_request.set(state)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.record(request, response, state, time.perf_counter() - started)
+
+    async def acall(self, request):
+        state   = RequestState()
+        token   = current_request.set(state)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.record(request, response, state, time.perf_counter() - started)
+
+    def record(self, request, response, state, duration):
+        match  = getattr(request, 'resolver_match', None)
+        labels = {
+            'route'  : match.route if match else 'unmatched',
+            'method' : request.method,
+            'status' : str(response.status_code),
+        }
+        metrics.observe('http_request_duration_seconds', duration, metrics.DURATION_BUCKETS, **labels)
+        metrics.observe('http_request_db_queries', state.query_count, metrics.QUERY_BUCKETS, **labels)
+        metrics.observe('http_request_db_duration_seconds', state.query_duration, metrics.DURATION_BUCKETS, **labels)
+        if not response.streaming:
+            metrics.observe('http_response_size_bytes', len(response.content), metrics.SIZE_BUCKETS, **labels)
+
+        if settings.QUERY_COUNT_HEADER:
+            response['X-Query-Count'] = str(state.query_count)
+
+        metrics.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # 느린 쿼리 로그에 남길 view 이름
+        state = current_request.get()
+        if state is not None:
+            state.view = f'{view_func.__module__}.{view_func.__name__}'
+
+
+class MessagePackMiddleware(HybridMiddleware):
+    """
+    Accept: application/msgpack 요청이면 FastJsonResponse 를 MessagePack 으로 내보낸다
+
+    view 는 그대로 FastJsonResponse 를 돌려주고, 본문이 인코딩되기 전(process_template_response)에
+    인코더만 바꾼다. 같은 URL 이 Accept 에 따라 달라지므로 Vary: Accept 를 붙인다.
+    """
+
+    def call(self, request):
+        return self.patch_vary(self.get_response(request))
+
+    async def acall(self, request):
+        return self.patch_vary(await self.get_response(request))
+
+    def patch_vary(self, response):
+        if isinstance(response, FastJsonResponse):
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+    def process_template_response(self, request, response):
+        if isinstance(response, FastJsonResponse) and accepts_msgpack(request):
+            response.encoder         = dumps_msgpack
+            response['Content-Type'] = 'application/msgpack'
+        return response
+
+
+class SamplingProfilerMiddleware(HybridMiddleware):
+    """
+    PROFILER_SAMPLE_RATE 비율의 요청, 또는 서명된 X-Suwee-Profile 헤더가 있는 요청을 sampling profiling
+
+    collapsed stack 은 route 별 파일로 남기고 (manage.py merge_profiles 로 합침),
+    헤더로 요청한 경우 응답에 sample 수를 X-Suwee-Profile-Samples 로 돌려준다.
+    ASGI 에서는 요청이 event loop 와 DB thread 에 나뉘어 실행되어 요청 하나의 stack 을 sampling 할 수 없으므로
+    profiling 하지 않는다.
+    """
+
+    async def acall(self, request):
+        return await self.get_response(request)
+
+    def call(self, request):
+        token     = request.headers.get(PROFILE_HEADER)
+        requested = token is not None and is_valid_profile_token(token)
+        if not requested and (not settings.PROFILER_SAMPLE_RATE or random.random() >= settings.PROFILER_SAMPLE_RATE):
+            return self.get_response(request)
+
+        profiler.start(sys._getframe())
+        try:
+            response = self.get_response(request)
+        finally:
+            samples = profiler.stop()
+
+        match = getattr(request, 'resolver_match', None)
+        if samples:
+            save_samples(f'{request.method} {match.route if match else "unmatched"}', samples)
+        if requested:
+            response['X-Suwee-Profile-Samples'] = str(sum(samples.values()))
+        return response
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    GET, HEAD, OPTIONS 요청의 읽기를 replica 로 보내도록 ReplicaRouter 의 상태를 정한다
+
+    요청 중 primary 에 쓰기가 있었으면 같은 Authorization token 의 요청을 REPLICA_PIN_SECONDS 동안
+    primary 로 고정해 복제가 늦더라도 방금 쓴 내용을 읽을 수 있게 한다. (고정 정보는 cache 에 둔다)
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def call(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        pin_key = get_pin_key(request)
+        pinned  = bool(pin_key and cache.get(pin_key))
+        state   = RoutingState(request.method in self.SAFE_METHODS and not pinned)
+        token   = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        if state.wrote and pin_key:
+            self.pin(pin_key)
+        return response
+
+    async def acall(self, request):
+        # 고정 정보를 둔 cache 가 memcached/redis 면 네트워크 조회라 event loop 밖에서 읽고 쓴다
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        pin_key = get_pin_key(request)
+        pinned  = bool(pin_key and await run_in_db_thread(cache.get, pin_key))
+        state   = RoutingState(request.method in self.SAFE_METHODS and not pinned)
+        token   = routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        if state.wrote and pin_key:
+            await run_in_db_thread(self.pin, pin_key)
+        return response
+
+    def pin(self, pin_key):
+        cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+        metrics.increment('db_primary_pin_total')
+
+
+class ConnectionManagementMiddleware(HybridMiddleware):
+    """
+    CONN_MAX_AGE 로 재사용하는 DB 연결 관리
+
+    요청 전에 failover 이후의 이전 세대 연결과 DATABASE_HEALTH_CHECK_IDLE_SECONDS 이상 쉬었던 연결 중
+    쓸 수 없는 연결을 닫아 요청 중에 끊긴 연결로 실패하지 않게 하고, 요청 후에는 프로세스의 열린 연결 수를
+    DATABASE_MAX_PERSISTENT_CONNECTIONS 로 제한한다. 연결 생성/재사용 횟수와 연결 시간은 /metrics 로 본다.
+    ASGI 에서는 DB 연결이 event loop 가 아닌 DB thread 에 있으므로 share/async_db.py 가 작업마다 같은 일을 한다.
+    """
+
+    async def acall(self, request):
+        return await self.get_response(request)
+
+    def call(self, request):
+        check_connections()
+        try:
+            return self.get_response(request)
+        finally:
+            release_connections()
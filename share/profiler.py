@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = 'X-Suwee-Profile'
+PROFILE_SALT   = 'share.profiler'
+
+
+def make_profile_token():
+    # X-Suwee-Profile 헤더 값 (PROFILER_HEADER_MAX_AGE 초 동안 유효)
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign('profile')
+
+
+def is_valid_profile_token(token):
+    try:
+        signing.TimestampSigner(salt=PROFILE_SALT).unsign(token, max_age=settings.PROFILER_HEADER_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def get_frame_name(code):
+    # 프로젝트 코드는 BASE_DIR 기준, 라이브러리는 site-packages 기준 경로로 줄인다
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir) + 1:]
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages', 1)[1].lstrip(os.sep)
+    return f'{filename}:{code.co_name}'.replace(';', ':').replace(' ', '_')
+
+
+class SamplingProfiler:
+    """
+    sys._current_frames() 로 등록된 thread 의 stack 을 주기적으로 읽는 sampling profiler
+
+    하나의 sampler thread 가 profiling 중인 모든 요청 thread 를 PROFILER_INTERVAL_MS 마다 본다.
+    요청 thread 에는 hook 을 걸지 않으므로 sampling 하지 않는 동안에는 비용이 없다.
+    """
+
+    def __init__(self):
+        self.lock   = threading.Lock()
+        self.active = {}  # thread id : (기준 frame, Counter)
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self, base_frame):
+        # base_frame 위쪽(WSGI 서버, middleware) frame 은 stack 에서 뺀다
+        with self.lock:
+            self.active[threading.get_ident()] = (base_frame, Counter())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def stop(self):
+        with self.lock:
+            base_frame, samples = self.active.pop(threading.get_ident())
+        return samples
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(settings.PROFILER_INTERVAL_MS / 1000)
+            with self.lock:
+                if not self.active:
+                    self.wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, (base_frame, samples) in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self.collapse(frame, base_frame)] += 1
+
+    def collapse(self, frame, base_frame):
+        names = []
+        while frame is not None and frame is not base_frame:
+            names.append(get_frame_name(frame.f_code))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+profiler = SamplingProfiler()
+
+
+def save_samples(route, samples):
+    """
+    PROFILER_DIR/<route>.<pid>.collapsed 에 collapsed stack 을 이어 쓴다
+
+    각 줄은 'route;frame;frame... count' 형식이며 merge_profiles 로 합친다.
+    """
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    file_name = ''.join(char if char.isalnum() else '_' for char in route).strip('_') or 'root'
+    path      = os.path.join(settings.PROFILER_DIR, f'{file_name}.{os.getpid()}.collapsed')
+    root      = route.replace(';', ':').replace(' ', '_')
+    with open(path, 'a', encoding='utf-8') as profile_file:
+        for stack, count in samples.items():
+            profile_file.write(f'{root};{stack} {count}\n' if stack else f'{root} {count}\n')
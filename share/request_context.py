@@ -0,0 +1,51 @@
+import time
+import contextvars
+from functools import wraps
+
+
+class RequestState:
+    # 요청 하나의 상태 (RequestMetricsMiddleware 에서 만들고 process_view, DB execute wrapper 가 채운다)
+    def __init__(self):
+        self.view           = None
+        self.query_count    = 0
+        self.query_duration = 0.0
+
+
+# thread-local 이 아닌 context 변수라 ASGI 의 async view 가 DB 조회를 다른 thread 로 넘겨도 같은 요청 상태를 본다
+# (값을 바꾸지 않고 객체를 고치므로 thread 에서 센 쿼리 수도 요청에 남는다)
+current_request = contextvars.ContextVar('current_request', default=None)
+
+
+def get_current_view():
+    state = current_request.get()
+    return state.view if state is not None else None
+
+
+def record_query(execute, sql, params, many, context):
+    # 모든 DB 연결에 걸리는 execute wrapper : 요청 중 실행된 쿼리 수와 시간을 센다
+    state = current_request.get()
+    if state is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state.query_count    += 1
+        state.query_duration += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created signal : 새 DB 연결마다 wrapper 를 건다
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def bind_context(func):
+    # thread pool 로 넘기는 작업이 요청의 context(replica routing 상태, 쿼리 기록)를 그대로 쓰도록 한다
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
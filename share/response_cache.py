@@ -0,0 +1,154 @@
+import time
+import hashlib
+import threading
+from datetime          import date
+from concurrent        import futures
+from functools         import wraps
+
+from django.conf       import settings
+from django.core.cache import cache, caches
+
+from .versions         import get_versions, bump_versions_on_commit, versions_are_shared
+from .db_connections   import run_with_connections
+from .                 import metrics
+
+revalidate_lock     = threading.Lock()
+revalidate_executor = None
+
+
+def invalidate_tags(*tags):
+    """
+    tag(예: book:1, keyword:3)를 단 응답 캐시를 무효화
+
+    tag 는 share/versions.py 의 version stamp 라서 값을 지우지 않고 stamp 만 올린다.
+    캐시된 응답은 저장할 때의 stamp 와 지금 stamp 가 다르면 버려진다. (모든 tier 에 같은 규칙)
+    stamp 는 shared tier 처럼 모든 프로세스가 공유하는 'versions' 캐시에 있으므로 다른 worker 의 캐시도 무효화된다.
+    """
+    bump_versions_on_commit(*tags)
+
+
+def get_tiers():
+    # RESPONSE_CACHE_TIERS 순서로 찾는다 (앞쪽이 빠른 tier)
+    return [caches[alias] for alias in settings.RESPONSE_CACHE_TIERS]
+
+
+def get_key(view_name, params, args):
+    # 조회 조건이 같으면 같은 key (오늘 날짜 기준으로 결과가 달라지는 view 가 있어 날짜도 넣는다)
+    if hasattr(params, 'lists'):
+        items = sorted(params.lists())
+    else:
+        items = sorted((key, [value]) for key, value in params.items())
+    raw = '|'.join([view_name, date.today().isoformat(), repr(args), repr(items)])
+    return f'response:{view_name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def get_entry(key):
+    # 뒤쪽 tier 에서 찾으면 앞쪽 tier 에 남은 시간만큼 채운다
+    tiers = get_tiers()
+    for index, tier in enumerate(tiers):
+        entry = tier.get(key)
+        if entry is None:
+            continue
+        remaining = entry['stored_at'] + entry['ttl'] + entry['stale'] - time.time()
+        if remaining > 0:
+            for upper in tiers[:index]:
+                upper.set(key, entry, remaining)
+        return entry
+    return None
+
+
+def is_valid(entry):
+    tags = list(entry['versions'])
+    return get_versions(*tags) == [entry['versions'][tag] for tag in tags]
+
+
+def store(func, view, params, args, key, tags, result_tags, ttl, stale):
+    # stamp 는 조회 전에 읽어 조회 중 바뀐 내용이 다음 요청에서 무효화되게 한다
+    # (결과에서 뽑는 result_tags 는 조회 후에 읽으므로 그 사이 바뀐 내용은 TTL 이 지나야 반영된다)
+    versions        = dict(zip(tags, get_versions(*tags)))
+    payload, status = func(view, params, *args)
+    if status != 200:
+        return payload, status
+
+    extra = [tag for tag in (result_tags(payload) if result_tags else ()) if tag not in versions]
+    versions.update(zip(extra, get_versions(*extra)))
+    entry = {
+        'payload'   : payload,
+        'status'    : status,
+        'versions'  : versions,
+        'stored_at' : time.time(),
+        'ttl'       : ttl,
+        'stale'     : stale,
+    }
+    for tier in get_tiers():
+        tier.set(key, entry, ttl + stale)
+    return payload, status
+
+
+def get_revalidate_executor():
+    global revalidate_executor
+
+    with revalidate_lock:
+        if revalidate_executor is None:
+            revalidate_executor = futures.ThreadPoolExecutor(
+                max_workers=settings.RESPONSE_CACHE_REVALIDATE_WORKERS, thread_name_prefix='response-cache')
+    return revalidate_executor
+
+
+def revalidate(func, view, params, args, key, tags, result_tags, ttl, stale):
+    lock_key = f'{key}:revalidating'
+    try:
+        store(func, view, params, args, key, tags, result_tags, ttl, stale)
+    finally:
+        cache.delete(lock_key)
+
+
+def schedule_revalidate(*args):
+    # 같은 key 는 한 번만 다시 조회한다 (다른 요청은 그동안 지난 응답을 받는다)
+    key = args[4]
+    if not cache.add(f'{key}:revalidating', True, timeout=settings.RESPONSE_CACHE_REVALIDATE_TIMEOUT):
+        return
+    if not settings.RESPONSE_CACHE_REVALIDATE_WORKERS:
+        revalidate(*args)
+        return
+    # worker thread 의 DB 연결은 요청 thread 와 같이 확인 후 재사용한다 (share/db_connections.py)
+    get_revalidate_executor().submit(run_with_connections, revalidate, *args)
+
+
+def cached_payload(tags=(), result_tags=None):
+    """
+    get_payload(self, params, *args) 결과를 tier 캐시에 저장하는 decorator (stale-while-revalidate)
+
+    TTL 은 settings.RESPONSE_CACHE_TTL 의 view class 이름으로 찾고 없으면 캐시하지 않는다.
+    version stamp 를 프로세스끼리 공유하지 않는 설정(locmem)이면 다른 worker 의 무효화를 볼 수 없어 캐시하지 않는다.
+    TTL 이 지난 뒤 RESPONSE_CACHE_STALE_SECONDS 동안은 지난 응답을 바로 돌려주고 background 에서 다시 조회한다.
+    tags(params, *args) 와 result_tags(payload) 로 붙인 tag 가 무효화되면(invalidate_tags) 캐시를 쓰지 않는다.
+    200 이 아닌 응답(NO_BOOKS 등)은 캐시하지 않는다.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, params, *args):
+            view_name = self.__class__.__name__
+            ttl       = settings.RESPONSE_CACHE_TTL.get(view_name)
+            if ttl is None or not versions_are_shared():
+                return func(self, params, *args)
+
+            stale      = settings.RESPONSE_CACHE_STALE_SECONDS
+            entry_tags = list(tags(params, *args) if callable(tags) else tags)
+            key        = get_key(view_name, params, args)
+            entry      = get_entry(key)
+            if entry is not None and is_valid(entry):
+                age = time.time() - entry['stored_at']
+                if age < ttl:
+                    metrics.increment('response_cache_total', view=view_name, result='hit')
+                    return entry['payload'], entry['status']
+                if age < ttl + stale:
+                    metrics.increment('response_cache_total', view=view_name, result='stale')
+                    schedule_revalidate(func, self, params, args, key, entry_tags, result_tags, ttl, stale)
+                    return entry['payload'], entry['status']
+
+            metrics.increment('response_cache_total', view=view_name, result='miss')
+            return store(func, self, params, args, key, entry_tags, result_tags, ttl, stale)
+
+        return wrapper
+    return decorator
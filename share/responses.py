@@ -0,0 +1,172 @@
+import re
+import json
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http                  import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# orjson 3.9.15 부터 미리 인코딩한 bytes 를 그대로 끼워 넣는 Fragment 를 지원한다
+orjson_fragment = getattr(orjson, 'Fragment', None)
+django_encoder  = DjangoJSONEncoder()
+
+# JsonFragment 자리 표시 문자열. 프로세스마다 새로 만들고 응답에는 남지 않으므로 데이터와 겹치지 않는다
+FRAGMENT_TOKEN   = uuid.uuid4().hex
+FRAGMENT_PATTERN = re.compile(f'"{FRAGMENT_TOKEN}:([0-9]+)"'.encode())
+
+
+class JsonFragment:
+    """
+    미리 인코딩해 둔 JSON 조각
+
+    FastJsonResponse 로 내보낼 때 value 를 다시 인코딩하지 않고 encoded 를 그대로 이어 붙인다.
+    Fragment 를 지원하지 않는 orjson 에서는 다시 인코딩하는 쪽이 빨라 value 를 사용한다.
+    """
+    __slots__ = ('value', 'encoded')
+
+    def __init__(self, value, encoded=None):
+        self.value   = value
+        self.encoded = encoded if encoded is not None else dumps(value)
+
+    def __eq__(self, other):
+        return isinstance(other, JsonFragment) and self.encoded == other.encoded
+
+    def __hash__(self):
+        return hash(self.encoded)
+
+    def __getstate__(self):
+        return (self.value, self.encoded)
+
+    def __setstate__(self, state):
+        self.value, self.encoded = state
+
+
+def dumps(data):
+    """
+    data 를 JSON bytes 로 인코딩
+
+    orjson 이 설치되어 있으면 orjson 을, 없으면 표준 json 모듈을 사용한다.
+    JsonFragment 는 자리 표시 문자열로 인코딩한 뒤 미리 인코딩된 bytes 로 바꿔 끼운다.
+    """
+    fragments = []
+
+    def default(obj):
+        if isinstance(obj, JsonFragment):
+            fragments.append(obj.encoded)
+            return f'{FRAGMENT_TOKEN}:{len(fragments) - 1}'
+        return django_encoder.default(obj)
+
+    def orjson_default(obj):
+        # orjson 은 작은 dict 를 다시 인코딩하는 편이 자리 표시 문자열을 치환하는 것보다 빠르다
+        if isinstance(obj, JsonFragment):
+            return orjson_fragment(obj.encoded) if orjson_fragment else obj.value
+        return django_encoder.default(obj)
+
+    if orjson is not None:
+        encoded = orjson.dumps(
+            data,
+            default = orjson_default,
+            option  = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    else:
+        encoded = json.dumps(data, default=default, separators=(',', ':')).encode()
+
+    if fragments:
+        encoded = FRAGMENT_PATTERN.sub(lambda match: fragments[int(match.group(1))], encoded)
+    return encoded
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    JsonResponse 대신 쓰는 응답 클래스
+
+    인코더만 다르고 사용법(data, safe, status 등)은 JsonResponse 와 같다.
+    본문은 처음 필요할 때 인코딩하므로 (TemplateResponse 처럼 render() 를 가진다)
+    process_template_response 단계의 middleware 가 data 를 다른 형식으로 내보낼 수 있다.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the '
+                'safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(**kwargs)
+        self.data        = data
+        self.encoder     = dumps
+        self.is_rendered = False
+
+    def render(self):
+        if not self.is_rendered:
+            self.is_rendered = True
+            self.content     = self.encoder(self.data)
+        return self
+
+    @property
+    def content(self):
+        self.render()
+        return super().content
+
+    @content.setter
+    def content(self, value):
+        HttpResponse.content.fset(self, value)
+
+    def __iter__(self):
+        self.render()
+        return super().__iter__()
+
+
+def msgpack_default(obj):
+    if isinstance(obj, JsonFragment):
+        return obj.value
+    # 날짜, Decimal 등은 JSON 응답과 같은 문자열로
+    return django_encoder.default(obj)
+
+
+def dumps_msgpack(data):
+    return msgpack.packb(data, default=msgpack_default, use_bin_type=True)
+
+
+def get_media_type_quality(accept, media_types):
+    # Accept 헤더에서 media_types 중 가장 높은 q 값 (없으면 0)
+    quality = 0.0
+    for item in accept.split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        if media_type.lower() not in media_types:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality = max(quality, q)
+    return quality
+
+
+def accepts_msgpack(request):
+    # application/json (또는 */*) 보다 msgpack 을 같거나 더 선호할 때만 msgpack 으로 응답, 기본값은 JSON
+    if msgpack is None:
+        return False
+
+    accept = request.META.get('HTTP_ACCEPT', '')
+    if 'msgpack' not in accept:
+        return False
+
+    msgpack_quality = get_media_type_quality(accept, MSGPACK_MEDIA_TYPES)
+    json_quality    = get_media_type_quality(accept, ('application/json', 'application/*', '*/*'))
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
@@ -0,0 +1,131 @@
+import time
+import random
+import hashlib
+import threading
+import contextvars
+
+from django.conf import settings
+from django.db   import connections, DatabaseError, DEFAULT_DB_ALIAS
+
+from .           import metrics
+
+class RoutingState:
+    """
+    요청 하나의 routing 상태 (ReplicaRoutingMiddleware 에서 설정)
+
+        use_replica : 이 요청의 읽기를 replica 로 보내도 되는지
+        replica     : 이 요청에서 고른 replica (요청 안에서는 같은 replica 를 쓴다)
+        wrote       : 이 요청에서 primary 에 쓰기가 있었는지
+    """
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.replica     = None
+        self.wrote       = False
+
+
+# async view 가 DB 조회를 넘긴 thread 에서도 같은 상태를 보도록 context 변수에 둔다 (share/request_context.py)
+routing_state = contextvars.ContextVar('routing_state', default=None)
+
+
+class ReplicaHealth:
+    """
+    replica 상태 확인
+
+    REPLICA_HEALTH_CHECK_SECONDS 마다 한 thread 만 replica 들의 복제 지연을 확인하고,
+    연결할 수 없거나 REPLICA_MAX_LAG_SECONDS 보다 늦은 replica 는 다음 확인 때까지 읽기에서 뺀다.
+    """
+
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.checked_at = None
+        self.healthy    = ()
+
+    def get_healthy(self):
+        if self.checked_at is None or time.monotonic() - self.checked_at >= settings.REPLICA_HEALTH_CHECK_SECONDS:
+            if self.lock.acquire(blocking=False):
+                try:
+                    self.check()
+                finally:
+                    self.lock.release()
+        return self.healthy
+
+    def check(self):
+        healthy = []
+        for alias in settings.DATABASE_REPLICAS:
+            try:
+                lag = self.get_lag(alias)
+            except DatabaseError:
+                lag = None
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS:
+                healthy.append(alias)
+            else:
+                metrics.increment('db_replica_unhealthy_total', alias=alias)
+        self.healthy    = tuple(healthy)
+        self.checked_at = time.monotonic()
+
+    def get_lag(self, alias):
+        # 복제 지연(초), 복제가 멈췄으면 None
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor != 'mysql':
+                cursor.execute('SELECT 1')
+                return 0
+            cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                return 0
+            return dict(zip([column[0] for column in cursor.description], row))['Seconds_Behind_Master']
+
+    def reset(self):
+        self.checked_at = None
+        self.healthy    = ()
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    안전한 method(GET, HEAD, OPTIONS) 요청의 읽기는 replica 로, 나머지는 모두 primary(default) 로 보낸다
+
+    요청 밖(management command, background thread)의 쿼리와 요청 중 쓰기 이후의 읽기는 primary 를 쓴다.
+    replica 는 복제로 채워지므로 migrate 는 primary 에만 한다.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if state is None or not state.use_replica:
+            return DEFAULT_DB_ALIAS
+
+        if state.replica is None:
+            healthy       = replica_health.get_healthy()
+            state.replica = random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.use_replica = False
+            state.wrote       = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def get_pin_key(request):
+    # 같은 token 으로 보낸 요청끼리 read-your-writes 를 보장한다 (token 이 없는 요청은 고정하지 않음)
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    return f'replica_pin:{hashlib.sha1(token.encode("utf-8")).hexdigest()}'
+
@@ -0,0 +1,128 @@
+import threading
+from concurrent import futures
+
+from django.conf import settings
+from django.db   import models, DEFAULT_DB_ALIAS
+
+from .db_connections import run_with_connections
+
+# user id 로 나눠 DATABASE_SHARDS 에 저장하는 모델 (app_label.model_name)
+SHARDED_MODELS = {'user.userbook', 'library.library', 'library.librarybook'}
+
+scatter_lock     = threading.Lock()
+scatter_executor = None
+
+
+def get_shard_aliases():
+    # shard 를 설정하지 않으면 default 하나가 유일한 shard
+    return list(settings.DATABASE_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def get_shard_alias(user_id):
+    shards = settings.DATABASE_SHARDS
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    return shards[int(user_id) % len(shards)]
+
+
+def group_by_shard(items, get_user_id=lambda item: item):
+    # {shard alias: [item, ...]}
+    groups = {}
+    for item in items:
+        groups.setdefault(get_shard_alias(get_user_id(item)), []).append(item)
+    return groups
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def get_scatter_executor():
+    global scatter_executor
+
+    with scatter_lock:
+        if scatter_executor is None:
+            scatter_executor = futures.ThreadPoolExecutor(
+                max_workers=len(settings.DATABASE_SHARDS), thread_name_prefix='shard-scatter')
+    return scatter_executor
+
+
+def scatter_gather(func):
+    """
+    func(shard alias) 를 모든 shard 에 대해 실행한 결과 리스트
+
+    shard 가 여러 개면 thread pool 에서 동시에 실행한다. (결과 순서는 shard 순서)
+    """
+    aliases = get_shard_aliases()
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+
+    # worker thread 의 shard 연결은 다른 pool 과 같이 확인 후 재사용한다 (share/db_connections.py)
+    return list(get_scatter_executor().map(lambda alias: run_with_connections(func, alias), aliases))
+
+
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # shard 를 고르지 않았으면 router 가 새 instance 의 user id 로 shard 를 고른다
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class ShardedManager(models.Manager.from_queryset(ShardedQuerySet)):
+    """
+    user id 로 shard 를 고르는 manager
+
+    사용자 한 명의 row 는 for_user(user_id) 로, 전체 사용자 집계는 scatter(build) 로 조회한다.
+    shard 를 고르지 않은 조회(objects.filter(...))는 default DB 로 가므로 shard 를 나눈 뒤에는 쓰지 않는다.
+    """
+
+    def for_user(self, user_id):
+        return self.db_manager(get_shard_alias(user_id)).filter(user_id=user_id)
+
+    def on_shard(self, alias):
+        return self.db_manager(alias).all()
+
+    def scatter(self, build):
+        # build(shard 의 queryset) 를 shard 마다 실행한 결과 리스트
+        return scatter_gather(lambda alias: build(self.on_shard(alias)))
+
+
+class ShardRouter:
+    """
+    SHARDED_MODELS 는 instance 의 user id 로 shard 를 고르고, shard 에는 이 모델들만 migrate 한다
+
+    instance 가 없는 조회는 다음 router(ReplicaRouter) 로 넘긴다.
+    """
+
+    def get_shard(self, model, hints):
+        if not settings.DATABASE_SHARDS or not is_sharded(model):
+            return None
+
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._state.db in settings.DATABASE_SHARDS:
+            return instance._state.db
+        if instance._meta.label_lower == 'user.user':
+            return get_shard_alias(instance.pk) if instance.pk is not None else None
+        user_id = getattr(instance, 'user_id', None)
+        return get_shard_alias(user_id) if user_id is not None else None
+
+    def db_for_read(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # shard 의 row 와 default 의 책, 사용자 사이 관계 (DB 제약 없이 id 로만 연결)
+        if is_sharded(obj1) or is_sharded(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_SHARDS:
+            return f'{app_label}.{model_name}' in SHARDED_MODELS
+        return None
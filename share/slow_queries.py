@@ -0,0 +1,123 @@
+import json
+import queue
+import random
+import logging
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from django.conf import settings
+from django.db   import connections
+
+from .                 import metrics
+from .request_context import get_current_view
+from .db_connections  import run_with_connections
+
+logger = logging.getLogger('suwee.slow_query')
+
+# EXPLAIN 을 실행 중인 background thread 표시 (EXPLAIN 쿼리는 다시 기록하지 않는다)
+local = threading.local()
+
+
+def get_stack():
+    # 프로젝트 코드 frame 만 (django, site-packages, 이 모듈 제외) 호출 순서대로
+    base_dir = str(settings.BASE_DIR)
+    return [
+        f'{frame.filename[len(base_dir) + 1:]}:{frame.lineno} {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ][-settings.SLOW_QUERY_STACK_DEPTH:]
+
+
+class SlowQueryLog:
+    """
+    느린 쿼리 기록
+
+    모든 DB 연결에 execute wrapper 로 걸려 쿼리 시간을 재고, SLOW_QUERY_THRESHOLD_MS 를 넘는 쿼리 중
+    SLOW_QUERY_SAMPLE_RATE 비율만 골라 SQL, 파라미터, view, 호출 stack 을 queue 에 넣는다.
+    EXPLAIN 과 로그 기록은 background thread 에서 하므로 요청 처리 시간에 더해지지 않는다.
+    """
+
+    def __init__(self):
+        self.queue  = queue.Queue(maxsize=1000)
+        self.lock   = threading.Lock()
+        self.thread = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(local, 'explaining', False) or settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if (duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+                    and random.random() < settings.SLOW_QUERY_SAMPLE_RATE):
+                self.enqueue({
+                    'time'        : datetime.now().isoformat(),
+                    'duration_ms' : round(duration_ms, 3),
+                    'alias'       : context['connection'].alias,
+                    'view'        : get_current_view(),
+                    'sql'         : sql,
+                    'params'      : None if many else params,
+                    'many'        : many,
+                    'stack'       : get_stack(),
+                })
+
+    def enqueue(self, entry):
+        metrics.increment('slow_query_total', view=entry['view'] or '')
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            metrics.increment('slow_query_dropped_total')
+            return
+
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name='slow-query-log', daemon=True)
+                    self.thread.start()
+
+    def run(self):
+        while True:
+            entry = self.queue.get()
+            try:
+                run_with_connections(self.write, entry)
+            except Exception:
+                logger.exception('failed to write slow query log')
+
+    def explain(self, entry):
+        # SELECT 만 EXPLAIN (EXPLAIN ANALYZE 가 아니므로 실행되지는 않지만 쓰기 쿼리는 건드리지 않는다)
+        if entry['many'] or not entry['sql'].lstrip().upper().startswith('SELECT'):
+            return None
+
+        connection       = connections[entry['alias']]
+        local.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {entry["sql"]}', entry['params'])
+                return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+        except Exception as error:
+            return [f'EXPLAIN failed: {error}']
+        finally:
+            local.explaining = False
+
+    def write(self, entry):
+        logger.warning(json.dumps(dict(
+            entry,
+            params  = [str(param) for param in entry['params'] or ()],
+            explain = self.explain(entry),
+        ), ensure_ascii=False))
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    # connection_created signal : 새 DB 연결마다 wrapper 를 건다
+    if slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_log)
@@ -0,0 +1,801 @@
+import os
+import io
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from concurrent    import futures
+from datetime      import date, timedelta
+from unittest.mock import patch
+
+from django.conf             import settings
+from django.test             import TestCase, SimpleTestCase, RequestFactory, override_settings
+from django.core.management  import call_command, CommandError
+from django.core.cache       import cache, caches
+from django.db               import connections, OperationalError
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.models        import F
+from django.http             import HttpResponse
+
+from book.models             import Book, Category, Keyword, Review
+from library.models          import Library, LibraryBook, LibraryChange
+from user.models             import User, UserBook, UserStatistics
+from user.views              import generate_token
+from user.modules.progress   import reading_progress_buffer
+from .                       import metrics
+from .slow_queries           import slow_query_log
+from .profiler               import profiler, make_profile_token
+from .benchmark              import percentile, bootstrap_change_ci, get_threshold, check_regression
+from .middleware             import ReplicaRoutingMiddleware, ConnectionManagementMiddleware
+from .db_connections         import detect_failover, run_with_connections
+from .routers                import replica_health
+from .shards                 import get_shard_alias, scatter_gather
+from .response_cache         import get_key
+from .cache_backends         import RedisCache, LocalRedis
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        Book.objects.create(id=1, title='title_1', image_url='image_1', company='company', author='author',
+                            page=100, publication_date='2020-12-01')
+
+    def test_request_metrics_per_route(self):
+        labels  = {'route':'books/<int:book_id>', 'method':'GET', 'status':'200'}
+        before  = metrics.get_histogram('http_request_duration_seconds', **labels)
+        count   = sum(before[0]) if before else 0
+
+        self.client.get('/books/1', {'fields':'title'})
+        self.client.get('/books/1', {'fields':'title'})
+
+        counts, total = metrics.get_histogram('http_request_duration_seconds', **labels)
+        self.assertEqual(sum(counts), count + 2)
+        self.assertGreater(total, 0)
+
+        queries, _ = metrics.get_histogram('http_request_db_queries', **labels)
+        self.assertGreater(queries[metrics.QUERY_BUCKETS.index(1)], 0)
+        self.assertIsNotNone(metrics.get_histogram('http_response_size_bytes', **labels))
+
+    def test_request_metrics_unmatched_route(self):
+        self.client.get('/not_exist')
+
+        self.assertIsNotNone(metrics.get_histogram(
+            'http_request_duration_seconds', route='unmatched', method='GET', status='404'))
+
+    def test_metrics_get_prometheus_text(self):
+        self.client.get('/books/1', {'fields':'title'})
+        response = self.client.get('/metrics')
+        content  = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', content)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="books/<int:book_id>",status="200",le="+Inf"}', content)
+        self.assertIn('http_request_db_queries_count{method="GET",route="books/<int:book_id>",status="200"}', content)
+
+    @override_settings(RESPONSE_CACHE_TTL={})  # 같은 요청을 두 번 보내므로 응답 캐시 없이 센다
+    def test_query_count_header(self):
+        self.assertNotIn('X-Query-Count', self.client.get('/books/1', {'fields':'title'}))
+
+        with override_settings(QUERY_COUNT_HEADER=True):
+            response = self.client.get('/books/1', {'fields':'title'})
+
+        self.assertEqual(response['X-Query-Count'], '1')
+
+
+class MetricsRegistryTest(SimpleTestCase):
+    def test_metrics_collect_across_processes(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, override_settings(METRICS_DIR=metrics_dir):
+            metrics.increment('registry_test_total', route='a')
+            metrics.observe('registry_test_seconds', 0.3, (0.1, 0.5), route='a')
+            metrics.flush(force=True)
+
+            with open(os.path.join(metrics_dir, 'metrics_999999.json'), 'w') as snapshot_file:
+                json.dump({
+                    'counters'   : [['registry_test_total', [['route', 'a']], 4]],
+                    'histograms' : [['registry_test_seconds', [['route', 'a']], [0.1, 0.5], [1, 0, 2], 7.05]],
+                }, snapshot_file)
+
+            counters, histograms = metrics.collect()
+
+        own_total = metrics.get_counter('registry_test_total', route='a')
+        own_counts, own_sum = metrics.get_histogram('registry_test_seconds', route='a')
+        self.assertEqual(counters[('registry_test_total', (('route', 'a'),))], own_total + 4)
+        self.assertEqual(histograms[('registry_test_seconds', (('route', 'a'),))][1],
+                         [own_counts[0] + 1, own_counts[1], own_counts[2] + 2])
+
+    def test_metrics_render_cumulative_buckets(self):
+        metrics.observe('render_test_seconds', 0.05, (0.1, 0.5))
+        metrics.observe('render_test_seconds', 0.2, (0.1, 0.5))
+        content = metrics.render()
+
+        counts, total = metrics.get_histogram('render_test_seconds')
+        self.assertIn(f'render_test_seconds_bucket{{le="0.5"}} {counts[0] + counts[1]}', content)
+        self.assertIn(f'render_test_seconds_count {sum(counts)}', content)
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        Book.objects.create(id=1, title='title_1', image_url='image_1', company='company', author='author',
+                            page=100, publication_date='2020-12-01')
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_query_captured_with_view_and_stack(self):
+        with patch.object(slow_query_log, 'enqueue') as enqueue:
+            self.client.get('/books/1', {'fields':'title'})
+
+        entry = enqueue.call_args_list[0][0][0]
+        self.assertEqual(entry['view'], 'book.views.BookDetailView')
+        self.assertIn('FROM "books"', entry['sql'])
+        self.assertEqual(list(entry['params']), [1])
+        self.assertTrue(any(frame.startswith('book/views.py:') for frame in entry['stack']))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_slow_query_disabled(self):
+        with patch.object(slow_query_log, 'enqueue') as enqueue:
+            self.client.get('/books/1', {'fields':'title'})
+
+        enqueue.assert_not_called()
+
+    def test_slow_query_write_explain(self):
+        entry = {
+            'time'        : '2020-12-01T10:00:00',
+            'duration_ms' : 250.0,
+            'alias'       : 'default',
+            'view'        : 'book.views.BookDetailView',
+            'sql'         : 'SELECT "books"."id" FROM "books" WHERE "books"."id" = %s',
+            'params'      : (1,),
+            'many'        : False,
+            'stack'       : [],
+        }
+        with self.assertLogs('suwee.slow_query') as logs:
+            slow_query_log.write(entry)
+
+        logged = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logged['params'], ['1'])
+        self.assertTrue(logged['explain'])
+        self.assertFalse(logged['explain'][0].startswith('EXPLAIN failed'))
+
+    def test_slow_query_write_no_explain_for_update(self):
+        entry = {
+            'time'        : '2020-12-01T10:00:00',
+            'duration_ms' : 250.0,
+            'alias'       : 'default',
+            'view'        : None,
+            'sql'         : 'UPDATE "books" SET "page" = %s',
+            'params'      : (1,),
+            'many'        : False,
+            'stack'       : [],
+        }
+        with self.assertLogs('suwee.slow_query') as logs:
+            slow_query_log.write(entry)
+
+        self.assertIsNone(json.loads(logs.records[0].getMessage())['explain'])
+        self.assertEqual(Book.objects.get(id=1).page, 100)
+
+
+class SlowQueryReportTest(SimpleTestCase):
+    def test_slow_query_report_ranks_offenders(self):
+        def entry(sql, duration_ms, view):
+            return json.dumps({'time':'2020-12-01T10:00:00', 'duration_ms':duration_ms, 'view':view, 'sql':sql,
+                               'params':['1'], 'stack':['book/views.py:10 get'], 'explain':['SCAN books']})
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            path = os.path.join(log_dir, 'slow_query.log')
+            with open(path, 'w') as log_file:
+                log_file.write('\n'.join([entry('SELECT a', 300, 'A'), entry('SELECT b', 500, 'B')]) + '\n')
+            with open(path + '.1', 'w') as log_file:
+                log_file.write(entry('SELECT a', 400, 'C') + '\n')
+
+            out = io.StringIO()
+            call_command('slow_query_report', file=path, stdout=out)
+            by_max = io.StringIO()
+            call_command('slow_query_report', file=path, order='max', top=1, stdout=by_max)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('#1 total=700.0ms count=2 avg=350.0ms max=400.0ms views=A,C'))
+        self.assertIn('    sql: SELECT a', lines)
+        self.assertIn('    explain: SCAN books', lines)
+        self.assertTrue(by_max.getvalue().startswith('#1 total=500.0ms count=1'))
+
+
+def busy_loop(*args, **kwargs):
+    finish = time.perf_counter() + 0.1
+    while time.perf_counter() < finish:
+        pass
+    return {}
+
+
+@override_settings(PROFILER_INTERVAL_MS=1)
+class SamplingProfilerTest(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.TemporaryDirectory()
+        Book.objects.create(id=1, title='title_1', image_url='image_1', company='company', author='author',
+                            page=100, publication_date='2020-12-01')
+
+    def tearDown(self):
+        self.profile_dir.cleanup()
+
+    def test_profiler_collapsed_stacks(self):
+        profiler.start(None)
+        busy_loop()
+        samples = profiler.stop()
+
+        self.assertGreater(sum(samples.values()), 0)
+        self.assertTrue(any(stack.endswith('share/tests.py:busy_loop') for stack in samples))
+
+    def test_profiler_signed_header(self):
+        with override_settings(PROFILER_DIR=self.profile_dir.name), patch('book.views.get_book_detail', busy_loop):
+            response = self.client.get('/books/1', {'fields':'title'}, HTTP_X_SUWEE_PROFILE=make_profile_token())
+
+        self.assertGreater(int(response['X-Suwee-Profile-Samples']), 0)
+
+        out = io.StringIO()
+        call_command('merge_profiles', dir=self.profile_dir.name, route='GET books/', stdout=out, stderr=io.StringIO())
+        stacks = out.getvalue().splitlines()
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack.startswith('GET_books/<int:book_id>;') for stack in stacks))
+        self.assertTrue(any('book/views.py:get_payload;share/tests.py:busy_loop ' in stack for stack in stacks))
+
+    def test_profiler_invalid_header(self):
+        with override_settings(PROFILER_DIR=self.profile_dir.name):
+            response = self.client.get('/books/1', {'fields':'title'}, HTTP_X_SUWEE_PROFILE='profile:forged')
+
+        self.assertFalse(response.has_header('X-Suwee-Profile-Samples'))
+        self.assertEqual(os.listdir(self.profile_dir.name), [])
+
+
+class BenchmarkCommandTest(TestCase):
+    def test_generate_dataset_and_benchmark(self):
+        call_command('generate_dataset', users=5, books=30, user_books=3, library_books=3, reviews=1, likes=1,
+                     stdout=io.StringIO())
+
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Book.objects.count(), 30)
+        self.assertEqual(LibraryBook.objects.filter(library__user_id=F('user_id')).count(), LibraryBook.objects.count())
+        for statistics in UserStatistics.objects.all():
+            self.assertEqual(
+                {'total_book_count':statistics.total_book_count, 'total_read_time':statistics.total_read_time,
+                 'category_counts':statistics.category_counts},
+                UserStatistics.compute(statistics.user_id))
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = os.path.join(output_dir, 'result.json')
+            call_command('benchmark_endpoints', endpoints=['books.detail', 'books.search', 'library.books'],
+                         requests=3, warmup=1,
+                         output=output, stderr=io.StringIO())
+            with open(output) as result_file:
+                result = json.load(result_file)
+
+        self.assertEqual(result['meta']['dataset'], {'users':5, 'books':30})
+        self.assertEqual(set(result['endpoints']), {'books.detail', 'books.search', 'library.books'})
+        self.assertNotIn('400', result['endpoints']['books.search']['statuses'])
+        detail = result['endpoints']['books.detail']
+        self.assertEqual(detail['statuses'], {'200':3})
+        self.assertEqual(len(detail['latencies_ms']), 3)
+        self.assertLessEqual(detail['p50_ms'], detail['p99_ms'])
+        self.assertGreater(detail['queries']['mean'], 0)
+
+    def test_generate_dataset_not_empty(self):
+        User.objects.create(nickname='reader')
+
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', users=1, books=1, stdout=io.StringIO())
+
+
+class BenchmarkStatisticsTest(SimpleTestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2.5)
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 95), 4.8)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_bootstrap_change_ci(self):
+        baseline = [10 + index % 5 for index in range(60)]
+
+        change, low, high = bootstrap_change_ci(baseline, list(baseline), iterations=200)
+        self.assertEqual((change, low, high), (0.0, 0.0, 0.0))
+
+        change, low, high = bootstrap_change_ci(baseline, [latency * 1.5 for latency in baseline], iterations=200)
+        self.assertAlmostEqual(change, 50.0)
+        self.assertLessEqual(low, change)
+        self.assertGreater(low, 40)
+
+        with self.assertRaises(ValueError):
+            bootstrap_change_ci(baseline, baseline[1:])
+
+    def test_get_threshold(self):
+        thresholds = {
+            'default'   : {'latency_change_pct':10, 'query_delta':0},
+            'endpoints' : {'books.home':{'latency_change_pct':20}},
+        }
+
+        self.assertEqual(get_threshold(thresholds, 'books.home'), {'latency_change_pct':20, 'query_delta':0})
+        self.assertEqual(get_threshold(thresholds, 'books.detail'), {'latency_change_pct':10, 'query_delta':0})
+
+    def test_check_regression(self):
+        threshold = {'latency_change_pct':10, 'query_delta':0}
+        baseline  = {'latencies_ms':[10 + index % 3 for index in range(30)], 'query_counts':[2] * 30, 'statuses':[200] * 30}
+        same      = dict(baseline, latencies_ms=[latency * 1.02 for latency in baseline['latencies_ms']])
+        slower    = dict(baseline, latencies_ms=[latency * 2 for latency in baseline['latencies_ms']])
+        queries   = dict(same, query_counts=[2] * 29 + [3])
+        errors    = dict(same, statuses=[200] * 29 + [500])
+        unknown   = dict(same, query_counts=[None] * 30)
+
+        self.assertEqual(check_regression(baseline, same, threshold, iterations=200)['breaches'], [])
+        self.assertEqual(check_regression(baseline, slower, threshold, iterations=200)['breaches'], ['latency'])
+        self.assertEqual(check_regression(baseline, queries, threshold, iterations=200)['query_delta'],
+                         {'min':0, 'max':1, 'mean':0.033})
+        self.assertEqual(check_regression(baseline, queries, threshold, iterations=200)['breaches'], ['queries'])
+        self.assertEqual(check_regression(baseline, errors, threshold, iterations=200)['breaches'], ['errors'])
+        self.assertIsNone(check_regression(baseline, unknown, threshold, iterations=200)['query_delta'])
+
+
+def add_sqlite_database(alias, directory):
+    # 테스트 DB 설정 이후에 붙이는 SQLite 파일 DB (TestCase transaction 밖이므로 직접 비운다)
+    connections.databases[alias] = {
+        'ENGINE' : 'django.db.backends.sqlite3',
+        'NAME'   : os.path.join(directory, f'{alias}.sqlite3'),
+    }
+    return connections[alias]
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections.databases[alias]
+    delattr(connections._connections, alias)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TestCase):
+    # 별도 SQLite 파일을 replica 로 붙이고 primary 와 다른 제목의 책을 넣어 어느 DB 에서 읽었는지 본다
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        with add_sqlite_database('replica', cls.replica_dir.name).schema_editor() as editor:
+            for model in (Category, Keyword, Book):
+                editor.create_model(model)
+        Book.objects.using('replica').create(id=1, title='replica', image_url='image_1', company='company',
+                                             author='author', page=100, publication_date='2020-12-01')
+
+    @classmethod
+    def tearDownClass(cls):
+        remove_database('replica')
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        Book.objects.create(id=1, title='primary', image_url='image_1', company='company', author='author',
+                            page=100, publication_date='2020-12-01')
+        replica_health.reset()
+        cache.clear()
+
+        def view(request):
+            if request.method == 'POST':
+                Book.objects.filter(id=1).update(page=F('page') + 1)
+            return HttpResponse(Book.objects.get(id=1).title)
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+        self.factory    = RequestFactory()
+
+    def read(self, method='get', token=None):
+        headers = {'HTTP_AUTHORIZATION': token} if token else {}
+        return self.middleware(getattr(self.factory, method)('/books/1', **headers)).content.decode()
+
+    def test_replica_get_reads_from_replica(self):
+        response = self.client.get('/books/1', {'fields':'title'})
+
+        self.assertEqual(response.json()['book_detail']['title'], 'replica')
+        self.assertEqual(self.read(), 'replica')
+
+    def test_replica_write_reads_from_primary(self):
+        self.assertEqual(self.read('post', 'token_a'), 'primary')
+
+    def test_replica_pin_after_write(self):
+        self.read('post', 'token_a')
+
+        self.assertEqual(self.read('get', 'token_a'), 'primary')
+        self.assertEqual(self.read('get', 'token_b'), 'replica')
+        self.assertEqual(self.read('get'), 'replica')
+
+    def test_replica_lagging_dropped(self):
+        before = metrics.get_counter('db_replica_unhealthy_total', alias='replica')
+
+        with patch.object(replica_health, 'get_lag', return_value=10):
+            self.assertEqual(self.read(), 'primary')
+        self.assertEqual(metrics.get_counter('db_replica_unhealthy_total', alias='replica'), before + 1)
+
+        replica_health.reset()
+        self.assertEqual(self.read(), 'replica')
+
+    def test_replica_outside_request_reads_from_primary(self):
+        self.assertEqual(Book.objects.get(id=1).title, 'primary')
+
+
+@override_settings(DATABASE_SHARDS=['shard_0', 'shard_1'])
+class ShardingTest(TestCase):
+    # SQLite 파일 두 개를 shard 로 붙인다 (user id 가 짝수면 shard_0, 홀수면 shard_1)
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.shard_dir = tempfile.TemporaryDirectory()
+        for alias in ('shard_0', 'shard_1'):
+            add_sqlite_database(alias, cls.shard_dir.name)
+            call_command('migrate', database=alias, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in ('shard_0', 'shard_1'):
+            remove_database(alias)
+        cls.shard_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        Keyword.objects.bulk_create([Keyword(id=1, name='전체'), Keyword(id=2, name='요즘 뜨는')])
+        Category.objects.create(id=1, name='소설')
+        Book.objects.bulk_create([Book(
+            id               = book_id,
+            title            = f'title_{book_id}',
+            image_url        = f'image_{book_id}',
+            company          = 'company',
+            author           = 'author',
+            page             = 100,
+            publication_date = '2020-12-01',
+            category_id      = 1,
+            keyword_id       = 2,
+        ) for book_id in range(1, 4)])
+        User.objects.bulk_create([User(id=user_id, nickname=f'user_{user_id}') for user_id in range(1, 5)])
+        cache.clear()
+
+    def tearDown(self):
+        for alias in ('shard_0', 'shard_1'):
+            for model in (UserBook, LibraryBook, Library):
+                model.objects.on_shard(alias)._raw_delete(alias)
+
+    def test_shard_migrate_sharded_tables_only(self):
+        tables = connections['shard_0'].introspection.table_names()
+
+        self.assertTrue({'user_books', 'libraries', 'library_books'} <= set(tables))
+        self.assertNotIn('books', tables)
+        self.assertNotIn('users', tables)
+
+    def test_shard_rows_by_user(self):
+        UserBook.objects.create(user_id=1, book_id=1, page=10, time=5)
+        UserBook.objects.create(user_id=2, book_id=1, page=100, time=30)
+        UserBook.objects.create(user_id=2, book_id=2, page=20, time=10)
+
+        self.assertEqual(get_shard_alias(1), 'shard_1')
+        self.assertEqual(UserBook.objects.on_shard('shard_1').count(), 1)
+        self.assertEqual(UserBook.objects.on_shard('shard_0').count(), 2)
+        self.assertEqual(UserBook.objects.count(), 0)
+        self.assertEqual(list(UserBook.objects.for_user(2).order_by('book_id').values_list('book_id', flat=True)), [1, 2])
+        self.assertEqual(UserBook.objects.for_user(2).first().book.title, 'title_1')
+        self.assertEqual(UserStatistics.compute(2),
+                         {'total_book_count':2, 'total_read_time':40, 'category_counts':{'1':2}})
+
+    def test_shard_bestseller_scatter_gather(self):
+        # 일간 집계(daily_book_readings)가 비어 있어도 shard 의 user_books 로 순위를 매긴다
+        for user_id, book_id in ((1, 2), (2, 2), (3, 2), (1, 1), (4, 1), (2, 3)):
+            UserBook.objects.create(user_id=user_id, book_id=book_id, page=10, time=5)
+
+        response = self.client.get('/books/bestseller')
+
+        self.assertEqual([book['id'] for book in response.json()['bestSellerBook']], [2, 1, 3])
+        self.assertEqual(self.client.get('/books/1', {'fields':'reder'}).json()['book_detail'], {'reder':2})
+
+    def test_shard_recommend_scatter_gather(self):
+        for user_id, book_id in ((1, 3), (2, 3), (3, 1)):
+            library = Library.objects.create(user_id=user_id, name=f'user_{user_id}', image_url='')
+            LibraryBook.objects.create(library=library, user_id=user_id, book_id=book_id, book_title='title',
+                                       book_author='author', book_publication_date='2020-12-01')
+
+        response = self.client.get('/books/recommend', {'keyword':2})
+
+        self.assertEqual([book['id'] for book in response.json()['recommendBook']], [3, 1])
+
+    def test_shard_scatter_reuses_connections(self):
+        # scatter pool 도 작업마다 shard 연결을 닫지 않는다 (shard 별로 worker thread 마다 한 번만 연결)
+        def count(alias):
+            return UserBook.objects.on_shard(alias).count()
+
+        get_new_connection = SQLiteDatabaseWrapper.get_new_connection
+        with patch.dict(connections.databases['shard_0'], CONN_MAX_AGE=60), \
+                patch.dict(connections.databases['shard_1'], CONN_MAX_AGE=60), \
+                patch.object(SQLiteDatabaseWrapper, 'get_new_connection', autospec=True,
+                             side_effect=get_new_connection) as connect:
+            for _ in range(5):
+                self.assertEqual(scatter_gather(count), [0, 0])
+
+        self.assertLessEqual(connect.call_count, len(settings.DATABASE_SHARDS) ** 2)
+
+    def test_shard_my_library(self):
+        token    = generate_token(2)
+        response = self.client.post('/library/mylibrary', json.dumps({'book_id':1}),
+                                    content_type='application/json', HTTP_AUTHORIZATION=token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Library.objects.on_shard('shard_0').get().user_id, 2)
+        self.assertEqual(LibraryBook.objects.on_shard('shard_0').get().book_id, 1)
+        self.assertTrue(LibraryChange.objects.filter(user_id=2, book_id=1).exists())
+
+        books = self.client.get('/library/books', HTTP_AUTHORIZATION=token).json()['libraryBook']
+        self.assertEqual(books, [{'id':1, 'title':'title_1', 'image':'image_1', 'author':'author'}])
+
+        Book.objects.filter(id=1).update(title='renamed')
+        Book.objects.get(id=1).save()
+        self.assertEqual(LibraryBook.objects.for_user(2).get().book_title, 'renamed')
+
+
+class ConnectionManagementTest(TestCase):
+    # TestCase transaction 밖의 SQLite 파일 DB 로 연결 생성/재사용/닫기를 본다
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.database_dir = tempfile.TemporaryDirectory()
+        add_sqlite_database('pooled', cls.database_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        remove_database('pooled')
+        cls.database_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        def view(request):
+            with connections['pooled'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return HttpResponse('ok')
+
+        connections['pooled'].close()
+        self.middleware = ConnectionManagementMiddleware(view)
+        self.factory    = RequestFactory()
+
+    def request(self):
+        return self.middleware(self.factory.get('/'))
+
+    def count(self, name, **labels):
+        return metrics.get_counter(name, alias='pooled', **labels)
+
+    def test_connection_reused(self):
+        opened, reused = self.count('db_connections_opened_total'), self.count('db_connections_reused_total')
+
+        self.request()
+        self.request()
+
+        self.assertEqual(self.count('db_connections_opened_total'), opened + 1)
+        self.assertEqual(self.count('db_connections_reused_total'), reused + 1)
+        self.assertIsNotNone(metrics.get_histogram('db_connection_handshake_seconds', alias='pooled'))
+
+    def test_connection_recycled_after_failover(self):
+        self.request()
+        opened, closed = self.count('db_connections_opened_total'), self.count('db_connections_closed_total', reason='recycled')
+
+        def execute(sql, params, many, context):
+            raise OperationalError(2006, 'MySQL server has gone away')
+
+        with patch.object(connections['pooled'], 'vendor', 'mysql'), self.assertRaises(OperationalError):
+            detect_failover(execute, 'SELECT 1', None, False, {'connection':connections['pooled']})
+        self.request()
+
+        self.assertEqual(self.count('db_connections_closed_total', reason='recycled'), closed + 1)
+        self.assertEqual(self.count('db_connections_opened_total'), opened + 1)
+
+    @override_settings(DATABASE_HEALTH_CHECK_IDLE_SECONDS=0)
+    def test_connection_unusable_closed(self):
+        self.request()
+        closed = self.count('db_connections_closed_total', reason='unusable')
+
+        with patch.object(connections['pooled'], 'is_usable', return_value=False):
+            self.request()
+
+        self.assertEqual(self.count('db_connections_closed_total', reason='unusable'), closed + 1)
+
+    def test_connection_reused_in_worker_thread(self):
+        # thread pool 작업(홈 섹션, 응답 캐시 재조회, 느린 쿼리 로그)도 작업마다 연결을 닫지 않는다
+        def query():
+            with connections['pooled'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        opened, reused = self.count('db_connections_opened_total'), self.count('db_connections_reused_total')
+        with patch.dict(connections.databases['pooled'], CONN_MAX_AGE=60), \
+                futures.ThreadPoolExecutor(max_workers=1) as executor:
+            for _ in range(2):
+                executor.submit(run_with_connections, query).result()
+            executor.submit(lambda: connections['pooled'].close()).result()
+
+        self.assertEqual(self.count('db_connections_opened_total'), opened + 1)
+        self.assertEqual(self.count('db_connections_reused_total'), reused + 1)
+
+    @override_settings(DATABASE_MAX_PERSISTENT_CONNECTIONS=0)
+    def test_connection_limit(self):
+        self.request()
+
+        self.assertIsNone(connections['pooled'].connection)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        for alias in ('default', 'versions', 'local', 'shared'):
+            caches[alias].clear()
+        User.objects.create(id=1, nickname='test1')
+        Book.objects.create(id=1, title='지난 책', image_url='image_1', company='company', author='author',
+                            page=100, publication_date=date.today() - timedelta(days=3))
+
+    def tearDown(self):
+        for alias in ('default', 'versions', 'local', 'shared'):
+            caches[alias].clear()
+
+    def count(self, result):
+        return metrics.get_counter('response_cache_total', view='RecentlyBookView', result=result)
+
+    def test_response_cache_hit(self):
+        first = self.client.get('/books/recently').json()
+        hits  = self.count('hit')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/books/recently')
+
+        self.assertEqual(response.json(), first)
+        self.assertEqual(self.count('hit'), hits + 1)
+
+    def test_response_cache_invalidated_by_signals(self):
+        detail = lambda: self.client.get('/books/1', {'fields':'review_count,reder'}).json()['book_detail']
+        self.assertEqual(detail(), {'review_count':0, 'reder':0})
+
+        Review.objects.create(user_id=1, book_id=1, contents='리뷰')
+        self.assertEqual(detail(), {'review_count':1, 'reder':0})
+
+        UserBook.objects.create(user_id=1, book_id=1, page=10, time=10)
+        self.assertEqual(detail(), {'review_count':1, 'reder':1})
+
+        Book.objects.get(id=1).save()
+        with self.assertNumQueries(3):
+            detail()
+
+    def test_response_cache_invalidated_by_bulk_writes(self):
+        # bulk_create / bulk_update 는 signal 을 보내지 않지만 책 tag 를 단 캐시는 무효화된다
+        Keyword.objects.create(id=2, name='요즘 뜨는')
+        Book.objects.filter(id=1).update(keyword_id=2)
+        Book.objects.create(id=2, title='다른 책', image_url='image_2', company='company', author='author',
+                            page=100, publication_date=date.today(), keyword_id=2)
+        User.objects.bulk_create([User(id=user_id, nickname=f'test{user_id}') for user_id in (2, 3)])
+        for user_id, book_id in ((1, 1), (2, 2)):
+            library = Library.objects.create(user_id=user_id, name=f'test{user_id}', image_url='')
+            LibraryBook.objects.create(library=library, user_id=user_id, book_id=book_id)
+
+        recommend = lambda: [book['id'] for book in self.client.get(
+            '/books/recommend', {'keyword':2}).json()['recommendBook']]
+        self.assertEqual(recommend(), [1, 2])
+
+        response = self.client.post('/library/mylibrary', json.dumps({'book_id':[2]}),
+                                    content_type='application/json', HTTP_AUTHORIZATION=generate_token(3))
+        self.assertEqual(response.json()['added'], [2])
+        self.assertEqual(recommend(), [2, 1])
+
+        detail = lambda: self.client.get('/books/1', {'fields':'reder'}).json()['book_detail']
+        self.assertEqual(detail(), {'reder':0})
+
+        reading_progress_buffer.add(1, 1, 10, 5)
+        reading_progress_buffer.flush()
+        self.assertEqual(detail(), {'reder':1})
+
+    @override_settings(RESPONSE_CACHE_TTL={'RecentlyBookView':0}, RESPONSE_CACHE_REVALIDATE_WORKERS=0)
+    def test_response_cache_stale_while_revalidate(self):
+        title = lambda: self.client.get('/books/recently').json()['oneMonthBook'][0]['title']
+        title()
+        stale = self.count('stale')
+        Book.objects.filter(id=1).update(title='바뀐 책')  # signal 없이 바꾼 내용은 TTL 이 지나야 반영된다
+
+        self.assertEqual(title(), '지난 책')
+        self.assertEqual(title(), '바뀐 책')
+        self.assertEqual(self.count('stale'), stale + 2)
+
+    def test_response_cache_tiers(self):
+        self.client.get('/books/recently')
+        key = get_key('RecentlyBookView', {}, ())
+        caches['local'].clear()
+
+        with self.assertNumQueries(0):
+            self.client.get('/books/recently')
+        self.assertIsNotNone(caches['local'].get(key))
+
+    @override_settings(CACHES=dict(settings.CACHES, versions={
+        'BACKEND' : 'django.core.cache.backends.locmem.LocMemCache',
+    }))
+    def test_response_cache_off_with_process_local_versions(self):
+        self.client.get('/books/recently')
+        misses = self.count('miss')
+
+        response = self.client.get('/books/recently')
+
+        self.assertEqual(response.json()['oneMonthBook'][0]['title'], '지난 책')
+        self.assertEqual(self.count('miss'), misses)
+        self.assertIsNone(caches['shared'].get(get_key('RecentlyBookView', {}, ())))
+
+    @override_settings(CACHES=dict(settings.CACHES, shared={
+        'BACKEND'  : 'share.cache_backends.RedisCache',
+        'LOCATION' : 'local://response-cache-test',
+    }))
+    def test_response_cache_redis_tier(self):
+        self.client.get('/books/recently')
+        caches['local'].clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/books/recently')
+        self.assertEqual(response.json()['oneMonthBook'][0]['title'], '지난 책')
+        self.assertIsNotNone(LocalRedis.from_url('local://response-cache-test').get(
+            caches['shared'].make_key(get_key('RecentlyBookView', {}, ()))))
+
+
+class ResponseCacheProcessTest(SimpleTestCase):
+    # worker 프로세스 두 개가 같은 RESPONSE_CACHE_DIR, VERSION_DIR 을 쓸 때 (gunicorn --workers)
+    WORKER = """
+import os, sys, django
+django.setup()
+from django.conf          import settings
+from share.response_cache import cached_payload
+from share.versions       import bump_versions
+
+settings.RESPONSE_CACHE_TTL = {'CounterView': 60}
+
+class CounterView:
+    @cached_payload(tags=('counter',))
+    def get_payload(self, params):
+        return {'pid': os.getpid()}, 200
+
+if sys.argv[1:] == ['invalidate']:
+    bump_versions('counter')
+print(CounterView().get_payload({})[0]['pid'])
+"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def run_worker(self, *args):
+        env = dict(os.environ,
+            DJANGO_SETTINGS_MODULE   = 'suwee.settings',
+            SUWEE_RESPONSE_CACHE_DIR = os.path.join(self.cache_dir.name, 'responses'),
+            SUWEE_VERSION_DIR        = os.path.join(self.cache_dir.name, 'versions'),
+        )
+        env.pop('SUWEE_REDIS_URL', None)
+        result = subprocess.run([sys.executable, '-c', self.WORKER, *args], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        return int(result.stdout.split()[-1])
+
+    def test_response_cache_shared_between_processes(self):
+        first = self.run_worker()
+        self.assertEqual(self.run_worker(), first)
+
+        invalidated = self.run_worker('invalidate')
+        self.assertNotEqual(invalidated, first)
+        self.assertEqual(self.run_worker(), invalidated)
+
+
+class RedisCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = RedisCache('local://test', {})
+        self.cache.clear()
+
+    def test_redis_cache_get_set(self):
+        self.cache.set('book', {'id':1})
+        self.cache.set_many({'a':1, 'b':2})
+
+        self.assertEqual(self.cache.get('book'), {'id':1})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'a':1, 'b':2})
+        self.assertFalse(self.cache.add('a', 3))
+        self.assertTrue(self.cache.add('c', 3))
+        self.assertTrue(self.cache.delete('c'))
+        self.assertFalse(self.cache.has_key('c'))
+        self.assertEqual(self.cache.incr('a'), 2)
+
+    def test_redis_cache_timeout(self):
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('forever', 1, timeout=None)
+        self.cache.set('expired', 1, timeout=0)
+        time.sleep(0.1)
+
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 1)
+        self.assertIsNone(self.cache.get('expired'))
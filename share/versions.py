@@ -0,0 +1,60 @@
+import time
+
+from django.core.cache                 import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db                         import transaction
+
+from .cache_backends import RedisCache
+
+VERSION_KEY = 'resource_version:{}'
+
+
+def get_version_cache():
+    # settings.CACHES['versions'] : 모든 프로세스가 공유하는 파일 또는 redis
+    return caches['versions']
+
+
+def versions_are_shared():
+    """
+    version stamp 를 다른 프로세스와 공유하는지
+
+    프로세스 메모리(locmem, local:// LocalRedis)에 둔 stamp 는 다른 worker 나 management command 가 올린 값을 보지 못해
+    바뀐 뒤에도 304 나 캐시된 응답을 계속 주게 되므로, 이때는 조건부 GET 과 응답 캐시를 쓰지 않는다.
+    """
+    backend = get_version_cache()
+    if isinstance(backend, LocMemCache):
+        return False
+    if isinstance(backend, RedisCache) and backend.location.startswith('local://'):
+        return False
+    return True
+
+
+def get_versions(*resources):
+    """
+    resource 별 version stamp 조회
+
+    stamp 는 마지막으로 바뀐 시각(ns)이다. 캐시에 없으면(재시작, eviction) 지금 바뀐 것으로 본다.
+    """
+    cache    = get_version_cache()
+    keys     = [VERSION_KEY.format(resource) for resource in resources]
+    versions = cache.get_many(keys)
+
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        versions.update(cache.get_many(missing))
+
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_versions(*resources):
+    stamp = time.time_ns()
+    get_version_cache().set_many({VERSION_KEY.format(resource): stamp for resource in resources}, timeout=None)
+
+
+def bump_versions_on_commit(*resources):
+    # 커밋 전에 읽어간 응답이 새 ETag 를 갖게 되는 경우를 막기 위해 커밋 후에 한 번 더 올린다
+    bump_versions(*resources)
+    transaction.on_commit(lambda: bump_versions(*resources))
@@ -0,0 +1,13 @@
+from django.views import View
+from django.http  import HttpResponse
+
+from .            import metrics
+
+
+class MetricsView(View):
+    """
+    Prometheus 지표 조회 (모든 worker 프로세스 합계)
+    """
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+
+    uvicorn suwee.asgi:application --workers 4
+
+ASGI 로 띄우면 SUWEE_ASGI=1 이 되어 읽기 전용 책 조회가 async view 로 바뀐다. (settings.ASYNC_VIEWS)
 """
 
 import os
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'suwee.settings')
+os.environ.setdefault('SUWEE_ASGI', '1')
 
 application = get_asgi_application()
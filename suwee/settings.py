@@ -12,6 +12,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,10 +43,15 @@ INSTALLED_APPS = [
     'user',
     'library',
     'book',
-    'payment'
+    'payment',
+    'share',
 ]
 
 MIDDLEWARE = [
+    'share.middleware.RequestMetricsMiddleware',
+    'share.middleware.SamplingProfilerMiddleware',
+    'share.middleware.ConnectionManagementMiddleware',
+    'share.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'share.middleware.MessagePackMiddleware',
 ]
 
 ROOT_URLCONF = 'suwee.urls'
@@ -82,6 +89,35 @@ WSGI_APPLICATION = 'suwee.wsgi.application'
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
 DATABASES = my_settings.DATABASES
+
+## DB 연결 재사용 (share/db_connections.py, ConnectionManagementMiddleware)
+## my_settings 에 CONN_MAX_AGE 가 없으면 연결을 60초 동안 재사용한다 (MySQL wait_timeout 보다 짧게)
+DATABASE_CONN_MAX_AGE                = 60
+## 이 시간 이상 쉬었던 연결은 요청 전에 ping 으로 확인한다 (초)
+DATABASE_HEALTH_CHECK_IDLE_SECONDS   = 10
+## worker 프로세스에서 alias 별로 열어 둘 최대 연결 수 (None 이면 thread 수만큼)
+DATABASE_MAX_PERSISTENT_CONNECTIONS  = None
+
+for database in DATABASES.values():
+    database.setdefault('CONN_MAX_AGE', DATABASE_CONN_MAX_AGE)
+
+## user id 로 나누는 shard (share/shards.py) : user_books, libraries, library_books
+## my_settings.DATABASES 에 shard 연결을 추가하고 그 alias 를 DATABASE_SHARDS 에 순서대로 적는다
+## (shard 는 user_id % shard 수 로 고르므로 shard 수를 바꾸려면 데이터를 다시 나눠야 한다)
+## shard 를 나누면 완독 수치는 일간 집계(READING_AGGREGATE_SOURCE='rollup')로 계산한다
+DATABASE_SHARDS              = getattr(my_settings, 'DATABASE_SHARDS', [])
+
+## 읽기 전용 replica (share/routers.py)
+## my_settings.DATABASES 에 replica 연결을 추가하고 그 alias 를 DATABASE_REPLICAS 에 적는다
+## (replica 연결에는 'TEST': {'MIRROR': 'default'} 를 두어 테스트 DB 를 따로 만들지 않게 한다)
+DATABASE_ROUTERS             = ['share.shards.ShardRouter', 'share.routers.ReplicaRouter']
+DATABASE_REPLICAS            = getattr(my_settings, 'DATABASE_REPLICAS', [])
+## 쓰기 후 같은 token 의 읽기를 primary 로 고정하는 시간 (초)
+REPLICA_PIN_SECONDS          = 5
+## 복제 지연이 이보다 크면 읽기에서 뺀다 (초)
+REPLICA_MAX_LAG_SECONDS      = 3
+REPLICA_HEALTH_CHECK_SECONDS = 5
+
 SECRET_KEY = my_settings.SECRET_KEY['secret']
 
 # Password validation
@@ -123,6 +159,180 @@ STATIC_URL = '/static/'
 
 APPEND_SLASH = False
 
+## 회원가입 닉네임/휴대폰 번호 중복 사전 검사 (user/modules/bloom.py)
+USER_BLOOM_FILTER_ERROR_RATE      = 0.001
+USER_BLOOM_FILTER_MIN_CAPACITY    = 10000
+USER_BLOOM_FILTER_REBUILD_SECONDS = 600
+
+## 내 서재 한 번에 담을 수 있는 최대 책 수
+LIBRARY_BULK_ADD_MAX = 100
+
+## 내 서재 책 리스트 페이지 크기
+LIBRARY_BOOK_PAGE_SIZE     = 30
+LIBRARY_BOOK_PAGE_SIZE_MAX = 100
+
+## 내 서재 delta sync (/library/books/changes)
+LIBRARY_CHANGE_PAGE_SIZE      = 500
+LIBRARY_CHANGE_RETENTION_DAYS = 30
+
+## 내 서재 내보내기 (/library/export) 한 번에 조회할 row 수
+LIBRARY_EXPORT_CHUNK_SIZE = 1000
+
+## 독서 진행 heartbeat write-behind buffer (user/modules/progress.py)
+## FLUSH_SECONDS 가 None 이면 background flush 없이 buffer 가 가득 찼을 때와 종료 시에만 반영
+## MAX_ATTEMPTS 번 반영에 실패한 증가분은 DEAD_LETTER_FILE 에 JSON 한 줄씩 남기고 buffer 에서 버린다
+READING_PROGRESS_FLUSH_SECONDS    = 5
+READING_PROGRESS_MAX_BUFFERED     = 5000
+READING_PROGRESS_MAX_BATCH        = 200
+READING_PROGRESS_MAX_ATTEMPTS     = 5
+READING_PROGRESS_DEAD_LETTER_FILE = os.environ.get('SUWEE_READING_PROGRESS_DEAD_LETTER',
+                                                   str(BASE_DIR / 'logs' / 'reading_progress_dead_letter.log'))
+
+## 완독 확률/예상 시간, 베스트셀러 집계 기준
+## 'user_books' : user_books 원본 조회, 'rollup' : rollup_reading_events 로 만든 일간 집계 조회
+READING_AGGREGATE_SOURCE = 'user_books'
+
+## 책 상세 정보 묶음 조회 (/books/batch) 최대 책 수
+BOOK_BATCH_MAX = 30
+
+## 랜딩 페이지 표지 벽 (book/modules/covers.py)
+## 다른 프로세스에서 바뀐 책은 REFRESH_SECONDS 가 지나야 반영된다
+LANDING_PAGE_MAXIMUM       = 100
+COVER_WALL_REFRESH_SECONDS = 300
+
+## 캐시 (홈 화면 섹션 캐시, 조건부 GET version stamp - share/versions.py, 응답 캐시 - share/response_cache.py)
+## version stamp 는 모든 프로세스(worker, management command)가 같이 봐야 하므로 'versions' 는 프로세스 메모리가 아닌
+## 파일에 두고, 서버가 여러 대면 SUWEE_REDIS_URL 로 redis 를 공유 캐시로 쓴다
+## ('versions' 가 locmem 이면 조건부 GET 과 응답 캐시를 끈다, local:// 이면 redis 없이 프로세스 안의 LocalRedis 를 쓴다 - share/cache_backends.py)
+REDIS_URL          = os.environ.get('SUWEE_REDIS_URL')
+RESPONSE_CACHE_DIR = os.environ.get('SUWEE_RESPONSE_CACHE_DIR', str(BASE_DIR / 'cache' / 'responses'))
+VERSION_DIR        = os.environ.get('SUWEE_VERSION_DIR', str(BASE_DIR / 'cache' / 'versions'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # version stamp : 같은 서버의 모든 프로세스가 공유하는 파일 (만료 없음, 지워지면 바뀐 것으로 본다)
+    'versions': {
+        'BACKEND'  : 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION' : VERSION_DIR,
+        'TIMEOUT'  : None,
+        'OPTIONS'  : {'MAX_ENTRIES': 100000},
+    },
+    # 응답 캐시 1단 : worker 프로세스 메모리
+    'local': {
+        'BACKEND'  : 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION' : 'response_cache',
+        'OPTIONS'  : {'MAX_ENTRIES': 1000},
+    },
+    # 응답 캐시 2단 : 같은 서버의 worker 프로세스끼리 공유하는 파일
+    'shared': {
+        'BACKEND'  : 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION' : RESPONSE_CACHE_DIR,
+        'OPTIONS'  : {'MAX_ENTRIES': 10000},
+    },
+}
+if REDIS_URL:
+    # 서버끼리 공유하는 redis 를 version stamp 와 응답 캐시 2단으로 쓴다
+    CACHES['default'] = CACHES['versions'] = CACHES['shared'] = {
+        'BACKEND'  : 'share.cache_backends.RedisCache',
+        'LOCATION' : REDIS_URL,
+    }
+
+## 응답 캐시 (share/response_cache.py)
+## book view 의 get_payload 결과를 TIERS 순서로 찾고, book:<id>, keyword:<id> 같은 tag 가 signal 로 무효화되면 버린다
+## TTL(초)이 없는 view 는 캐시하지 않고, TTL 이 지난 뒤 STALE_SECONDS 동안은 지난 응답을 주면서 background 에서 다시 조회한다
+RESPONSE_CACHE_TIERS              = ['local', 'shared']
+RESPONSE_CACHE_STALE_SECONDS      = 300
+RESPONSE_CACHE_REVALIDATE_WORKERS = 2
+RESPONSE_CACHE_REVALIDATE_TIMEOUT = 30
+RESPONSE_CACHE_TTL                = {
+    'TodayBookView'       : 300,
+    'RecentlyBookView'    : 600,
+    'CommingSoonBookView' : 600,
+    'SearchBookView'      : 60,
+    'BestSellerBookView'  : 60,
+    'RecommendBookView'   : 300,
+    'BookDetailView'      : 300,
+    'BookBatchView'       : 300,
+    'ReviewView'          : 300,
+}
+
+## 요청 지표 (share/metrics.py, /metrics)
+## METRICS_DIR 을 지정하면 worker 프로세스별 지표를 파일로 남겨 /metrics 에서 합친다 (배포할 때 비울 것)
+METRICS_DIR           = os.environ.get('SUWEE_METRICS_DIR')
+METRICS_FLUSH_SECONDS = 1
+## 응답에 요청 중 실행한 쿼리 수를 X-Query-Count 로 붙인다 (benchmarks/regression_gate.py 용, 운영에서는 끔)
+QUERY_COUNT_HEADER    = os.environ.get('SUWEE_QUERY_COUNT_HEADER') == '1'
+
+## 느린 쿼리 로그 (share/slow_queries.py, manage.py slow_query_report)
+## THRESHOLD_MS 를 넘는 쿼리 중 SAMPLE_RATE 비율만 SQL, view, stack, EXPLAIN 과 함께 JSON 한 줄로 남긴다 (None 이면 끔)
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_SAMPLE_RATE  = 1.0
+SLOW_QUERY_STACK_DEPTH  = 10
+SLOW_QUERY_LOG_FILE     = os.environ.get('SUWEE_SLOW_QUERY_LOG', str(BASE_DIR / 'logs' / 'slow_query.log'))
+
+LOGGING = {
+    'version'                  : 1,
+    'disable_existing_loggers' : False,
+    'formatters'               : {
+        'message' : {'format': '%(message)s'},
+    },
+    'handlers'                 : {
+        # 여러 worker 프로세스가 같은 파일에 쓰므로 프로세스 안에서 rotate 하지 않고 logrotate 등 외부에서 rotate 한다
+        # (WatchedFileHandler 는 파일이 옮겨지거나 지워지면 다음 기록 때 다시 연다)
+        'slow_query' : {
+            'class'     : 'logging.handlers.WatchedFileHandler',
+            'filename'  : SLOW_QUERY_LOG_FILE,
+            'formatter' : 'message',
+            'delay'     : True,
+        },
+        'reading_progress_dead_letter' : {
+            'class'     : 'logging.handlers.WatchedFileHandler',
+            'filename'  : READING_PROGRESS_DEAD_LETTER_FILE,
+            'formatter' : 'message',
+            'delay'     : True,
+        },
+    },
+    'loggers'                  : {
+        'suwee.slow_query' : {
+            'handlers'  : ['slow_query'],
+            'level'     : 'WARNING',
+            'propagate' : False,
+        },
+        'suwee.reading_progress.dead_letter' : {
+            'handlers'  : ['reading_progress_dead_letter'],
+            'level'     : 'ERROR',
+            'propagate' : False,
+        },
+    },
+}
+
+## 요청 sampling profiler (share/profiler.py, manage.py profile_token / merge_profiles)
+## SAMPLE_RATE 비율의 요청과 서명된 X-Suwee-Profile 헤더(HEADER_MAX_AGE 초 유효)가 있는 요청을 INTERVAL_MS 간격으로 sampling
+PROFILER_SAMPLE_RATE    = 0
+PROFILER_INTERVAL_MS    = 5
+PROFILER_HEADER_MAX_AGE = 300
+PROFILER_DIR            = os.environ.get('SUWEE_PROFILE_DIR', str(BASE_DIR / 'logs' / 'profiles'))
+
+## 홈 화면 섹션 묶음 조회 (/books/home)
+## WORKERS 가 0 이면 thread pool 없이 요청 thread 에서 순서대로 조립
+HOME_FEED_WORKERS         = 6
+HOME_FEED_TIMEOUT_SECONDS = 2
+HOME_FEED_SECTION_TTL     = {
+    'today'       : 300,
+    'recently'    : 600,
+    'commingSoon' : 600,
+    'bestSeller'  : 300,
+    'recommend'   : 3600,
+    'landingPage' : 600,
+}
+
+## ASGI 배포 (suwee/asgi.py 로 띄우면 SUWEE_ASGI=1, benchmarks/load_test.py)
+## 읽기 전용 책 조회 view 를 async view 로 바꾸고 (book/async_views.py) DB 조회는 ASYNC_DB_WORKERS 개 thread 에서 실행한다
+## DB 연결은 thread 마다 열리므로 ASYNC_DB_WORKERS 가 worker 프로세스의 alias 별 최대 연결 수가 된다
+ASYNC_VIEWS      = os.environ.get('SUWEE_ASGI') == '1'
+ASYNC_DB_WORKERS = 16
+
 ##CORS
 CORS_ORIGIN_ALLOW_ALL=True
 CORS_ALLOW_CREDENTIALS = True
@@ -1,7 +1,10 @@
 from django.urls import path, include
 
+from share.views import MetricsView
+
 urlpatterns = [
     path('user', include('user.urls')),
     path('books', include('book.urls')),
-    path('library', include('library.urls'))
+    path('library', include('library.urls')),
+    path('metrics', MetricsView.as_view()),
 ]
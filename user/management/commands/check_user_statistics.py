@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user.models import UserStatistics
+
+
+class Command(BaseCommand):
+    help = ('증분 갱신된 사용자 독서 통계(user_statistics)를 user_books 전체 재계산 결과와 비교합니다. '
+            'user_books 를 shard 로 나누면 증분은 shard 커밋 후 따로 반영되어 어긋날 수 있으므로 --fix 로 주기적으로(cron) 실행합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='검사할 사용자 id (반복 가능)')
+        parser.add_argument('--fix', action='store_true', help='불일치하는 통계를 재계산 값으로 덮어씁니다.')
+
+    def handle(self, *args, **options):
+        statistics = UserStatistics.objects.order_by('user_id')
+        if options['user_ids']:
+            statistics = statistics.filter(user_id__in=options['user_ids'])
+
+        checked, mismatched = 0, 0
+        for row in statistics.iterator(chunk_size=500):
+            checked  += 1
+            expected  = UserStatistics.compute(row.user_id)
+            stored    = {
+                'total_book_count' : row.total_book_count,
+                'total_read_time'  : row.total_read_time,
+                'category_counts'  : row.category_counts,
+            }
+            if stored == expected:
+                continue
+
+            mismatched += 1
+            self.stdout.write(f'user {row.user_id}: stored={stored} expected={expected}')
+            if options['fix']:
+                UserStatistics.rebuild(row.user_id)
+
+        self.stdout.write(f'checked {checked} users, {mismatched} mismatched')
+        if mismatched and not options['fix']:
+            raise CommandError('user_statistics is inconsistent with user_books (run with --fix to rebuild)')
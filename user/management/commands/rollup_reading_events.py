@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db                   import transaction
+from django.db.models            import Q, Sum, Count
+
+from user.models     import ReadingEvent, DailyBookReading, DailyUserReading
+from share.versions  import bump_versions
+
+
+class Command(BaseCommand):
+    help = '독서 이벤트(reading_events)를 일간 책별/사용자별 집계로 rollup 합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--day', type=date.fromisoformat, help='집계할 날짜 (YYYY-MM-DD, 기본값: 어제와 오늘)')
+        parser.add_argument('--purge-days', type=int, help='이 일수보다 오래된 원본 이벤트를 rollup 후 삭제합니다.')
+
+    def rollup(self, day):
+        events     = ReadingEvent.objects.filter(day=day)
+        book_rows  = events.values('book_id').annotate(
+            readers        = Count('id', filter=Q(started=True)),
+            finishes       = Count('id', filter=Q(finished=True)),
+            finish_minutes = Sum('finish_minutes'),
+            minutes        = Sum('minutes'),
+        )
+        user_rows  = events.values('user_id').annotate(
+            books    = Count('book_id', distinct=True),
+            finishes = Count('id', filter=Q(finished=True)),
+            minutes  = Sum('minutes'),
+        )
+
+        # 같은 날짜를 다시 집계해도 결과가 같도록 삭제 후 다시 생성
+        with transaction.atomic():
+            DailyBookReading.objects.filter(day=day).delete()
+            DailyUserReading.objects.filter(day=day).delete()
+            DailyBookReading.objects.bulk_create([DailyBookReading(day=day, **row) for row in book_rows], batch_size=1000)
+            DailyUserReading.objects.bulk_create([DailyUserReading(day=day, **row) for row in user_rows], batch_size=1000)
+
+        return len(book_rows), len(user_rows)
+
+    def handle(self, *args, **options):
+        today = date.today()
+        days  = [options['day']] if options['day'] else [today - timedelta(days=1), today]
+
+        for day in days:
+            books, users = self.rollup(day)
+            self.stdout.write(f'{day}: {books} books, {users} users')
+        bump_versions('reading_rollup')
+
+        if options['purge_days'] is not None:
+            if options['purge_days'] < 1:
+                raise CommandError('--purge-days must be at least 1')
+            purge_before = today - timedelta(days=options['purge_days'])
+            deleted      = ReadingEvent.objects.filter(day__lt=purge_before).delete()[0]
+            self.stdout.write(f'deleted {deleted} events before {purge_before}')
@@ -0,0 +1,55 @@
+# Generated by Django 3.1.3 on 2026-10-19 23:31
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_nicknames(apps, schema_editor):
+    # 가장 먼저 가입한 사용자는 유지하고 나머지는 '#<id>' 접미사를 붙여 unique 제약을 만족시킨다
+    User       = apps.get_model('user', 'User')
+    duplicates = (User.objects.values('nickname')
+                  .annotate(count=Count('id')).filter(count__gt=1)
+                  .values_list('nickname', flat=True))
+
+    for nickname in list(duplicates):
+        for user in User.objects.filter(nickname=nickname).order_by('id')[1:]:
+            suffix        = f'#{user.id}'
+            user.nickname = nickname[:45 - len(suffix)] + suffix
+            user.save(update_fields=['nickname'])
+
+
+def check_duplicate_phone_numbers(apps, schema_editor):
+    # 로그인(SignInView)은 휴대폰 번호로 사용자를 찾으므로 번호를 지우거나 고르지 않고, 중복이 있으면 멈춰 직접 합치게 한다
+    User       = apps.get_model('user', 'User')
+    duplicates = (User.objects.exclude(phone_number=None).values('phone_number')
+                  .annotate(count=Count('id')).filter(count__gt=1)
+                  .values_list('phone_number', flat=True))
+
+    groups = [list(User.objects.filter(phone_number=phone_number).order_by('id').values_list('id', flat=True))
+              for phone_number in duplicates]
+    if groups:
+        raise RuntimeError(
+            'phone_number 가 같은 사용자를 합친 뒤 다시 migrate 하세요 (user id): '
+            + ', '.join(str(user_ids) for user_ids in groups))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_nicknames, migrations.RunPython.noop),
+        migrations.RunPython(check_duplicate_phone_numbers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='nickname',
+            field=models.CharField(max_length=45, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='phone_number',
+            field=models.CharField(max_length=11, null=True, unique=True),
+        ),
+    ]
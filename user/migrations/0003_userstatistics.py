@@ -0,0 +1,27 @@
+# Generated by Django 3.1.3 on 2026-10-19 23:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_auto_20261019_2331'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatistics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='user.user')),
+                ('total_book_count', models.IntegerField(default=0)),
+                ('total_read_time', models.IntegerField(default=0)),
+                ('category_counts', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'user_statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.1.3 on 2026-10-19 23:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0002_auto_20201208_1316'),
+        ('user', '0003_userstatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('page', models.IntegerField()),
+                ('minutes', models.IntegerField()),
+                ('started', models.BooleanField(default=False)),
+                ('finished', models.BooleanField(default=False)),
+                ('finish_minutes', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to='book.book')),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to='user.user')),
+            ],
+            options={
+                'db_table': 'reading_events',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyUserReading',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('books', models.IntegerField(default=0)),
+                ('finishes', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to='user.user')),
+            ],
+            options={
+                'db_table': 'daily_user_readings',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBookReading',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('readers', models.IntegerField(default=0)),
+                ('finishes', models.IntegerField(default=0)),
+                ('finish_minutes', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='book.book')),
+            ],
+            options={
+                'db_table': 'daily_book_readings',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='readingevent',
+            index=models.Index(fields=['day', 'book'], name='reading_event_day_book_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readingevent',
+            index=models.Index(fields=['day', 'user'], name='reading_event_day_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyuserreading',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_user_reading'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailybookreading',
+            constraint=models.UniqueConstraint(fields=('day', 'book'), name='unique_daily_book_reading'),
+        ),
+    ]
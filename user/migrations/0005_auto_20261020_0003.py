@@ -0,0 +1,25 @@
+# Generated by Django 3.1.3 on 2026-10-20 00:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0002_auto_20201208_1316'),
+        ('user', '0004_auto_20261019_2338'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userbook',
+            name='book',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='book.book'),
+        ),
+        migrations.AlterField(
+            model_name='userbook',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='user.user'),
+        ),
+    ]
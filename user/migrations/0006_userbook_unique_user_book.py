@@ -0,0 +1,34 @@
+# Generated by Django 3.1.3 on 2026-10-20 00:33
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def merge_duplicate_user_books(apps, schema_editor):
+    # 같은 (user, book) row 는 가장 먼저 만든 row 에 합친다 (page 는 가장 많이 읽은 페이지, time 은 합계)
+    UserBook   = apps.get_model('user', 'UserBook')
+    user_books = UserBook.objects.using(schema_editor.connection.alias)
+    duplicates = (user_books.values('user_id', 'book_id')
+                  .annotate(count=Count('id'), first_id=Min('id'), page=Max('page'), time=Sum('time'))
+                  .filter(count__gt=1))
+
+    for duplicate in list(duplicates):
+        user_books.filter(id=duplicate['first_id']).update(page=duplicate['page'], time=duplicate['time'])
+        user_books.filter(user_id=duplicate['user_id'], book_id=duplicate['book_id']).exclude(
+            id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0005_auto_20261020_0003'),
+    ]
+
+    operations = [
+        # user_books 가 있는 shard 에서도 실행되도록 model_name 을 넘긴다 (share/shards.py ShardRouter.allow_migrate)
+        migrations.RunPython(merge_duplicate_user_books, migrations.RunPython.noop, hints={'model_name': 'userbook'}),
+        migrations.AddConstraint(
+            model_name='userbook',
+            constraint=models.UniqueConstraint(fields=('user', 'book'), name='user_books_user_book_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.3 on 2026-10-20 00:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0006_userbook_unique_user_book'),
+    ]
+
+    operations = [
+        # (user, id) 인덱스를 먼저 만든 뒤 user 단독 인덱스를 지운다
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(fields=['user', 'id'], name='user_book_user_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='userbook',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to='user.user'),
+        ),
+    ]
@@ -7,20 +7,23 @@ import json
 import datetime
 from random import randint
 
-from django.db      import models
+from django.db      import models, transaction, router
+from django.db.models import Sum, Count
 from django.utils   import timezone
 
 from model_utils.models import TimeStampedModel
 
+from share.shards   import ShardedManager
+
 import my_settings
 
 
 class User(models.Model):
-    nickname     = models.CharField(max_length=45)
+    nickname     = models.CharField(max_length=45, unique=True)
     password     = models.CharField(max_length=200, null=True)
     email        = models.EmailField(max_length=45, null=True)
     image_url    = models.URLField(max_length=200, null=True)
-    phone_number = models.CharField(max_length=11, null=True)
+    phone_number = models.CharField(max_length=11, null=True, unique=True)
     created_at   = models.DateTimeField(auto_now_add=True)
     updated_at   = models.DateTimeField(auto_now=True)
     kakao_id     = models.CharField(max_length=45, null=True)
@@ -31,15 +34,172 @@ class User(models.Model):
 
 
 class UserBook(models.Model):
-    user        = models.ForeignKey(User, on_delete=models.CASCADE)
-    book        = models.ForeignKey('book.Book', on_delete=models.CASCADE)
+    # user id 로 shard 를 나누므로 사용자, 책과는 DB 제약 없이 id 로만 연결 (share/shards.py)
+    user        = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, db_constraint=False)
+    book        = models.ForeignKey('book.Book', on_delete=models.CASCADE, db_constraint=False)
     page        = models.IntegerField()
     time        = models.IntegerField()
     created_at  = models.DateTimeField(auto_now_add=True)
     updated_at  = models.DateTimeField(auto_now=True)
 
+    objects     = ShardedManager()
+
+    class Meta :
+        db_table    = 'user_books'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'book'], name='user_books_user_book_unique'),
+        ]
+        indexes     = [
+            # 내보내기(LibraryExportView)의 사용자별 id 순서 keyset 조회 (user 로 시작하는 조회도 이 인덱스를 쓴다)
+            models.Index(fields=['user', 'id'], name='user_book_user_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 통계 증분 계산을 위해 DB에서 읽은 값 보관
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # post_save signal 의 통계 증분이 이 row 와 같은 transaction 에서 반영되도록 묶는다 (user/signals.py)
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+
+
+class UserStatistics(models.Model):
+    """
+    사용자별 독서 통계 (UserBook 저장/삭제 시 signal로 증분 갱신)
+
+    category_counts : {카테고리 id(str): 책 권수}
+
+    user_books 와 같은 DB 이면 증분은 UserBook 을 쓴 transaction 안에서 같이 커밋/롤백된다. (user/signals.py)
+    user_books 를 다른 shard 에 두면 한 transaction 으로 묶을 수 없어 shard 가 커밋된 뒤 반영하므로,
+    그 사이에 프로세스가 죽거나 통계를 재계산하면 어긋날 수 있다. 이때는 manage.py check_user_statistics --fix 로 맞춘다.
+    """
+
+    user             = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    total_book_count = models.IntegerField(default=0)
+    total_read_time  = models.IntegerField(default=0)
+    category_counts  = models.JSONField(default=dict)
+    updated_at       = models.DateTimeField(auto_now=True)
+
     class Meta :
-        db_table = 'user_books'
+        db_table = 'user_statistics'
+
+    @classmethod
+    def compute(cls, user_id):
+        from book.models import Book
+
+        # user_books 는 사용자의 shard 에, 책 카테고리는 default 에 있으므로 join 없이 두 번 조회
+        user_books  = UserBook.objects.for_user(user_id)
+        totals      = user_books.aggregate(total_book_count=Count('id'), total_read_time=Sum('time'))
+        book_counts = dict(user_books.values_list('book_id').annotate(count=Count('id')).order_by())
+
+        category_counts = {}
+        for book_id, category_id in Book.objects.filter(
+                id__in=book_counts, category_id__isnull=False).values_list('id', 'category_id'):
+            category_counts[str(category_id)] = category_counts.get(str(category_id), 0) + book_counts[book_id]
+
+        return {
+            'total_book_count' : totals['total_book_count'],
+            'total_read_time'  : totals['total_read_time'] or 0,
+            'category_counts'  : category_counts,
+        }
+
+    @classmethod
+    def rebuild(cls, user_id):
+        statistics, created = cls.objects.update_or_create(user_id=user_id, defaults=cls.compute(user_id))
+        return statistics
+
+    @classmethod
+    def get_for_user(cls, user_id):
+        statistics = cls.objects.filter(user_id=user_id).first()
+        return statistics or cls.rebuild(user_id)
+
+    @classmethod
+    def apply_delta(cls, user_id, book_count=0, read_time=0, categories=None):
+        with transaction.atomic():
+            statistics = cls.objects.select_for_update().filter(user_id=user_id).first()
+            if not statistics:
+                # 처음 집계하는 사용자는 이미 반영된 UserBook 기준으로 전체 계산
+                return cls.rebuild(user_id)
+
+            statistics.total_book_count += book_count
+            statistics.total_read_time  += read_time
+            for category_id, count in (categories or {}).items():
+                if category_id is None:
+                    continue
+                key   = str(category_id)
+                total = statistics.category_counts.get(key, 0) + count
+                if total > 0:
+                    statistics.category_counts[key] = total
+                else:
+                    statistics.category_counts.pop(key, None)
+            statistics.save()
+
+        return statistics
+
+class ReadingEvent(models.Model):
+    """
+    append-only 독서 이벤트 로그 (독서 진행 heartbeat flush 단위로 한 row)
+
+    day 기준으로 조회/삭제하므로 (day, ...) 인덱스만 두고 FK 제약은 걸지 않는다.
+    - started  : 해당 책을 처음 읽기 시작한 이벤트
+    - finished : 이번 이벤트로 책의 마지막 페이지에 도달
+    - finish_minutes : 완독 시점의 누적 독서 시간(분)
+    """
+
+    id              = models.BigAutoField(primary_key=True)
+    day             = models.DateField()
+    user            = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False)
+    book            = models.ForeignKey('book.Book', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False)
+    page            = models.IntegerField()
+    minutes         = models.IntegerField()
+    started         = models.BooleanField(default=False)
+    finished        = models.BooleanField(default=False)
+    finish_minutes  = models.IntegerField(default=0)
+
+    class Meta :
+        db_table = 'reading_events'
+        indexes  = [
+            models.Index(fields=['day', 'book'], name='reading_event_day_book_idx'),
+            models.Index(fields=['day', 'user'], name='reading_event_day_user_idx'),
+        ]
+
+
+class DailyBookReading(models.Model):
+    """책별 일간 독서 집계 (rollup_reading_events 로 생성)"""
+
+    day             = models.DateField()
+    book            = models.ForeignKey('book.Book', on_delete=models.CASCADE, db_constraint=False)
+    readers         = models.IntegerField(default=0)
+    finishes        = models.IntegerField(default=0)
+    finish_minutes  = models.IntegerField(default=0)
+    minutes         = models.IntegerField(default=0)
+
+    class Meta :
+        db_table    = 'daily_book_readings'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'book'], name='unique_daily_book_reading'),
+        ]
+
+
+class DailyUserReading(models.Model):
+    """사용자별 일간 독서 집계 (rollup_reading_events 로 생성)"""
+
+    day             = models.DateField()
+    user            = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, db_index=False)
+    books           = models.IntegerField(default=0)
+    finishes        = models.IntegerField(default=0)
+    minutes         = models.IntegerField(default=0)
+
+    class Meta :
+        db_table    = 'daily_user_readings'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_user_reading'),
+        ]
+
 
 class SMSAuthRequest(TimeStampedModel):
     phone_number = models.CharField(verbose_name='휴대폰 번호', primary_key=True, max_length=50)
@@ -0,0 +1,132 @@
+import math
+import time
+import hashlib
+import threading
+
+from django.conf import settings
+
+
+class BloomFilter:
+    """
+    고정 크기 bit 배열 기반 Bloom filter
+
+    - 없는 값은 확실히 없다고 판단 (false negative 없음)
+    - 있다고 판단한 값은 error_rate 확률로 틀릴 수 있으므로 DB로 재확인 필요
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity         = max(int(capacity), 1)
+        self.capacity    = capacity
+        self.bit_count   = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count  = max(int(round(self.bit_count / capacity * math.log(2))), 1)
+        self.bits        = bytearray((self.bit_count + 7) // 8)
+        self.count       = 0
+
+    def _positions(self, value):
+        # double hashing : h1 + i * h2 로 k개의 위치 생성
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1     = int.from_bytes(digest[:8], 'little')
+        h2     = int.from_bytes(digest[8:], 'little') | 1
+
+        return ((h1 + i * h2) % self.bit_count for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UserIdentityFilter:
+    """
+    가입된 닉네임/휴대폰 번호의 프로세스 내 Bloom filter
+
+    프로세스 기동 후 첫 조회 시 users 테이블 전체로 생성하고, 이후 User 저장 시 signal로 갱신한다.
+    다른 worker에서 가입한 사용자는 USER_BLOOM_FILTER_REBUILD_SECONDS 주기의 재생성 전까지 반영되지 않으므로
+    최종 중복 판단은 users 테이블의 unique 제약으로 보장한다.
+    """
+
+    FIELDS = ('nickname', 'phone_number')
+
+    def __init__(self):
+        self._lock         = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._filter       = None
+        self._built_at     = 0.0
+        self._pending      = None
+
+    @staticmethod
+    def _key(field, value):
+        return f'{field}:{value}'
+
+    def _is_stale(self):
+        return time.monotonic() - self._built_at > settings.USER_BLOOM_FILTER_REBUILD_SECONDS
+
+    def rebuild(self):
+        with self._rebuild_lock:
+            self._build()
+
+    def refresh(self):
+        # 한 thread 만 재생성하고 나머지는 기존 filter 를 쓴다 (filter 가 아직 없을 때만 기다린다)
+        if not self._rebuild_lock.acquire(blocking=self._filter is None):
+            return
+        try:
+            if self._filter is None or self._is_stale():
+                self._build()
+        finally:
+            self._rebuild_lock.release()
+
+    def _build(self):
+        # _rebuild_lock 을 잡은 thread 만 호출한다 (_pending 을 한 번에 하나의 재생성만 쓰도록)
+        from user.models import User
+
+        with self._lock:
+            self._pending = []
+
+        try:
+            capacity = max(User.objects.count() * 2, settings.USER_BLOOM_FILTER_MIN_CAPACITY)
+            bloom    = BloomFilter(capacity * len(self.FIELDS), settings.USER_BLOOM_FILTER_ERROR_RATE)
+
+            for row in User.objects.values_list(*self.FIELDS).iterator(chunk_size=2000):
+                for field, value in zip(self.FIELDS, row):
+                    if value:
+                        bloom.add(self._key(field, value))
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            # 재생성 중에 추가된 값 반영
+            for key in self._pending:
+                bloom.add(key)
+            self._pending  = None
+            self._filter   = bloom
+            self._built_at = time.monotonic()
+
+    def add(self, **values):
+        with self._lock:
+            for field, value in values.items():
+                if not value:
+                    continue
+                key = self._key(field, value)
+                if self._pending is not None:
+                    self._pending.append(key)
+                if self._filter is not None:
+                    self._filter.add(key)
+
+    def might_contain(self, field, value):
+        if self._filter is None or self._is_stale():
+            self.refresh()
+
+        return self._key(field, value) in self._filter
+
+    def reset(self):
+        with self._lock:
+            self._filter   = None
+            self._built_at = 0.0
+
+
+user_identity_filter = UserIdentityFilter()
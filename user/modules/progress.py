@@ -0,0 +1,210 @@
+import json
+import atexit
+import logging
+import threading
+from datetime   import datetime
+from contextlib import ExitStack
+
+from django.conf                 import settings
+from django.db                   import transaction
+from django.db.models            import F, Value
+from django.db.models.functions  import Greatest
+
+from share.versions              import bump_versions_on_commit
+from share.response_cache        import invalidate_tags
+from share.shards                import group_by_shard
+from share.db_connections        import run_with_connections
+from share                       import metrics
+
+logger             = logging.getLogger(__name__)
+dead_letter_logger = logging.getLogger('suwee.reading_progress.dead_letter')
+
+# 처음 읽는 (user, book) 의 row 를 먼저 넣을 때 쓰는 page (실제 page 는 0 이상이라 이 transaction 이 넣은 row 인지 구분된다)
+NEW_ROW_PAGE = -1
+
+
+class ReadingProgressBuffer:
+    """
+    독서 진행 heartbeat write-behind buffer
+
+    (user, book) 별로 heartbeat 를 합쳐 두었다가 READING_PROGRESS_FLUSH_SECONDS 마다
+    bulk_update / bulk_create 로 user_books 에 반영한다.
+
+    - page : 가장 많이 읽은 페이지 (Greatest)
+    - time : 읽은 시간(분) 누적 (F('time') + 증가분)
+
+    bulk 작업은 signal 을 보내지 않으므로 사용자 통계(UserStatistics)에는 증가분을 직접 반영하고,
+    flush 한 (user, book) 마다 독서 이벤트(ReadingEvent)를 한 row 씩 남긴다.
+    반영에 실패한 증가분은 READING_PROGRESS_MAX_ATTEMPTS 번까지 다시 시도하고, 그래도 실패하면
+    suwee.reading_progress.dead_letter 로그(READING_PROGRESS_DEAD_LETTER_FILE)에 JSON 한 줄씩 남긴다.
+    """
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self._entries  = {}
+        self._thread   = None
+        self._stopping = threading.Event()
+
+    def add(self, user_id, book_id, page, time):
+        with self._lock:
+            entry = self._entries.setdefault((user_id, book_id), {'page': 0, 'time': 0, 'attempts': 0})
+            entry['page']  = max(entry['page'], page)
+            entry['time'] += time
+            buffered       = len(self._entries)
+
+        if buffered >= settings.READING_PROGRESS_MAX_BUFFERED:
+            self.flush()
+        else:
+            self.start()
+
+    def pending(self):
+        with self._lock:
+            return len(self._entries)
+
+    def start(self):
+        if self._thread is not None or settings.READING_PROGRESS_FLUSH_SECONDS is None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='reading-progress-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(settings.READING_PROGRESS_FLUSH_SECONDS):
+            try:
+                run_with_connections(self.flush)
+            except Exception:
+                logger.exception('reading progress flush failed')
+
+    def stop(self):
+        self._stopping.set()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            entries, self._entries = self._entries, {}
+
+        if not entries:
+            return 0
+
+        try:
+            self._write(entries)
+        except Exception:
+            self._requeue(entries)
+            raise
+
+        return len(entries)
+
+    def _requeue(self, entries):
+        # 실패한 증가분은 다음 flush 때 다시 시도하고, READING_PROGRESS_MAX_ATTEMPTS 번 실패하면 dead letter 로 남기고 버린다
+        # (잘못된 row 하나 때문에 같은 batch 가 계속 실패하면서 buffer 에 쌓이지 않도록)
+        dead = []
+        with self._lock:
+            for key, entry in entries.items():
+                attempts = entry['attempts'] + 1
+                if attempts >= settings.READING_PROGRESS_MAX_ATTEMPTS:
+                    dead.append((key, entry))
+                    continue
+                current             = self._entries.setdefault(key, {'page': 0, 'time': 0, 'attempts': 0})
+                current['page']     = max(current['page'], entry['page'])
+                current['time']    += entry['time']
+                current['attempts'] = max(current['attempts'], attempts)
+
+        for (user_id, book_id), entry in dead:
+            dead_letter_logger.error(json.dumps({
+                'at'      : datetime.now().isoformat(timespec='seconds'),
+                'user_id' : user_id,
+                'book_id' : book_id,
+                'page'    : entry['page'],
+                'time'    : entry['time'],
+            }))
+        if dead:
+            metrics.increment('reading_progress_dead_letter_total', len(dead))
+
+    def _write(self, entries):
+        from book.models import Book
+        from user.models import UserBook, UserStatistics, ReadingEvent
+
+        user_ids = {user_id for user_id, book_id in entries}
+        book_ids = {book_id for user_id, book_id in entries}
+        now      = datetime.now()
+        books    = {book_id: (category_id, page) for book_id, category_id, page in Book.objects.filter(
+            id__in=book_ids).values_list('id', 'category_id', 'page')}
+
+        shards = group_by_shard(user_ids)
+        with transaction.atomic(), ExitStack() as stack:
+            # user_books 는 사용자별 shard 에 있으므로 shard 마다 transaction 을 연다
+            for alias in shards:
+                stack.enter_context(transaction.atomic(using=alias))
+
+            # 같은 (user, book) 을 처음 flush 하는 프로세스가 여럿이면 (user, book) unique 제약에 걸리지 않도록
+            # 없는 row 를 NEW_ROW_PAGE 로 먼저 넣고(ignore_conflicts) 모든 row 를 잠근 뒤 증가분을 반영한다
+            rows    = self._lock_rows(UserBook, shards, book_ids)
+            missing = [key for key in entries if key not in rows]
+            for alias, keys in group_by_shard(missing, lambda key: key[0]).items():
+                UserBook.objects.on_shard(alias).bulk_create([
+                    UserBook(user_id=user_id, book_id=book_id, page=NEW_ROW_PAGE, time=0) for user_id, book_id in keys
+                ], ignore_conflicts=True)
+                rows.update(self._lock_rows(UserBook, {alias: {user_id for user_id, book_id in keys}}, book_ids))
+
+            updated, events, started = [], [], set()
+            for key, entry in entries.items():
+                user_book       = rows[key]
+                book_page       = books.get(key[1], (None, 0))[1]
+                is_new          = user_book.page == NEW_ROW_PAGE
+                last_page, time = (0, 0) if is_new else (user_book.page, user_book.time)
+                finished        = last_page < book_page <= entry['page']
+
+                user_book.page       = Greatest(F('page'), Value(entry['page']))
+                user_book.time       = F('time') + entry['time']
+                user_book.updated_at = now
+                updated.append(user_book)
+                if is_new:
+                    started.add(key)
+
+                events.append(ReadingEvent(
+                    day            = now.date(),
+                    user_id        = key[0],
+                    book_id        = key[1],
+                    page           = entry['page'],
+                    minutes        = entry['time'],
+                    started        = key in started,
+                    finished       = finished,
+                    finish_minutes = time + entry['time'] if finished else 0,
+                ))
+
+            for alias, rows in group_by_shard(updated, lambda user_book: user_book.user_id).items():
+                UserBook.objects.on_shard(alias).bulk_update(rows, ['page', 'time', 'updated_at'])
+            ReadingEvent.objects.bulk_create(events)
+
+            deltas = {}
+            for key, entry in entries.items():
+                delta               = deltas.setdefault(key[0], {'book_count': 0, 'read_time': 0, 'categories': {}})
+                delta['read_time'] += entry['time']
+                if key in started:
+                    category_id                       = books.get(key[1], (None, 0))[0]
+                    delta['book_count']              += 1
+                    delta['categories'][category_id]  = delta['categories'].get(category_id, 0) + 1
+
+            for user_id, delta in deltas.items():
+                UserStatistics.apply_delta(user_id, **delta)
+
+            # bulk_update/bulk_create 는 signal 을 보내지 않으므로 직접 올린다 (책별 독자 수, 순위 응답 캐시 포함)
+            bump_versions_on_commit('user_books')
+            invalidate_tags(*[f'book:{book_id}' for book_id in sorted(book_ids)])
+
+    @staticmethod
+    def _lock_rows(model, shards, book_ids):
+        # shard 별 (user, book) row 를 select_for_update 로 잠근다 (다른 flush 가 커밋할 때까지 기다린다)
+        rows = {}
+        for alias, shard_user_ids in shards.items():
+            for user_book in model.objects.on_shard(alias).select_for_update().filter(
+                    user_id__in=shard_user_ids, book_id__in=book_ids).only(
+                        'id', 'user_id', 'book_id', 'page', 'time').order_by('id'):
+                rows[(user_book.user_id, user_book.book_id)] = user_book
+        return rows
+
+
+reading_progress_buffer = ReadingProgressBuffer()
+atexit.register(reading_progress_buffer.stop)
@@ -0,0 +1,94 @@
+from django.db                import transaction, router
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from .models                  import User, UserBook, UserStatistics
+from .modules.bloom           import user_identity_filter
+from book.models              import Book
+from share.versions           import bump_versions_on_commit
+from share.response_cache     import invalidate_tags
+
+
+@receiver(post_save, sender=User)
+def add_user_identity(sender, instance, **kwargs):
+    # 닉네임 변경도 반영 (기존 값은 남아 있어도 DB 재확인으로 처리됨)
+    user_identity_filter.add(
+        nickname     = instance.nickname,
+        phone_number = instance.phone_number,
+    )
+
+
+def get_category_id(book_id):
+    return Book.objects.filter(id=book_id).values_list('category_id', flat=True).first()
+
+
+def apply_statistics(using, func, *args, **kwargs):
+    # 통계가 UserBook 과 같은 DB 이면 UserBook 을 쓴 transaction 안에서 바로 반영한다 (같이 커밋/롤백)
+    # 다른 shard 이면 한 transaction 으로 묶을 수 없어 UserBook 을 쓴 shard 가 커밋된 뒤에 반영한다
+    # (롤백된 UserBook 변경이 통계에 남지 않도록, 커밋 후 반영이 실패한 경우는 check_user_statistics --fix 로 맞춘다)
+    if using == router.db_for_write(UserStatistics):
+        func(*args, **kwargs)
+    else:
+        transaction.on_commit(lambda: func(*args, **kwargs), using=using)
+
+
+@receiver(post_save, sender=UserBook)
+def update_statistics_on_save(sender, instance, created, using, **kwargs):
+    if created:
+        apply_statistics(
+            using,
+            UserStatistics.apply_delta,
+            instance.user_id,
+            book_count = 1,
+            read_time  = instance.time,
+            categories = {instance.book.category_id: 1},
+        )
+    else:
+        loaded = getattr(instance, '_loaded_values', None) or {}
+        if not {'user_id', 'book_id', 'time'} <= loaded.keys() or loaded['user_id'] != instance.user_id:
+            # 이전 값을 알 수 없으면 전체 재계산
+            apply_statistics(using, UserStatistics.rebuild, instance.user_id)
+        else:
+            categories = {}
+            if loaded['book_id'] != instance.book_id:
+                categories = {get_category_id(loaded['book_id']): -1, instance.book.category_id: 1}
+            apply_statistics(
+                using,
+                UserStatistics.apply_delta,
+                instance.user_id,
+                read_time  = instance.time - loaded['time'],
+                categories = categories,
+            )
+
+    instance._loaded_values = {field.attname: getattr(instance, field.attname) for field in sender._meta.concrete_fields}
+
+
+def apply_delete_delta(user_id, **delta):
+    if UserStatistics.objects.filter(user_id=user_id).exists():
+        UserStatistics.apply_delta(user_id, **delta)
+
+
+@receiver(post_delete, sender=UserBook)
+def update_statistics_on_delete(sender, instance, using, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    apply_statistics(
+        using,
+        apply_delete_delta,
+        instance.user_id,
+        book_count = -1,
+        read_time  = -loaded.get('time', instance.time),
+        categories = {get_category_id(loaded.get('book_id', instance.book_id)): -1},
+    )
+
+
+@receiver(post_save, sender=UserBook)
+@receiver(post_delete, sender=UserBook)
+def bump_user_book_version(sender, **kwargs):
+    bump_versions_on_commit('user_books')
+
+
+@receiver(post_save, sender=UserBook)
+@receiver(post_delete, sender=UserBook)
+def invalidate_book_cache(sender, instance, **kwargs):
+    # 책 상세의 독자 수, 베스트셀러 순위
+    invalidate_tags(f'book:{instance.book_id}')
@@ -1,14 +1,32 @@
 import json
+import jwt
 import bcrypt
+import time
+import threading
+from io             import StringIO
+from datetime       import date
 from unittest.mock  import patch, MagicMock
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.core.management import call_command, CommandError
+from django.db import IntegrityError, transaction, connection
 
 from .models import (
         User,
+        UserBook,
+        UserStatistics,
+        ReadingEvent,
+        DailyBookReading,
+        DailyUserReading,
         SMSAuthRequest,
 )
+from book.models import Book, Category
+from book.modules.numeric import get_reading_numeric
 from .views  import SMSCheckView
+from .modules.bloom import BloomFilter, user_identity_filter
+from .modules.progress import reading_progress_buffer
+
+import my_settings
 
 class UserTest(TestCase):
     def setUp(self):
@@ -88,7 +106,7 @@ class UserTest(TestCase):
 
     def test_user_signup_post_invalid_request_duplicate(self):
         User.objects.create(
-                phone_number = '01011112222', 
+                phone_number = '01033334444', 
                 password     = 'Suweasdff!@#KJ@ePW1',
                 nickname     = 'goblin',
         )
@@ -223,4 +241,308 @@ class UserTest(TestCase):
         
         self.assertEqual(response.json(), {"message":"SUCCESS", "result":True})
         self.assertEqual(response.status_code, 200)
-     
+
+
+class NicknameCheckTest(TestCase):
+    def setUp(self):
+        user_identity_filter.reset()
+        User.objects.create(phone_number='01055556666', nickname='suwee')
+
+    def test_bloom_filter_no_false_negative(self):
+        bloom = BloomFilter(100, 0.01)
+        for i in range(100):
+            bloom.add(f'nickname:{i}')
+
+        self.assertTrue(all(f'nickname:{i}' in bloom for i in range(100)))
+
+    def test_check_nickname_get_taken(self):
+        response = self.client.get('/user/check_nickname', {'nickname':'suwee'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message':'SUCCESS', 'result':False})
+
+    def test_check_nickname_get_available(self):
+        response = self.client.get('/user/check_nickname', {'nickname':'goblin'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message':'SUCCESS', 'result':True})
+
+    def test_check_nickname_get_created_after_build(self):
+        self.client.get('/user/check_nickname', {'nickname':'goblin'})
+        User.objects.create(phone_number='01077778888', nickname='goblin')
+
+        response = self.client.get('/user/check_nickname', {'nickname':'goblin'})
+
+        self.assertEqual(response.json(), {'message':'SUCCESS', 'result':False})
+
+    def test_check_nickname_concurrent_rebuild_once(self):
+        user_identity_filter.might_contain('nickname', 'suwee')
+        user_identity_filter._built_at = 0.0
+        calls  = []
+        errors = []
+
+        def slow_build():
+            calls.append(1)
+            time.sleep(0.2)
+            user_identity_filter._built_at = time.monotonic()
+
+        def check():
+            try:
+                user_identity_filter.might_contain('nickname', 'suwee')
+            except Exception as error:
+                errors.append(error)
+
+        with patch.object(user_identity_filter, '_build', side_effect=slow_build):
+            threads = [threading.Thread(target=check) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+
+    @patch('user.views.User.objects.update_or_create', side_effect=IntegrityError)
+    @patch('user.views.requests')
+    def test_user_signin_with_kakao_conflict(self, mocked_request, mocked_update_or_create):
+        class FakeResponse:
+            def json(self):
+                return {
+                        'id'            : 12345,
+                        'kakao_account' : {
+                            'profile'   : {'nickname':'test_user'},
+                            'email'     : 'test@example.com',
+                        }
+                    }
+
+        mocked_request.post = MagicMock(return_value=FakeResponse())
+
+        headers = {'HTTP_Authorization':'fake_token.1234'}
+        response = self.client.post('/user/kakao_sign_in',
+                        content_type='application/json',
+                        **headers
+                    )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {"message":"INVALID_REQUEST"})
+        self.assertEqual(mocked_update_or_create.call_count, 2)
+
+    def test_check_nickname_get_invalid_request(self):
+        response = self.client.get('/user/check_nickname')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'INVALID_REQUEST'})
+
+    def test_user_signup_post_duplicate_nickname(self):
+        body = {
+                'phone_number' : '01012347654',
+                'password'     : 'SuweePW1?',
+                'nickname'     : 'suwee',
+                }
+
+        response = self.client.post(
+                        '/user/sign_up',
+                        json.dumps(body),
+                        content_type = 'application/json'
+                    )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {"message":"INVALID_REQUEST"})
+
+
+def run_on_commit_callbacks():
+    # django 3.1 TestCase 는 transaction 을 커밋하지 않으므로 on_commit callback 을 직접 실행한다
+    callbacks, connection.run_on_commit = connection.run_on_commit, []
+    for savepoint_ids, callback in callbacks:
+        callback()
+
+
+class UserStatisticsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(nickname='reader')
+        Category.objects.create(id=1, name='소설')
+        Category.objects.create(id=2, name='수필')
+        for i, category_id in enumerate([1, 1, 2], start=1):
+            Book.objects.create(id=i, title=f'book_{i}', image_url='', company='company', author='author',
+                                page=100, publication_date='2020-12-01', category_id=category_id)
+
+        UserStatistics.rebuild(self.user.id)
+        for i in range(1, 4):
+            UserBook.objects.create(user=self.user, book_id=i, page=10, time=i * 10)
+        run_on_commit_callbacks()
+
+    def test_statistics_created_incrementally(self):
+        statistics = UserStatistics.objects.get(user=self.user)
+
+        self.assertEqual(statistics.total_book_count, 3)
+        self.assertEqual(statistics.total_read_time, 60)
+        self.assertEqual(statistics.category_counts, {'1':2, '2':1})
+
+    def test_statistics_updated_and_deleted(self):
+        user_book      = UserBook.objects.get(user=self.user, book_id=1)
+        user_book.time = 100
+        user_book.save()
+        UserBook.objects.get(user=self.user, book_id=3).delete()
+        run_on_commit_callbacks()
+
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual(statistics.total_book_count, 2)
+        self.assertEqual(statistics.total_read_time, 120)
+        self.assertEqual(statistics.category_counts, {'1':2})
+
+    def test_statistics_not_changed_by_rolled_back_write(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            UserBook.objects.filter(user=self.user, book_id=3).delete()
+            UserBook.objects.create(user=self.user, book_id=3, page=10, time=500)
+            raise ValueError
+        run_on_commit_callbacks()
+
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual(statistics.total_book_count, 3)
+        self.assertEqual(statistics.total_read_time, 60)
+
+    def test_statistics_applied_in_user_book_transaction(self):
+        # 통계와 user_books 가 같은 DB 이면 on_commit 을 기다리지 않고 같은 transaction 에서 반영된다
+        Book.objects.create(id=4, title='book_4', image_url='', company='company', author='author',
+                            page=100, publication_date='2020-12-01', category_id=2)
+        UserStatistics.objects.filter(user=self.user).delete()
+        UserBook.objects.create(user=self.user, book_id=4, page=10, time=40)
+
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_book_count, 4)
+        run_on_commit_callbacks()
+        self.assertEqual(UserStatistics.get_for_user(self.user.id).total_book_count, 4)
+
+        # 통계 반영이 실패하면 user_books 변경도 함께 롤백된다
+        with patch.object(UserStatistics, 'apply_delta', side_effect=ValueError), self.assertRaises(ValueError):
+            with transaction.atomic():
+                UserBook.objects.filter(user=self.user, book_id=4).first().delete()
+        self.assertTrue(UserBook.objects.filter(user=self.user, book_id=4).exists())
+
+    def test_check_user_statistics_command(self):
+        call_command('check_user_statistics', stdout=StringIO())
+
+        UserStatistics.objects.filter(user=self.user).update(total_read_time=0)
+        with self.assertRaises(CommandError):
+            call_command('check_user_statistics', stdout=StringIO())
+
+        call_command('check_user_statistics', '--fix', stdout=StringIO())
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_read_time, 60)
+
+
+@override_settings(READING_PROGRESS_FLUSH_SECONDS=None)
+class ReadingProgressTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(nickname='reader')
+        Category.objects.create(id=1, name='소설')
+        for i in range(1, 3):
+            Book.objects.create(id=i, title=f'book_{i}', image_url='', company='company', author='author',
+                                page=100, publication_date='2020-12-01', category_id=1)
+        UserBook.objects.create(user=self.user, book_id=1, page=10, time=30)
+
+        self.headers = {
+            'HTTP_Authorization': jwt.encode(
+                {'user_id':self.user.id},
+                my_settings.SECRET_KEY['secret'],
+                algorithm=my_settings.JWT_ALGORITHM
+            ).decode('utf-8')
+        }
+
+    def tearDown(self):
+        reading_progress_buffer.flush()
+
+    def post_progress(self, progress):
+        return self.client.post('/user/progress', json.dumps({'progress':progress}),
+                                content_type='application/json', **self.headers)
+
+    def test_progress_post_coalesced_until_flush(self):
+        response = self.post_progress([
+            {'book_id':1, 'page':20, 'time':5},
+            {'book_id':1, 'page':15, 'time':5},
+            {'book_id':2, 'page':3, 'time':1},
+            {'book_id':404, 'page':3, 'time':1},
+        ])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'message':'ACCEPTED', 'accepted':3})
+        self.assertEqual(reading_progress_buffer.pending(), 2)
+        self.assertEqual(UserBook.objects.get(book_id=1).time, 30)
+
+        self.assertEqual(reading_progress_buffer.flush(), 2)
+
+        self.assertEqual(UserBook.objects.get(book_id=1).page, 20)
+        self.assertEqual(UserBook.objects.get(book_id=1).time, 40)
+        self.assertEqual(UserBook.objects.get(book_id=2).time, 1)
+
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual(statistics.total_book_count, 2)
+        self.assertEqual(statistics.total_read_time, 41)
+        self.assertEqual(statistics.category_counts, {'1':2})
+
+    def test_progress_events_rollup(self):
+        self.post_progress([{'book_id':1, 'page':100, 'time':20}, {'book_id':2, 'page':50, 'time':10}])
+        reading_progress_buffer.flush()
+
+        events = ReadingEvent.objects.order_by('book_id')
+        self.assertEqual([(event.book_id, event.started, event.finished) for event in events],
+                         [(1, False, True), (2, True, False)])
+        self.assertEqual(events[0].finish_minutes, 50)
+
+        call_command('rollup_reading_events', '--day', date.today().isoformat(), stdout=StringIO())
+
+        self.assertEqual(
+            list(DailyBookReading.objects.order_by('book_id').values_list('book_id', 'readers', 'finishes', 'minutes')),
+            [(1, 0, 1, 20), (2, 1, 0, 10)],
+        )
+        user_reading = DailyUserReading.objects.get(user=self.user)
+        self.assertEqual((user_reading.books, user_reading.finishes, user_reading.minutes), (2, 1, 30))
+
+        with self.settings(READING_AGGREGATE_SOURCE='rollup'):
+            numeric = get_reading_numeric(2)
+        self.assertEqual(numeric['avg_finish'], 0.0)
+        self.assertEqual(numeric['category_avg_finish'], 100.0)
+        self.assertEqual(numeric['category_expected_reading_minutes'], 50)
+
+    def test_progress_flush_first_read_by_other_flush(self):
+        # 이 flush 가 row 를 읽은 뒤 다른 프로세스의 flush 가 같은 (user, book) 을 먼저 만든 경우
+        run_on_commit_callbacks()
+        lock_rows = reading_progress_buffer._lock_rows
+        calls     = []
+
+        def lock_rows_after_other_flush(model, shards, book_ids):
+            calls.append(1)
+            if len(calls) == 1:
+                UserBook.objects.create(user=self.user, book_id=2, page=30, time=7)
+                run_on_commit_callbacks()
+                return {}
+            return lock_rows(model, shards, book_ids)
+
+        self.post_progress([{'book_id':2, 'page':20, 'time':3}])
+        with patch.object(reading_progress_buffer, '_lock_rows', side_effect=lock_rows_after_other_flush):
+            reading_progress_buffer.flush()
+
+        user_book = UserBook.objects.get(user=self.user, book_id=2)
+        self.assertEqual((user_book.page, user_book.time), (30, 10))
+        self.assertFalse(ReadingEvent.objects.get(book_id=2).started)
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_book_count, 2)
+
+    @override_settings(READING_PROGRESS_MAX_ATTEMPTS=2)
+    def test_progress_flush_dead_letter(self):
+        self.post_progress([{'book_id':2, 'page':20, 'time':3}])
+
+        with patch.object(reading_progress_buffer, '_write', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                reading_progress_buffer.flush()
+            self.assertEqual(reading_progress_buffer.pending(), 1)
+
+            with self.assertLogs('suwee.reading_progress.dead_letter') as logs, self.assertRaises(ValueError):
+                reading_progress_buffer.flush()
+
+        self.assertEqual(reading_progress_buffer.pending(), 0)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['book_id'], 2)
+
+    def test_progress_post_key_error(self):
+        response = self.post_progress([{'book_id':1, 'page':20}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message':'KEY_ERROR'})
+
@@ -5,6 +5,8 @@ from .views import (
             SignUpView,
             SMSCheckView,
             SignInWithKakaoView,
+            NicknameCheckView,
+            ReadingProgressView,
         )
 
 urlpatterns = [
@@ -12,5 +14,7 @@ urlpatterns = [
         path('/sign_up', SignUpView.as_view()),
         path('/kakao_sign_in', SignInWithKakaoView.as_view()),
         path('/authSMS', SMSCheckView.as_view()),
+        path('/check_nickname', NicknameCheckView.as_view()),
+        path('/progress', ReadingProgressView.as_view()),
         ]
 
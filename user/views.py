@@ -6,19 +6,24 @@ import requests
 from datetime import datetime
 
 from django.http        import JsonResponse
-from django.db          import transaction
+from django.db          import transaction, IntegrityError
 from django.views       import View
 from django.shortcuts   import redirect
 from django.db.models   import Q
+from django.conf        import settings
 
 from .models import (
     User,
     UserBook,
     SMSAuthRequest,
 )
+from .modules.bloom    import user_identity_filter
+from .modules.progress import reading_progress_buffer
 from library.models import (
     Library,
 )
+from book.models import Book
+from share.decorators import check_auth_decorator
 
 import my_settings
 
@@ -50,21 +55,30 @@ class SignUpView(View):
             if not valid_phone_number or not valid_password:
                 return JsonResponse({"message":"INVALID_REQUEST"}, status=400)
 
-            if User.objects.filter(Q(phone_number=data['phone_number'])|
-                                    Q(nickname=data['nickname'])).exists():
+            # Bloom filter에 없으면 확실히 미가입이므로 DB 조회 생략
+            might_exist = (user_identity_filter.might_contain('phone_number', data['phone_number'])
+                           or user_identity_filter.might_contain('nickname', data['nickname']))
+
+            if might_exist and User.objects.filter(Q(phone_number=data['phone_number'])|
+                                                   Q(nickname=data['nickname'])).exists():
                 return JsonResponse({"message":"INVALID_REQUEST"}, status=409)
 
-            user = User.objects.create(
-                        nickname     = data['nickname'],
-                        phone_number = data['phone_number'],
-                        password     = bcrypt.hashpw(
-                                            data['password'].encode('utf-8'),
-                                            bcrypt.gensalt()
-                                        ).decode(),
-                    )
+            # 동시 가입 등 사전 검사를 통과한 중복은 unique 제약으로 차단
+            try:
+                with transaction.atomic():
+                    user = User.objects.create(
+                                nickname     = data['nickname'],
+                                phone_number = data['phone_number'],
+                                password     = bcrypt.hashpw(
+                                                    data['password'].encode('utf-8'),
+                                                    bcrypt.gensalt()
+                                                ).decode(),
+                            )
+            except IntegrityError:
+                return JsonResponse({"message":"INVALID_REQUEST"}, status=409)
             
-            if not Library.objects.filter(user_id = user.id):
-                Library.objects.create(user_id = user.id, name = user.nickname, image_url = '')
+            if not Library.objects.for_user(user.id).exists():
+                Library.objects.for_user(user.id).create(user_id = user.id, name = user.nickname, image_url = '')
                         
             return JsonResponse({"message":"SUCCESS"}, status=201)
 
@@ -118,16 +132,25 @@ class SignInWithKakaoView(View):
             nickname      = kakao_account['profile'].get('nickname', '')
             thumbnail     = kakao_account['profile'].get('thumbnail_image_url', '')
             email         = kakao_account.get('email', '')
-            obj, created  = User.objects.update_or_create(
-                                email    = email,
-                                defaults = {
-                                            'kakao_id'  : str(kakao_id),
-                                            'nickname'  : nickname,
-                                            'image_url' : thumbnail,
-                                            'updated_at': datetime.now(),
-                                            'email'     : email,
-                                            }
-                             )
+            defaults      = {
+                                'kakao_id'  : str(kakao_id),
+                                'nickname'  : nickname,
+                                'image_url' : thumbnail,
+                                'updated_at': datetime.now(),
+                                'email'     : email,
+                            }
+            try:
+                with transaction.atomic():
+                    obj, created = User.objects.update_or_create(email = email, defaults = defaults)
+            except IntegrityError:
+                # 다른 사용자가 사용 중인 카카오 닉네임이면 '#<kakao_id>' 접미사를 붙인다
+                suffix               = f'#{kakao_id}'
+                defaults['nickname'] = nickname[:45 - len(suffix)] + suffix
+                try:
+                    with transaction.atomic():
+                        obj, created = User.objects.update_or_create(email = email, defaults = defaults)
+                except IntegrityError:
+                    return JsonResponse({"message":"INVALID_REQUEST"}, status=409)
             user = None
             if obj:
                 user = obj
@@ -136,14 +159,35 @@ class SignInWithKakaoView(View):
             
             token = generate_token(user.id)
              
-            if not Library.objects.filter(user__kakao_id = str(kakao_id)):
-                Library.objects.create(user_id = user.id, name = user.nickname, image_url = '')
+            if not Library.objects.for_user(user.id).exists():
+                Library.objects.for_user(user.id).create(user_id = user.id, name = user.nickname, image_url = '')
             
             return JsonResponse({"message":"SUCCESS", "access_token":token}, status=200)
 
         except KeyError:
             return JsonResponse({"message":"KEY_ERROR"}, status=400)
 
+class NicknameCheckView(View):
+    """
+    닉네임 사용 가능 여부 조회
+
+    Bloom filter에 없는 닉네임은 DB 조회 없이 바로 사용 가능으로 응답한다.
+    가입 시점의 최종 중복 판단은 SignUpView에서 다시 한다.
+
+    Returns: 사용 가능 여부 (result)
+
+    """
+
+    def get(self, request):
+        nickname = request.GET.get('nickname', '')
+        if not nickname:
+            return JsonResponse({'message': 'INVALID_REQUEST'}, status=400)
+
+        exists = (user_identity_filter.might_contain('nickname', nickname)
+                  and User.objects.filter(nickname=nickname).exists())
+
+        return JsonResponse({'message': 'SUCCESS', 'result': not exists}, status=200)
+
 class SMSCheckView(View):
     @transaction.atomic
     def post(self, request):
@@ -168,4 +212,37 @@ class SMSCheckView(View):
         except KeyError:
             return JsonResponse({'message': 'KEY_ERROR'}, status=400)
 
+class ReadingProgressView(View):
+    """
+    독서 진행 heartbeat 수집
+
+    [{"book_id": 책 id, "page": 현재 페이지, "time": 직전 heartbeat 이후 읽은 시간(분)}, ...] 를 받아
+    write-behind buffer 에 합쳐 두고 일정 주기로 user_books 에 반영한다.
+
+    Returns: 접수된 heartbeat 수
+
+    """
+
+    @check_auth_decorator
+    def post(self, request):
+        try:
+            data      = json.loads(request.body)
+            heartbeat = [(int(row['book_id']), int(row['page']), int(row['time'])) for row in data['progress']]
+        except (KeyError, TypeError, ValueError):
+            return JsonResponse({'message': 'KEY_ERROR'}, status=400)
+
+        if len(heartbeat) > settings.READING_PROGRESS_MAX_BATCH:
+            return JsonResponse({'message': 'TOO_MANY_PROGRESS'}, status=400)
+        if any(page < 0 or time < 0 for book_id, page, time in heartbeat):
+            return JsonResponse({'message': 'INVALID_REQUEST'}, status=400)
+
+        book_ids = set(Book.objects.filter(
+            id__in={book_id for book_id, page, time in heartbeat}).values_list('id', flat=True))
+        accepted = 0
+        for book_id, page, time in heartbeat:
+            if book_id in book_ids:
+                reading_progress_buffer.add(request.user, book_id, page, time)
+                accepted += 1
+
+        return JsonResponse({'message': 'ACCEPTED', 'accepted': accepted}, status=202)
 